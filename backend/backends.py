@@ -0,0 +1,80 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .models import Schedule, SolveOptions
+from .monitor import SolveMonitor
+from .profiling import SolveProfile, profiled
+from .solver import AllData, solve_and_optimize_schedule
+from .parallel import SolveResult, solve_multi_start
+from .decompose import solve_decomposed
+from .exact import ExactSolverUnavailable, solve_exact
+
+# A backend turns a problem into a result plus backend-specific stats
+# (status, objective, bound, gap for exact ones; empty for heuristics)
+BackendResult = Tuple[SolveResult, Dict[str, Any]]
+SolverBackend = Callable[
+    [AllData, SolveOptions, Optional[SolveMonitor], Optional[Schedule], Optional[SolveProfile]], BackendResult
+]
+
+BACKENDS: Dict[str, SolverBackend] = {}
+
+
+def register_backend(name: str) -> Callable[[SolverBackend], SolverBackend]:
+    def register(fn: SolverBackend) -> SolverBackend:
+        BACKENDS[name] = fn
+        return fn
+    return register
+
+
+@register_backend("heuristic")
+def _heuristic(
+    all_data: AllData,
+    options: SolveOptions,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> BackendResult:
+    if options.decompose:
+        return solve_decomposed(all_data, options, monitor=monitor, initial=initial, profile=profile), {}
+    if options.starts > 1:
+        return solve_multi_start(all_data, options, monitor=monitor, initial=initial, profile=profile), {}
+    return solve_and_optimize_schedule(
+        all_data, verbose=False, options=options, monitor=monitor, initial=initial, profile=profile
+    ), {}
+
+
+@register_backend("cpsat")
+def _cpsat(
+    all_data: AllData,
+    options: SolveOptions,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> BackendResult:
+    """
+    CP-SAT first; if it is not installed or finds no valid schedule in time, the
+    heuristic pipeline runs instead, with a note on why.
+    """
+    notes: List[str] = []
+    try:
+        with profiled(profile, "Exact (CP-SAT)"):
+            result, stats = solve_exact(all_data, options, monitor=monitor, initial=initial)
+    except ExactSolverUnavailable as e:
+        result, stats = None, {"status": "UNAVAILABLE"}
+        notes.append(f"Exact (CP-SAT): {e}")
+    if result is not None:
+        return result, stats
+    if stats["status"] != "UNAVAILABLE":
+        notes.append(f"Exact (CP-SAT): no valid schedule found (status {stats['status']}).")
+    notes.append("Falling back to the heuristic pipeline.")
+    (schedule, violations, happiness, explanations), _ = _heuristic(all_data, options, monitor, initial, profile)
+    return (schedule, violations, happiness, notes + explanations), stats
+
+
+def run_backend(
+    all_data: AllData,
+    options: SolveOptions,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> BackendResult:
+    return BACKENDS[options.backend](all_data, options, monitor, initial, profile)
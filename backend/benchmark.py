@@ -0,0 +1,365 @@
+"""
+Benchmark harness for the solver.
+
+    python -m backend.benchmark --sizes small medium --tightness 0.5 0.85 --seeds 3 --out report.json
+
+Generates seeded synthetic university instances, runs the constraint functions,
+the incremental engines, every solver stage and the full pipeline on them, and
+writes a JSON report with wall times, evaluations per second, peak memory,
+success rate and final happiness.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from .models import Course, Professor, Room, SolveOptions, TimeSlot
+from .constraints import calculate_happiness_score, get_hard_constraint_violations
+from .compiled import compile_problem
+from .cooling import Budget
+from .engine import ConstraintEngine, HappinessScorer
+from .monitor import SolveMonitor
+from .solver import (
+    AllData,
+    _greedy_assignment,
+    _hill_climbing_for_validity,
+    _random_assignment,
+    _simulated_annealing_for_happiness,
+    _simulated_annealing_for_validity,
+    generate_random_schedule,
+    solve_and_optimize_schedule,
+)
+
+_DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+_BUILDINGS = ["hall", "lab", "Blk", "annex"]
+
+# Named instance sizes: courses and time slots; rooms follow from the tightness
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"courses": 40, "slots": 15},
+    "medium": {"courses": 150, "slots": 25},
+    "large": {"courses": 400, "slots": 40},
+    "xl": {"courses": 1000, "slots": 50},
+}
+
+
+# ---------------- Instance generator ----------------
+def generate_instance(
+    courses: int = 40,
+    slots: int = 15,
+    tightness: float = 0.7,
+    availability: float = 0.8,
+    dept_size: int = 8,
+    prof_load: int = 2,
+    seed: int = 0
+) -> AllData:
+    """
+    Synthetic problem with a known valid schedule.
+    tightness is the share of (room, slot) pairs the courses fill, so there are
+    ceil(courses / (slots * tightness)) rooms. availability is the share of slots
+    each professor can teach in; dept_size and prof_load are the average number of
+    courses per department and per professor.
+    A hidden placement is drawn first and every capacity, availability,
+    multi-booking and curriculum rule is generated around it, so the instance is always feasible.
+    """
+    rng = random.Random(seed)
+    tightness = min(max(tightness, 0.05), 1.0)
+    dept_size = max(1, min(dept_size, slots))
+    prof_load = max(1, min(prof_load, slots))
+    n_rooms = max(1, math.ceil(courses / (slots * tightness)))
+    n_depts = max(1, math.ceil(courses / dept_size))
+    n_profs = max(1, math.ceil(courses / prof_load))
+
+    time_slots = [
+        TimeSlot(day=_DAYS[s % len(_DAYS)], start_time=f"{9 + s // len(_DAYS)}:00",
+                 end_time=f"{10 + s // len(_DAYS)}:00", slot_id=s + 1)
+        for s in range(slots)
+    ]
+    capacities = [rng.choice([30, 40, 60, 80, 120, 200]) for _ in range(n_rooms)]
+    room_names = [f"{rng.choice(_BUILDINGS)}-{r + 1}" for r in range(n_rooms)]
+
+    # Hidden placement: distinct slots per department and per professor, and a
+    # free room in each chosen slot
+    dept_slots: List[set] = [set() for _ in range(n_depts)]
+    prof_slots: List[set] = [set() for _ in range(n_profs)]
+    free_rooms: List[List[int]] = [list(range(n_rooms)) for _ in range(slots)]
+    planted: List[tuple] = []
+    for c in range(courses):
+        d = c % n_depts
+        open_slots = [s for s in range(slots) if free_rooms[s] and s not in dept_slots[d]]
+        if not open_slots:
+            open_slots = [s for s in range(slots) if free_rooms[s]]
+        s = rng.choice(open_slots)
+        profs = [p for p in range(n_profs) if s not in prof_slots[p]]
+        p = rng.choice(profs) if profs else rng.randrange(n_profs)
+        r = free_rooms[s].pop(rng.randrange(len(free_rooms[s])))
+        dept_slots[d].add(s)
+        prof_slots[p].add(s)
+        planted.append((d, p, r, s))
+
+    professors = []
+    for p in range(n_profs):
+        others = [s for s in range(slots) if s not in prof_slots[p]]
+        blocked = rng.sample(others, min(len(others), round(slots * (1 - availability))))
+        rest = [s for s in range(slots) if s not in blocked]
+        professors.append(Professor(
+            name=f"Prof {p + 1}",
+            unavailable_slots=[s + 1 for s in blocked],
+            preferred_slots=[s + 1 for s in rng.sample(rest, min(len(rest), rng.randint(0, 3)))],
+            hates_slots=[s + 1 for s in rng.sample(rest, min(len(rest), rng.randint(0, 2)))],
+        ))
+
+    used = {(r, s) for _, _, r, s in planted}
+    rooms = []
+    for r in range(n_rooms):
+        idle = [s for s in range(slots) if (r, s) not in used]
+        closed = rng.sample(idle, min(len(idle), rng.randint(0, max(1, slots // 10))))
+        rooms.append(Room(name=room_names[r], capacity=capacities[r], unavailable_slots=[s + 1 for s in closed]))
+
+    # Electives only for curricula that are free in the course's hidden slot
+    dept_names = [f"Dept {d + 1}" for d in range(n_depts)]
+    curriculum_slots = [set(taken) for taken in dept_slots]
+    electives: List[List[str]] = []
+    for d, _, _, s in planted:
+        free = [e for e in range(n_depts) if e != d and s not in curriculum_slots[e]]
+        chosen = rng.sample(free, min(len(free), rng.choice([0, 0, 1, 2])))
+        for e in chosen:
+            curriculum_slots[e].add(s)
+        electives.append([dept_names[e] for e in chosen])
+    course_list = [
+        Course(
+            name=f"Course {c + 1}",
+            enrollment=rng.randint(max(1, capacities[r] // 2), capacities[r]),
+            professor=professors[p].name,
+            department=dept_names[d],
+            is_elective_for=electives[c],
+        )
+        for c, (d, p, r, s) in enumerate(planted)
+    ]
+    return {"courses": course_list, "professors": professors, "rooms": rooms, "time_slots": time_slots}
+
+
+# ---------------- Measurements ----------------
+def _rate(fn: Callable[[], Any], budget: float) -> Dict[str, float]:
+    """
+    Calls fn repeatedly for about `budget` seconds (at least once).
+    """
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while calls == 0 or elapsed < budget:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return {"calls": calls, "seconds": elapsed, "per_second": calls / elapsed if elapsed else 0.0}
+
+
+def bench_constraints(all_data: AllData, budget: float, seed: int) -> Dict[str, Any]:
+    """
+    Full evaluations of the reference constraint functions, and single-move deltas
+    of the incremental engines, on a random schedule.
+    """
+    random.seed(seed)
+    schedule = generate_random_schedule(all_data)
+    problem = compile_problem(all_data)
+    rooms, slots = problem.encode(schedule)
+    hard = ConstraintEngine(problem, rooms, slots)
+    soft = HappinessScorer(problem, rooms, slots)
+    rng = random.Random(seed)
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    moves = [(rng.randrange(C), rng.randrange(R), rng.randrange(S)) for _ in range(4096)] if C and R and S else []
+
+    def deltas(engine: Any) -> Callable[[], None]:
+        def run() -> None:
+            for m in moves:
+                engine.delta(*m)
+        return run
+
+    out = {
+        "hard_constraints": _rate(lambda: get_hard_constraint_violations(schedule, all_data), budget),
+        "happiness": _rate(lambda: calculate_happiness_score(schedule, all_data), budget),
+    }
+    if moves:
+        for name, engine in (("hard_delta", hard), ("happiness_delta", soft)):
+            r = _rate(deltas(engine), budget)
+            out[name] = {"calls": r["calls"] * len(moves), "seconds": r["seconds"],
+                         "per_second": r["per_second"] * len(moves)}
+    return out
+
+
+def _timed(fn: Callable[[], Any]) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_stages(all_data: AllData, options: SolveOptions) -> Dict[str, Any]:
+    """
+    Each stage of the heuristic pipeline on its own, in pipeline order.
+    Iteration counts come from the monitor, which samples every `every` steps.
+    """
+    rng = random.Random(options.seed)
+    budget = Budget.from_options(options)
+    problem, t_compile = _timed(lambda: compile_problem(all_data))
+    domains, t_domains = _timed(lambda: problem.domains)
+    out: Dict[str, Any] = {
+        "compile": {"seconds": t_compile},
+        "domains": {"seconds": t_domains, "feasible": domains.feasible},
+    }
+
+    def stage(name: str, fn: Callable[[SolveMonitor], tuple]) -> tuple:
+        monitor = SolveMonitor()
+        monitor.attach(problem)
+        result, seconds = _timed(lambda: fn(monitor))
+        out[name] = {"seconds": seconds, "iterations": monitor.iteration,
+                     "iterations_per_second": monitor.iteration / seconds if seconds else 0.0}
+        return result
+
+    if options.initializer == "greedy":
+        start = stage("initializer", lambda m: _greedy_assignment(problem, rng))
+    else:
+        start = stage("initializer", lambda m: _random_assignment(problem, rng))
+    assignment, cost = stage("stage1", lambda m: _hill_climbing_for_validity(
+        problem, verbose=False, rng=rng, monitor=m, initial=start, budget=budget
+    ))
+    out["stage1"]["cost"] = cost
+    if cost > 0:
+        assignment, cost, _ = stage("stage2", lambda m: _simulated_annealing_for_validity(
+            problem, assignment, verbose=False, rng=rng, monitor=m, focus=options.conflict_focus, budget=budget
+        ))
+        out["stage2"]["cost"] = cost
+    if cost == 0:
+        _, score, _ = stage("stage3", lambda m: _simulated_annealing_for_happiness(
+            problem, assignment, verbose=False, rng=rng, monitor=m, move_mix=options.move_mix, budget=budget
+        ))
+        out["stage3"]["happiness"] = score
+    return out
+
+
+def bench_solve(all_data: AllData, options: SolveOptions, memory: bool) -> Dict[str, Any]:
+    """
+    The full pipeline: wall time, success and happiness, and with `memory` the
+    peak traced allocation of a second, identical run (tracing slows it down).
+    """
+    (schedule, violations, happiness, _), seconds = _timed(
+        lambda: solve_and_optimize_schedule(all_data, verbose=False, options=options)
+    )
+    out: Dict[str, Any] = {"seconds": seconds, "success": not violations,
+                           "violations": len(violations), "happiness": happiness}
+    if memory:
+        tracemalloc.start()
+        try:
+            solve_and_optimize_schedule(all_data, verbose=False, options=options)
+            out["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def run_benchmarks(
+    sizes: List[str],
+    tightness: List[float],
+    seeds: int = 3,
+    availability: float = 0.8,
+    dept_size: int = 8,
+    prof_load: int = 2,
+    initializer: str = "random",
+    time_budget: Optional[float] = None,
+    eval_budget: float = 0.5,
+    memory: bool = True,
+    log: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Every (size, tightness) combination over seeds 0..seeds-1. Returns the report:
+    per-instance measurements plus a summary per combination.
+    """
+    runs: List[Dict[str, Any]] = []
+    summary: List[Dict[str, Any]] = []
+    for size in sizes:
+        for tight in tightness:
+            group: List[Dict[str, Any]] = []
+            for seed in range(seeds):
+                if log is not None:
+                    log(f"{size} tightness={tight} seed={seed}")
+                all_data = generate_instance(
+                    seed=seed, tightness=tight, availability=availability,
+                    dept_size=dept_size, prof_load=prof_load, **SIZES[size]
+                )
+                options = SolveOptions(seed=seed, initializer=initializer, time_budget=time_budget, cache=False)
+                run = {
+                    "size": size,
+                    "tightness": tight,
+                    "seed": seed,
+                    "instance": {k: len(v) for k, v in all_data.items()},
+                    "constraints": bench_constraints(all_data, eval_budget, seed),
+                    "stages": bench_stages(all_data, options),
+                    "solve": bench_solve(all_data, options, memory),
+                }
+                runs.append(run)
+                group.append(run)
+            solves = [r["solve"] for r in group]
+            summary.append({
+                "size": size,
+                "tightness": tight,
+                "runs": len(group),
+                "success_rate": _mean([1.0 if s["success"] else 0.0 for s in solves]),
+                "mean_seconds": _mean([s["seconds"] for s in solves]),
+                "mean_happiness": _mean([s["happiness"] for s in solves if s["success"]]),
+                "max_peak_memory_bytes": max((s.get("peak_memory_bytes", 0) for s in solves), default=None) if memory else None,
+            })
+    return {
+        "config": {
+            "sizes": {s: SIZES[s] for s in sizes},
+            "tightness": tightness,
+            "seeds": seeds,
+            "availability": availability,
+            "dept_size": dept_size,
+            "prof_load": prof_load,
+            "initializer": initializer,
+            "time_budget": time_budget,
+            "python": sys.version.split()[0],
+        },
+        "summary": summary,
+        "runs": runs,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the schedule solver on synthetic instances.")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["small", "medium"])
+    parser.add_argument("--tightness", nargs="+", type=float, default=[0.5, 0.85])
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--availability", type=float, default=0.8)
+    parser.add_argument("--dept-size", type=int, default=8)
+    parser.add_argument("--prof-load", type=int, default=2)
+    parser.add_argument("--initializer", choices=["random", "greedy"], default="random")
+    parser.add_argument("--time-budget", type=float, help="seconds per solve (default: fixed schedules)")
+    parser.add_argument("--eval-budget", type=float, default=0.5,
+                        help="seconds spent timing each constraint function")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes, args.tightness, seeds=args.seeds, availability=args.availability,
+        dept_size=args.dept_size, prof_load=args.prof_load, initializer=args.initializer,
+        time_budget=args.time_budget, eval_budget=args.eval_budget, memory=not args.no_memory,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from .models import Schedule, SolveOptions
+from .parallel import SolveResult, rank_result
+from .solver import AllData
+
+
+def _canonical(obj: Any) -> Any:
+    """
+    Plain, order-independent form of one professor/room/slot/course: every list
+    field (slot ids, elective departments) is sorted.
+    """
+    data = obj.model_dump() if isinstance(obj, BaseModel) else dict(obj)
+    return {
+        k: sorted(v, key=lambda x: json.dumps(x, sort_keys=True)) if isinstance(v, list) else v
+        for k, v in data.items()
+    }
+
+
+# Options left out of the key: the cache keeps the best result over every seed,
+# refine only chooses between returning an entry and optimizing from it, and the
+# rest change how a solve runs, not what it can find
+_UNKEYED_OPTIONS = {"seed", "cache", "refine", "workers", "tempering_workers", "profile"}
+
+
+def problem_key(all_data: AllData, options: Optional[SolveOptions] = None) -> str:
+    """
+    Content hash of a problem and the options that shape its result (backend,
+    budgets, annealer, modes...; see _UNKEYED_OPTIONS for the ones ignored).
+    Reordering entities (or the slot ids inside them) keeps the key; any change
+    to their content or to a keyed option gives a new one.
+    """
+    canon = {}
+    for field in ("professors", "rooms", "time_slots", "courses"):
+        items = [json.dumps(_canonical(x), sort_keys=True) for x in all_data.get(field, [])]
+        canon[field] = sorted(items)
+    if options is not None:
+        canon["options"] = options.model_dump(exclude=_UNKEYED_OPTIONS)
+    blob = json.dumps(canon, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _dump(result: SolveResult) -> str:
+    schedule, violations, happiness, explanations = result
+    return json.dumps({
+        "schedule": schedule.model_dump(),
+        "violations": violations,
+        "happiness": happiness,
+        "explanations": explanations,
+    })
+
+
+def _load(blob: str) -> SolveResult:
+    data = json.loads(blob)
+    return (
+        Schedule.model_validate(data["schedule"]),
+        data["violations"],
+        data["happiness"],
+        data["explanations"],
+    )
+
+
+class SolutionCache:
+    """
+    Best known result per problem_key(), most recently used first.
+    At most max_entries results stay in memory. With a path, every result is also
+    written to an SQLite file there, which outlives the process and is consulted
+    on an in-memory miss.
+    A result only replaces a cached one when it ranks higher (fewer violations,
+    then more happiness), so repeated solves can only improve an entry.
+    An entry with violations is kept as a start for later solves, but get()
+    counts it as a miss: it is never a finished answer.
+    """
+
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, SolveResult]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+            self._db.commit()
+
+    def _remember(self, key: str, result: SolveResult) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[SolveResult]:
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            return result
+        if self._db is not None:
+            row = self._db.execute("SELECT result FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                result = _load(row[0])
+                self._remember(key, result)
+                return result
+        return None
+
+    def get(self, key: str) -> Optional[SolveResult]:
+        with self._lock:
+            result = self._lookup(key)
+            if result is None or result[1]:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, key: str, result: SolveResult) -> bool:
+        """
+        Store result unless a better one is already cached. Returns whether it was stored.
+        """
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None and rank_result(cached) >= rank_result(result):
+                return False
+            self._remember(key, result)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO solutions (key, result) VALUES (?, ?)", (key, _dump(result)))
+                self._db.commit()
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM solutions")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+            }
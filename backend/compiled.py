@@ -0,0 +1,276 @@
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .models import Schedule
+from .constraints import AllData, _get_attr, _as_str, _room_building
+
+# domains imports this module; the name is only needed for annotations
+if TYPE_CHECKING:
+    from .domains import Domains
+
+# A schedule in compiled form: room index and slot index per course, -1 when unassigned
+Assignment = Tuple[array, array]
+
+
+class CompiledProblem:
+    """
+    Dense integer-indexed view of the problem, built once per solve.
+    Courses, rooms, slots, professors, departments, days and buildings are numbered
+    0..n-1; the static parts of the hard and soft constraints are precomputed into
+    flat course x room, course x slot and room x slot tables.
+    Student clashes between departments are precomputed into a course-conflict
+    graph: a curriculum is a department's own courses plus every course listing it
+    in is_elective_for, and two courses of different departments conflict when they
+    share a curriculum. `conflicts[c]` is that neighbourhood as a bitset over course
+    indices and `conflict_adj[c]` as an index array.
+    """
+
+    def __init__(self, all_data: AllData):
+        courses_list = all_data.get("courses") or []
+        profs_list = all_data.get("professors") or []
+        rooms_list = all_data.get("rooms") or []
+        times_list = all_data.get("time_slots") or []
+
+        # Same last-one-wins lookups as constraints.py
+        course_by_name: Dict[str, Any] = {}
+        for c in courses_list:
+            name = _get_attr(c, "name")
+            if name:
+                course_by_name[_as_str(name)] = c
+        prof_by_name: Dict[str, Any] = {}
+        for p in profs_list:
+            name = _get_attr(p, "name")
+            if name:
+                prof_by_name[_as_str(name)] = p
+        room_by_name: Dict[str, Any] = {}
+        for r in rooms_list:
+            name = _get_attr(r, "name")
+            if name:
+                room_by_name[_as_str(name)] = r
+        slot_by_id: Dict[Any, Any] = {}
+        for t in times_list:
+            sid = _get_attr(t, "slot_id")
+            if sid is not None:
+                slot_by_id[sid] = t
+
+        self.course_names: List[str] = list(course_by_name)
+        self.room_names: List[str] = list(room_by_name)
+        self.slot_ids: List[Any] = list(slot_by_id)
+        self.course_index: Dict[str, int] = {n: i for i, n in enumerate(self.course_names)}
+        self.room_index: Dict[str, int] = {n: i for i, n in enumerate(self.room_names)}
+        self.slot_index: Dict[Any, int] = {s: i for i, s in enumerate(self.slot_ids)}
+        C, R, S = len(self.course_names), len(self.room_names), len(self.slot_ids)
+        self.n_courses, self.n_rooms, self.n_slots = C, R, S
+
+        # Professors named by courses but missing from the professor list still get an
+        # index, so they take part in multi-booking checks like they do in constraints.py
+        self.prof_names: List[str] = list(prof_by_name)
+        self.dept_names: List[str] = []
+        prof_ids: Dict[str, int] = {n: i for i, n in enumerate(self.prof_names)}
+        dept_ids: Dict[str, int] = {}
+
+        self.enrollment = array("i", [0] * C)
+        self.course_prof = array("i", [-1] * C)
+        self.course_dept = array("i", [-1] * C)
+        for ci, name in enumerate(self.course_names):
+            c = course_by_name[name]
+            self.enrollment[ci] = int(_get_attr(c, "enrollment") or 0)
+            prof_name = _as_str(_get_attr(c, "professor") or "")
+            if prof_name:
+                if prof_name not in prof_ids:
+                    prof_ids[prof_name] = len(self.prof_names)
+                    self.prof_names.append(prof_name)
+                self.course_prof[ci] = prof_ids[prof_name]
+            dept = _as_str(_get_attr(c, "department") or "")
+            if dept:
+                if dept not in dept_ids:
+                    dept_ids[dept] = len(self.dept_names)
+                    self.dept_names.append(dept)
+                self.course_dept[ci] = dept_ids[dept]
+        P, D = len(self.prof_names), len(self.dept_names)
+        self.n_profs, self.n_depts = P, D
+        self.prof_known = bytearray(1 if n in prof_by_name else 0 for n in self.prof_names)
+
+        # Curricula: only departments that some course is an elective for; the rest
+        # are plain departments, already covered by the department clash
+        self.curriculum_names: List[str] = []
+        curriculum_ids: Dict[str, int] = {}
+        course_electives: List[List[int]] = []
+        for name in self.course_names:
+            electives: List[int] = []
+            for dept in _get_attr(course_by_name[name], "is_elective_for") or []:
+                dept = _as_str(dept)
+                if not dept:
+                    continue
+                if dept not in curriculum_ids:
+                    curriculum_ids[dept] = len(self.curriculum_names)
+                    self.curriculum_names.append(dept)
+                if curriculum_ids[dept] not in electives:
+                    electives.append(curriculum_ids[dept])
+            course_electives.append(electives)
+
+        self.prof_courses: List[array] = [array("i") for _ in range(P)]
+        self.dept_courses: List[array] = [array("i") for _ in range(D)]
+        for ci in range(C):
+            if self.course_prof[ci] >= 0:
+                self.prof_courses[self.course_prof[ci]].append(ci)
+            if self.course_dept[ci] >= 0:
+                self.dept_courses[self.course_dept[ci]].append(ci)
+
+        self.curriculum_courses: List[array] = []
+        for name in self.curriculum_names:
+            d = dept_ids.get(name)
+            self.curriculum_courses.append(array("i", self.dept_courses[d]) if d is not None else array("i"))
+        for ci, electives in enumerate(course_electives):
+            for k in electives:
+                if self.course_dept[ci] < 0 or self.dept_names[self.course_dept[ci]] != self.curriculum_names[k]:
+                    self.curriculum_courses[k].append(ci)
+        self._build_conflicts()
+
+        self.capacity = array("i", [int(_get_attr(room_by_name[n], "capacity") or 0) for n in self.room_names])
+
+        self.day_names: List[str] = []
+        self.slot_day = array("i", [-1] * S)
+        for si, sid in enumerate(self.slot_ids):
+            day = _get_attr(slot_by_id[sid], "day")
+            if day is not None:
+                day = _as_str(day).lower()
+                if day not in self.day_names:
+                    self.day_names.append(day)
+                self.slot_day[si] = self.day_names.index(day)
+
+        self.building_names: List[str] = []
+        self.room_building = array("i", [0] * R)
+        for ri, name in enumerate(self.room_names):
+            building = _room_building(name)
+            if building not in self.building_names:
+                self.building_names.append(building)
+            self.room_building[ri] = self.building_names.index(building)
+        # Only non-empty building prefixes earn the venue bonus
+        self.building_named = bytearray(1 if b else 0 for b in self.building_names)
+
+        # Static hard constraints: 1 marks a violation
+        self.room_slot_bad = bytearray(R * S)
+        for ri, name in enumerate(self.room_names):
+            unavailable = set(_get_attr(room_by_name[name], "unavailable_slots") or [])
+            for si, sid in enumerate(self.slot_ids):
+                if sid in unavailable:
+                    self.room_slot_bad[ri * S + si] = 1
+
+        self.course_room_bad = bytearray(C * R)
+        self.course_room_waste = array("i", [0] * (C * R))
+        for ci in range(C):
+            for ri in range(R):
+                wasted = self.capacity[ri] - self.enrollment[ci]
+                if wasted < 0:
+                    self.course_room_bad[ci * R + ri] = 1
+                else:
+                    self.course_room_waste[ci * R + ri] = wasted
+
+        self.course_slot_bad = bytearray(C * S)
+        self.course_slot_pref = array("i", [0] * (C * S))
+        for ci in range(C):
+            p = self.course_prof[ci]
+            if p < 0:
+                continue
+            prof = prof_by_name.get(self.prof_names[p])
+            if prof is None:
+                # Unknown professor: every slotted placement is a violation
+                for si in range(S):
+                    self.course_slot_bad[ci * S + si] = 1
+                continue
+            unavailable = set(_get_attr(prof, "unavailable_slots") or [])
+            preferred = set(_get_attr(prof, "preferred_slots") or [])
+            hates = set(_get_attr(prof, "hates_slots") or [])
+            for si, sid in enumerate(self.slot_ids):
+                if sid in unavailable:
+                    self.course_slot_bad[ci * S + si] = 1
+                pref = 0
+                if sid in preferred:
+                    pref += 20
+                if sid in hates:
+                    pref -= 100
+                self.course_slot_pref[ci * S + si] = pref
+
+        self._domains = None
+
+    def _build_conflicts(self) -> None:
+        """
+        Course-conflict graph from the curricula. Each curriculum becomes one bitset;
+        a course's neighbourhood is the union of its curricula minus itself and its
+        own department (same-department pairs are the department clash).
+        """
+        C = self.n_courses
+        dept_mask = [0] * self.n_depts
+        for d, members in enumerate(self.dept_courses):
+            for ci in members:
+                dept_mask[d] |= 1 << ci
+        course_curricula: List[List[int]] = [[] for _ in range(C)]
+        curriculum_mask = [0] * len(self.curriculum_names)
+        for k, members in enumerate(self.curriculum_courses):
+            for ci in members:
+                curriculum_mask[k] |= 1 << ci
+                course_curricula[ci].append(k)
+
+        self.conflicts: List[int] = [0] * C
+        self.conflict_adj: List[array] = [array("i") for _ in range(C)]
+        for ci in range(C):
+            if not course_curricula[ci]:
+                continue
+            bits = 0
+            for k in course_curricula[ci]:
+                bits |= curriculum_mask[k]
+            d = self.course_dept[ci]
+            bits &= ~((dept_mask[d] if d >= 0 else 0) | (1 << ci))
+            self.conflicts[ci] = bits
+            self.conflict_adj[ci] = array("i", sorted({
+                o for k in course_curricula[ci] for o in self.curriculum_courses[k]
+                if o != ci and (d < 0 or self.course_dept[o] != d)
+            }))
+        self.n_conflicts = sum(len(adj) for adj in self.conflict_adj) // 2
+        # The same edges, both directions, as flat (course, neighbour) arrays
+        self.conflict_src = array("i", [ci for ci in range(C) for _ in self.conflict_adj[ci]])
+        self.conflict_dst = array("i", [o for adj in self.conflict_adj for o in adj])
+
+    @property
+    def domains(self) -> "Domains":
+        """
+        Feasible (room, slot) domains per course, built on first use.
+        """
+        if self._domains is None:
+            from .domains import Domains
+            self._domains = Domains(self)
+        return self._domains
+
+    def encode(self, schedule: Optional[Schedule]) -> Assignment:
+        """
+        Schedule -> (room index per course, slot index per course).
+        Unknown rooms/slots and missing courses become -1.
+        """
+        rooms = array("i", [-1] * self.n_courses)
+        slots = array("i", [-1] * self.n_courses)
+        raw_assigns = getattr(schedule, "assignments", {}) or {}
+        for course_name, assign in raw_assigns.items():
+            ci = self.course_index.get(_as_str(course_name))
+            if ci is None or not isinstance(assign, (list, tuple)) or len(assign) < 2:
+                continue
+            room_name, slot_id = assign[0], assign[1]
+            if room_name:
+                rooms[ci] = self.room_index.get(_as_str(room_name), -1)
+            if slot_id is not None:
+                slots[ci] = self.slot_index.get(slot_id, -1)
+        return rooms, slots
+
+    def decode(self, rooms: array, slots: array) -> Schedule:
+        sched = Schedule(assignments={})
+        for ci, name in enumerate(self.course_names):
+            r, s = rooms[ci], slots[ci]
+            sched.assignments[name] = (
+                self.room_names[r] if r >= 0 else None,
+                self.slot_ids[s] if s >= 0 else None,
+            )
+        return sched
+
+
+def compile_problem(all_data: AllData) -> CompiledProblem:
+    return CompiledProblem(all_data)
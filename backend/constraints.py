@@ -173,6 +173,42 @@ def get_hard_constraint_violations(schedule: Schedule, all_data: AllData) -> Lis
                     f"Error: Department {dept_name} is multi-booked in slot {slot_id} with courses {', '.join(cnames)}."
                 )
 
+    # Constraint 7: Curriculum clash. A curriculum is a department's own courses plus
+    # every course that is an elective for it; two of its courses from different
+    # departments cannot share a slot (same-department pairs are Constraint 6).
+    # Each clashing pair is reported once, under the first curriculum by name.
+    elective_depts = set()
+    for c in course_by_name.values():
+        for dept in _get_attr(c, "is_elective_for") or []:
+            if _as_str(dept):
+                elective_depts.add(_as_str(dept))
+    slot_curriculum_map: Dict[Any, Dict[str, List[str]]] = {}
+    if elective_depts:
+        for course_name, (room_name, slot_id) in assignments.items():
+            if slot_id is None:
+                continue
+            course = course_by_name.get(course_name)
+            if not course:
+                continue
+            curricula = {_as_str(d) for d in (_get_attr(course, "is_elective_for") or []) if _as_str(d)}
+            dept = _as_str(_get_attr(course, "department") or "")
+            if dept in elective_depts:
+                curricula.add(dept)
+            for curriculum in curricula:
+                slot_curriculum_map.setdefault(slot_id, {}).setdefault(curriculum, []).append(course_name)
+    for slot_id, curriculum_map in slot_curriculum_map.items():
+        reported = set()
+        for curriculum, cnames in sorted(curriculum_map.items()):
+            for i, a in enumerate(cnames):
+                dept_a = _as_str(_get_attr(course_by_name[a], "department") or "")
+                for b in cnames[i + 1:]:
+                    if (dept_a and dept_a == _as_str(_get_attr(course_by_name[b], "department") or "")) or (a, b) in reported:
+                        continue
+                    reported.add((a, b))
+                    violations.append(
+                        f"Error: Courses {a} and {b} clash in slot {slot_id} for {curriculum} students."
+                    )
+
     seen = set()
     deduped: List[str] = []
     for v in violations:
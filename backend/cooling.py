@@ -0,0 +1,165 @@
+import math
+import time
+from typing import Callable, Optional, Sequence, Tuple
+
+from .models import SolveOptions
+
+# A calibrated schedule starts where the average worsening move is accepted with
+# _START_ACCEPT probability and ends where the smallest one is accepted with _END_ACCEPT
+_START_ACCEPT = 0.8
+_END_ACCEPT = 0.001
+
+# Moves sampled to calibrate a schedule
+CALIBRATION_SAMPLES = 200
+
+# Under a time budget, Stage 2 cools over this share of the remaining time and
+# reheats if it is still invalid; whatever is left once valid goes to Stage 3
+VALIDITY_SHARE = 0.5
+
+# Why a loop stopped
+SCHEDULE, DEADLINE, STAGNATION = "schedule", "deadline", "stagnation"
+
+
+class Budget:
+    """
+    Stopping criteria shared by every stage of one solve: a wall-clock deadline,
+    a target happiness and a stagnation window (iterations without a new best).
+    Any of them may be None.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        target_happiness: Optional[int] = None,
+        stagnation: Optional[int] = None
+    ):
+        self.started = time.perf_counter()
+        self.seconds = seconds
+        self.deadline = self.started + max(0.0, seconds) if seconds is not None else None
+        self.target_happiness = target_happiness
+        self.stagnation = stagnation
+
+    @classmethod
+    def from_options(cls, options: SolveOptions) -> Optional["Budget"]:
+        """
+        The budget the options ask for, or None to keep the fixed schedules.
+        """
+        if options.time_budget is None and options.target_happiness is None and options.stagnation is None:
+            return None
+        return cls(options.time_budget, options.target_happiness, options.stagnation)
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def calibrate(deltas: Sequence[float]) -> Tuple[float, float]:
+    """
+    Start and end temperatures from sampled energy changes (positive = worse).
+    """
+    worse = [d for d in deltas if d > 0]
+    if not worse:
+        return 1.0, -1.0 / math.log(_END_ACCEPT)
+    start = -(sum(worse) / len(worse)) / math.log(_START_ACCEPT)
+    end = -min(worse) / math.log(_END_ACCEPT)
+    return start, min(start, end)
+
+
+class Cooling:
+    """
+    Temperature schedule and stopping rule of one annealing loop.
+    Without a time budget it is the geometric schedule the stages always used:
+    cool() multiplies the temperature by `rate` and the loop ends at min_temp or
+    max_iter. With one (see timed()), the temperature follows the clock instead,
+    falling geometrically from a calibrated start to end temperature over the
+    stage's share of the budget, optionally reheating every `segment` seconds.
+    Either way, a budget's deadline and stagnation window also end the loop;
+    `reason` says which rule did.
+    """
+
+    def __init__(
+        self,
+        temp: float,
+        rate: float,
+        min_temp: float,
+        max_iter: Optional[int] = None,
+        budget: Optional[Budget] = None
+    ):
+        self.temp = temp
+        self.rate = rate
+        self.min_temp = min_temp
+        self.max_iter = max_iter
+        self.deadline = budget.deadline if budget is not None else None
+        self.stagnation = budget.stagnation if budget is not None else None
+        self.reason = SCHEDULE
+        self._last_best = 0
+        self._timed = False
+
+    @classmethod
+    def timed(
+        cls,
+        budget: Budget,
+        sample: Callable[[], Sequence[float]],
+        seconds: float,
+        segment: Optional[float] = None
+    ) -> "Cooling":
+        """
+        Clock-driven schedule over `seconds`, calibrated from sample() (energy
+        changes of random moves). With a segment, the schedule restarts from the
+        start temperature every `segment` seconds until the deadline.
+        """
+        start, end = calibrate(sample())
+        cooling = cls(start, 1.0, 0.0, budget=budget)
+        cooling.deadline = min(budget.deadline, time.perf_counter() + seconds)
+        cooling._timed = True
+        cooling._start = start
+        cooling._ratio = end / start
+        cooling._began = time.perf_counter()
+        cooling._segment = max(segment or seconds, 1e-6)
+        cooling._reheat = segment is not None
+        return cooling
+
+    def running(self, it: int) -> bool:
+        """
+        Whether the loop should run iteration `it`; refreshes the temperature.
+        """
+        if self.stagnation is not None and it - self._last_best >= self.stagnation:
+            self.reason = STAGNATION
+            return False
+        if self.deadline is not None:
+            now = time.perf_counter()
+            if now >= self.deadline:
+                self.reason = DEADLINE
+                return False
+            if self._timed:
+                frac = (now - self._began) / self._segment
+                frac = frac % 1.0 if self._reheat else min(frac, 1.0)
+                self.temp = self._start * self._ratio ** frac
+                return True
+        return self.temp > self.min_temp and (self.max_iter is None or it < self.max_iter)
+
+    def cool(self) -> None:
+        self.temp *= self.rate
+
+    def improved(self, it: int) -> None:
+        """
+        Record a new best at iteration `it` (restarts the stagnation window).
+        """
+        self._last_best = it
+
+    def describe(self, label: str) -> Optional[str]:
+        """
+        Explanation line for a loop ended by the budget, else None.
+        """
+        if self.reason == DEADLINE:
+            return f"{label}: stopped at the time budget."
+        if self.reason == STAGNATION:
+            return f"{label}: stopped after {self.stagnation} iterations without improvement."
+        return None
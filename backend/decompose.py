@@ -0,0 +1,295 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import Schedule, SolveOptions
+from .constraints import _get_attr, _as_str
+from .monitor import SolveMonitor, WorkerMonitor
+from .profiling import SolveProfile, profiled
+from .compiled import CompiledProblem, compile_problem
+from .solver import AllData, solve_and_optimize_schedule
+from .repair import repair_schedule
+
+SolveResult = Tuple[Schedule, List[str], int, List[str]]
+
+# Share of a time budget the parts get; the rest is kept for the boundary repair
+PART_SHARE = 0.8
+
+# Small components are packed into parts of about this many courses (or one
+# part per worker, if that makes more parts, and never fewer than two)
+PART_COURSES = 40
+
+# A course that fits in at most this many rooms is tied to them: the course and
+# its rooms stay in one part. Courses with more choice draw on a shared pool
+SCARCE_ROOMS = 2
+
+# How often the parent checks the monitor for a cancel while parts run, in seconds
+POLL_SECONDS = 0.1
+
+# The parent's stop event, installed in each pool process by _init_worker
+_worker_stop: Any = None
+
+
+def _init_worker(stop: Any) -> None:
+    global _worker_stop
+    _worker_stop = stop
+
+
+def _fits(problem: CompiledProblem, c: int) -> List[int]:
+    R = problem.n_rooms
+    return [r for r in range(R) if not problem.course_room_bad[c * R + r]]
+
+
+def _components(problem: CompiledProblem, rooms: bool) -> List[List[int]]:
+    """
+    Connected components of the course interaction graph, largest first. Courses
+    are joined through a shared professor, department or curriculum clash, and
+    with rooms=True also through the rooms of courses that fit in no more than
+    SCARCE_ROOMS of them.
+    """
+    C, R = problem.n_courses, problem.n_rooms
+    parent = list(range(C + (R if rooms else 0)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a: int, b: int) -> None:
+        a, b = find(a), find(b)
+        if a != b:
+            parent[b] = a
+
+    for groups in (problem.prof_courses, problem.dept_courses, problem.curriculum_courses):
+        for members in groups:
+            for c in members[1:]:
+                union(members[0], c)
+    if rooms:
+        for c in range(C):
+            fits = _fits(problem, c)
+            if len(fits) <= SCARCE_ROOMS:
+                for r in fits:
+                    union(c, C + r)
+
+    by_root: Dict[int, List[int]] = {}
+    for c in range(C):
+        by_root.setdefault(find(c), []).append(c)
+    return sorted(by_root.values(), key=len, reverse=True)
+
+
+def _pack(components: List[List[int]], bins: int) -> List[List[int]]:
+    """
+    Group components into at most `bins` parts of similar size, largest first onto
+    the smallest part. A union of independent components is still independent.
+    """
+    parts: List[List[int]] = [[] for _ in range(min(bins, len(components)))]
+    for component in components:
+        min(parts, key=len).extend(component)
+    return [sorted(p) for p in parts]
+
+
+def _share_rooms(problem: CompiledProblem, parts: List[List[int]], pin: bool) -> List[List[int]]:
+    """
+    Split the rooms between parts so that no two book the same one. With pin, the
+    rooms of a part's scarce courses (see SCARCE_ROOMS) go to that part first; for
+    independent parts no other part has a scarce course in them. The rest are
+    dealt largest first, each to the part whose largest course without a seat yet
+    is largest; a room seats one course per slot it is open. Rooms left once every
+    course has a seat go to the part with the fewest seats per course.
+    """
+    S = problem.n_slots
+    R = problem.n_rooms
+    enrollments = [sorted((problem.enrollment[c] for c in part), reverse=True) for part in parts]
+    seated = [0] * len(parts)
+    rooms: List[List[int]] = [[] for _ in parts]
+    owner: Dict[int, int] = {}
+    if pin:
+        for k, part in enumerate(parts):
+            for c in part:
+                fits = _fits(problem, c)
+                if len(fits) <= SCARCE_ROOMS:
+                    owner.update((r, k) for r in fits)
+    for r in sorted(range(R), key=lambda r: -problem.capacity[r]):
+        waiting = [k for k in range(len(parts)) if seated[k] < len(enrollments[k])]
+        if r in owner:
+            k = owner[r]
+        elif waiting:
+            k = max(waiting, key=lambda k: (enrollments[k][seated[k]], -k))
+        else:
+            k = min(range(len(parts)), key=lambda k: (seated[k] / len(parts[k]), k))
+        rooms[k].append(r)
+        seated[k] += S - sum(problem.room_slot_bad[r * S:(r + 1) * S])
+    return [sorted(rs) for rs in rooms]
+
+
+def _subproblem(all_data: AllData, problem: CompiledProblem, part: List[int], rooms: List[int]) -> AllData:
+    """
+    The courses of one part with their professors, the given rooms and every time slot.
+    """
+    names = {problem.course_names[c] for c in part}
+    courses = [c for c in all_data.get("courses") or [] if _as_str(_get_attr(c, "name")) in names]
+    profs = {_as_str(_get_attr(c, "professor") or "") for c in courses}
+    professors = [p for p in all_data.get("professors") or [] if _as_str(_get_attr(p, "name")) in profs]
+    room_names = {problem.room_names[r] for r in rooms}
+    return {
+        "courses": courses,
+        "professors": professors,
+        "rooms": [r for r in all_data.get("rooms") or [] if _as_str(_get_attr(r, "name")) in room_names],
+        "time_slots": all_data.get("time_slots") or [],
+    }
+
+
+class _PartMonitor(SolveMonitor):
+    """
+    Monitor of a part solved in-process: progress stays with the part (its
+    schedules belong to the subproblem) but the parent's cancel stops it.
+    """
+
+    def __init__(self, parent: SolveMonitor):
+        super().__init__()
+        self._parent = parent
+
+    @property
+    def cancelled(self) -> bool:
+        return self._parent.cancelled
+
+
+def _solve_part(
+    index: int,
+    data: AllData,
+    options: SolveOptions,
+    initial: Optional[Schedule],
+    profiling: bool,
+    monitor: Optional[SolveMonitor] = None
+) -> Tuple[int, SolveResult, Optional[Dict[str, Any]]]:
+    # With profiling on, each part profiles itself and ships the plain dict back.
+    # In a pool process the parent's stop event stands in for the monitor
+    profile = SolveProfile() if profiling else None
+    if monitor is None and _worker_stop is not None:
+        monitor = WorkerMonitor(_worker_stop)
+    result = solve_and_optimize_schedule(
+        data, verbose=False, options=options, monitor=monitor, initial=initial, profile=profile
+    )
+    return index, result, profile.to_dict() if profile is not None else None
+
+
+def solve_decomposed(
+    all_data: AllData,
+    options: SolveOptions,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> SolveResult:
+    """
+    Split the problem along its course interaction graph and solve the parts in
+    parallel. Components that share no professor, department, curriculum or
+    scarce room (see SCARCE_ROOMS) are independent once the rooms are shared out
+    between them. If the problem has only one such component, it is split into
+    clusters coupled through scarce rooms alone instead, which get a share of
+    the rooms too.
+    Components are packed into parts, solved with the staged pipeline on a
+    process pool and merged. A repair pass (see repair_schedule) then moves only
+    the courses in conflict at the part boundaries, such as two clusters booking
+    one room.
+    Without any split the problem is solved whole.
+    A time budget is shared: PART_SHARE for the parts, divided between the waves
+    of parts each worker runs, and the rest for the repair.
+    Cancelling the monitor drops the parts not started yet and makes the running
+    ones return their best schedule so far, which are merged as usual.
+    """
+    started = time.perf_counter()
+    with profiled(profile, "Decomposition"):
+        problem = compile_problem(all_data)
+        components = _components(problem, rooms=True)
+        shared_rooms = len(components) == 1
+        if shared_rooms:
+            components = _components(problem, rooms=False)
+    if len(components) < 2:
+        result = solve_and_optimize_schedule(
+            all_data, verbose=False, options=options, monitor=monitor, initial=initial, profile=profile
+        )
+        schedule, violations, happiness, explanations = result
+        return schedule, violations, happiness, ["Decomposition: the problem does not split; solved it whole."] + explanations
+
+    workers = max(1, options.workers or os.cpu_count() or 1)
+    parts = _pack(components, max(2, workers, math.ceil(problem.n_courses / PART_COURSES)))
+    workers = min(workers, len(parts))
+    waves = math.ceil(len(parts) / workers)
+    base = random.Random(options.seed)
+    part_options = options.model_copy(update={
+        "starts": 1,
+        "tempering_workers": 1,
+        "target_happiness": None,
+        "time_budget": options.time_budget * PART_SHARE / waves if options.time_budget is not None else None,
+    })
+    part_rooms = _share_rooms(problem, parts, pin=not shared_rooms)
+    tasks = [
+        (i, _subproblem(all_data, problem, part, part_rooms[i]),
+         part_options.model_copy(update={"seed": base.randrange(2 ** 32)}), initial, profile is not None)
+        for i, part in enumerate(parts)
+    ]
+
+    results: Dict[int, SolveResult] = {}
+
+    def finish(i: int, result: SolveResult, part_profile: Optional[Dict[str, Any]]) -> None:
+        results[i] = result
+        if profile is not None and part_profile is not None:
+            profile.merge(part_profile)
+        if monitor is not None:
+            cost = sum(len(r[1]) for r in results.values())
+            monitor.update("Decomposition", len(results), cost=cost)
+
+    if workers == 1:
+        for task in tasks:
+            finish(*_solve_part(*task, _PartMonitor(monitor) if monitor is not None else None))
+            if monitor is not None and monitor.cancelled:
+                break
+    else:
+        stop = multiprocessing.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop,))
+        try:
+            pending = {pool.submit(_solve_part, *task) for task in tasks}
+            while pending:
+                done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if not fut.cancelled():
+                        finish(*fut.result())
+                if monitor is not None and monitor.cancelled and not stop.is_set():
+                    stop.set()
+                    for fut in pending:
+                        fut.cancel()
+        finally:
+            # Running parts stop at their next progress check; none outlive the call
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    merged = Schedule(assignments={})
+    for i in sorted(results):
+        merged.assignments.update(results[i][0].assignments)
+
+    kind = "cluster(s) with a share of the rooms" if shared_rooms else "independent part(s)"
+    explanations = [
+        f"Decomposition: {len(components)} component(s) packed into {len(parts)} {kind} "
+        f"of {', '.join(str(len(p)) for p in parts)} course(s) on {workers} worker(s)."
+    ]
+    for i in sorted(results):
+        _, violations, happiness, _ = results[i]
+        explanations.append(
+            f"Decomposition: part {i + 1} ({len(parts[i])} courses) ended with "
+            f"{len(violations)} violation(s), desirability {happiness}."
+        )
+
+    # Boundary repair over the merged schedule, with whatever time is left
+    repair_options = options
+    if options.time_budget is not None:
+        left = max(options.time_budget - (time.perf_counter() - started), options.time_budget * (1 - PART_SHARE))
+        repair_options = options.model_copy(update={"time_budget": left})
+    schedule, violations, happiness, repair_notes = repair_schedule(
+        all_data, merged, repair_options, monitor=monitor, profile=profile
+    )
+    return schedule, violations, happiness, explanations + repair_notes
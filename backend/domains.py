@@ -0,0 +1,169 @@
+import random
+from array import array
+from collections import deque
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .compiled import CompiledProblem
+
+
+def _positions(bits: int, size: int) -> array:
+    # Indices of the set bits, in increasing order
+    raw = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return array("i", np.flatnonzero(np.unpackbits(raw, bitorder="little")).astype(np.intc).tobytes())
+
+
+class Domains:
+    """
+    Feasible (room, slot) pairs per course, as bitsets over flat index r * n_slots + s.
+    A pair is in the domain when the room fits the course and both the professor
+    and the room are available in the slot. The domains are then pruned with
+    arc consistency on the "different slot" constraints between courses sharing a
+    professor, department or curriculum and the "different (room, slot)" constraint between
+    all courses. `report` explains every reason the problem is infeasible outright.
+    Solver stages draw candidate placements from the domains with sample(); a
+    course with an empty domain falls back to every pair, so search still runs.
+    """
+
+    def __init__(self, problem: CompiledProblem):
+        self.problem = problem
+        C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+        self.report: List[str] = []
+        self.bits: List[int] = [0] * C
+        if not (C and R and S):
+            self.pairs: List[array] = [array("i") for _ in range(C)]
+            return
+
+        room_ok = np.frombuffer(problem.course_room_bad, dtype=np.uint8).reshape(C, R) == 0
+        slot_ok = np.frombuffer(problem.course_slot_bad, dtype=np.uint8).reshape(C, S) == 0
+        room_slot_ok = np.frombuffer(problem.room_slot_bad, dtype=np.uint8).reshape(R, S) == 0
+        for c in range(C):
+            pairs = room_ok[c][:, None] & slot_ok[c][None, :] & room_slot_ok
+            packed = np.packbits(pairs.ravel(), bitorder="little").tobytes()
+            self.bits[c] = int.from_bytes(packed, "little")
+            if not self.bits[c]:
+                self._explain_empty(c, room_ok[c], slot_ok[c], room_slot_ok)
+
+        # Bits of every room in slot s
+        self._slot_mask = [sum(1 << (r * S + s) for r in range(R)) for s in range(S)]
+        self._propagate()
+        self._check_counts()
+        self.pairs = [_positions(b, R * S) for b in self.bits]
+
+    def _explain_empty(self, c: int, room_ok: np.ndarray, slot_ok: np.ndarray, room_slot_ok: np.ndarray) -> None:
+        pr = self.problem
+        name = pr.course_names[c]
+        p = pr.course_prof[c]
+        if p >= 0 and not pr.prof_known[p]:
+            self.report.append(f"Course {name}: professor {pr.prof_names[p]} is not in the professor list.")
+        elif not room_ok.any():
+            self.report.append(f"Course {name}: no room holds its {pr.enrollment[c]} students.")
+        elif not slot_ok.any():
+            self.report.append(f"Course {name}: professor {pr.prof_names[p]} is unavailable in every slot.")
+        else:
+            self.report.append(f"Course {name}: no fitting room is available in any of its professor's slots.")
+
+    def slots_of(self, c: int) -> int:
+        """
+        Bitset of the slots that appear in course c's domain.
+        """
+        S = self.problem.n_slots
+        full = (1 << S) - 1
+        bits, out = self.bits[c], 0
+        while bits:
+            out |= bits & full
+            bits >>= S
+        return out
+
+    def _propagate(self) -> None:
+        """
+        AC-3 for not-equal constraints: a course fixed to a single slot removes it
+        from courses sharing its professor, department or curriculum, and a course fixed to a
+        single (room, slot) removes that pair from every other course.
+        """
+        pr = self.problem
+        C = pr.n_courses
+        queue = deque(c for c in range(C) if bin(self.slots_of(c)).count("1") == 1)
+        queued = set(queue)
+        while queue:
+            c = queue.popleft()
+            queued.discard(c)
+            slots = self.slots_of(c)
+            touched: List[int] = []
+            if slots and slots & (slots - 1) == 0:
+                mask = ~self._slot_mask[slots.bit_length() - 1]
+                neighbours = set()
+                p, d = pr.course_prof[c], pr.course_dept[c]
+                if p >= 0:
+                    neighbours.update(pr.prof_courses[p])
+                if d >= 0:
+                    neighbours.update(pr.dept_courses[d])
+                neighbours.update(pr.conflict_adj[c])
+                neighbours.discard(c)
+                for o in neighbours:
+                    if self.bits[o] & ~mask:
+                        self.bits[o] &= mask
+                        touched.append(o)
+            pair = self.bits[c]
+            if pair and pair & (pair - 1) == 0:
+                for o in range(C):
+                    if o != c and self.bits[o] & pair:
+                        self.bits[o] &= ~pair
+                        touched.append(o)
+            for o in touched:
+                if not self.bits[o]:
+                    self.report.append(
+                        f"Course {pr.course_names[o]}: every placement clashes with a course that has only one option."
+                    )
+                elif o not in queued and bin(self.slots_of(o)).count("1") == 1:
+                    queue.append(o)
+                    queued.add(o)
+
+    def _check_counts(self) -> None:
+        """
+        Pigeonhole checks: a professor, department or curriculum needs a distinct
+        slot for each of its courses, and all courses together need distinct
+        (room, slot) pairs.
+        """
+        pr = self.problem
+        for label, names, groups in (("Professor", pr.prof_names, pr.prof_courses),
+                                     ("Department", pr.dept_names, pr.dept_courses),
+                                     ("Curriculum", pr.curriculum_names, pr.curriculum_courses)):
+            for i, members in enumerate(groups):
+                if len(members) < 2:
+                    continue
+                union = 0
+                for c in members:
+                    union |= self.slots_of(c)
+                free = bin(union).count("1")
+                if free < len(members):
+                    self.report.append(
+                        f"{label} {names[i]} has {len(members)} courses but only {free} usable slot(s)."
+                    )
+        union = 0
+        for b in self.bits:
+            union |= b
+        usable = bin(union).count("1")
+        if usable < pr.n_courses:
+            self.report.append(f"Only {usable} usable (room, slot) pairs for {pr.n_courses} courses.")
+
+    @property
+    def feasible(self) -> bool:
+        """
+        False when the problem is proven to have no valid schedule.
+        """
+        return not self.report
+
+    def sizes(self) -> Dict[str, int]:
+        return {self.problem.course_names[c]: len(p) for c, p in enumerate(self.pairs)}
+
+    def sample(self, c: int, rng: random.Random) -> Tuple[int, int]:
+        """
+        A random (room, slot) from course c's domain, or from all pairs if it is empty.
+        """
+        pairs = self.pairs[c]
+        S = self.problem.n_slots
+        if pairs:
+            return divmod(pairs[rng.randrange(len(pairs))], S)
+        return rng.randrange(self.problem.n_rooms), rng.randrange(S)
@@ -0,0 +1,606 @@
+import random
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .compiled import Assignment, CompiledProblem
+
+# Upper bound on (courses x rooms x slots) cells evaluated per batch in best_move
+_BATCH_CELLS = 1 << 20
+_STAY = np.iinfo(np.int32).max
+
+
+class ConstraintEngine:
+    """
+    Incremental version of get_hard_constraint_violations on a compiled problem.
+    Keeps per-slot occupancy counters for professors, rooms and departments so the
+    cost change of moving a single course can be priced in O(1).
+    `cost` always equals len(get_hard_constraint_violations(...)) of the decoded schedule.
+    It also keeps the live set of courses taking part in at least one violation,
+    which sample_conflicted() draws from in O(1). Each bucket stores the sum of its
+    course indices next to its count, so when a bucket drops to (or grows from) a
+    single course that course is known without scanning.
+    Curriculum clashes use the problem's course-conflict bitsets against a bitset of
+    the courses in each slot, so pricing one is a single AND and a popcount.
+    The engine works on the given rooms/slots arrays in place; pass copies to keep the originals.
+    """
+
+    def __init__(self, problem: CompiledProblem, rooms: array, slots: array):
+        self.problem = problem
+        self.rooms = rooms
+        self.slots = slots
+        S = problem.n_slots
+        self._prof_slot = [0] * (problem.n_profs * S)
+        self._room_slot = [0] * (problem.n_rooms * S)
+        self._dept_slot = [0] * (problem.n_depts * S)
+        self._prof_sum = [0] * (problem.n_profs * S)
+        self._room_sum = [0] * (problem.n_rooms * S)
+        self._dept_sum = [0] * (problem.n_depts * S)
+
+        self.cost = 0
+        for c in range(problem.n_courses):
+            r, s = self.rooms[c], self.slots[c]
+            self.cost += self._static_cost(c, r, s)
+            if s < 0:
+                continue
+            p, d = problem.course_prof[c], problem.course_dept[c]
+            if p >= 0:
+                self._prof_slot[p * S + s] += 1
+                self._prof_sum[p * S + s] += c
+            if r >= 0:
+                self._room_slot[r * S + s] += 1
+                self._room_sum[r * S + s] += c
+            if d >= 0:
+                self._dept_slot[d * S + s] += 1
+                self._dept_sum[d * S + s] += c
+
+        # Every bucket holding 2+ courses is one multi-booking violation
+        for counter in (self._prof_slot, self._room_slot, self._dept_slot):
+            self.cost += sum(1 for n in counter if n > 1)
+
+        # Courses per slot as bitsets; only kept when some courses conflict
+        self._clashes = problem.n_conflicts > 0
+        self._slot_bits = [0] * S
+        if self._clashes:
+            for c in range(problem.n_courses):
+                if self.slots[c] >= 0:
+                    self._slot_bits[self.slots[c]] |= 1 << c
+            # Every co-slotted conflicting pair is one violation, seen from both ends
+            self.cost += sum(self._clash(c, self.slots[c]) for c in range(problem.n_courses)) // 2
+
+        # Violations each course takes part in, and the set of courses with any
+        self._involved = [0] * problem.n_courses
+        self._conflicted: List[int] = []
+        self._conflict_pos = [-1] * problem.n_courses
+        for c in range(problem.n_courses):
+            self._bump(c, self._involvement(c, self.rooms[c], self.slots[c]))
+
+    def _static_cost(self, c: int, r: int, s: int) -> int:
+        """
+        Violations that depend only on this course's own (room, slot):
+        incomplete assignment, capacity, professor and room availability.
+        """
+        pr = self.problem
+        if r < 0 or s < 0:
+            cost = 1
+            if r >= 0:
+                cost += pr.course_room_bad[c * pr.n_rooms + r]
+            if s >= 0:
+                cost += pr.course_slot_bad[c * pr.n_slots + s]
+            return cost
+        return (
+            pr.course_room_bad[c * pr.n_rooms + r]
+            + pr.course_slot_bad[c * pr.n_slots + s]
+            + pr.room_slot_bad[r * pr.n_slots + s]
+        )
+
+    def _clash(self, c: int, s: int) -> int:
+        # Courses in slot s that course c has a curriculum clash with
+        if s < 0:
+            return 0
+        return bin(self.problem.conflicts[c] & self._slot_bits[s]).count("1")
+
+    def delta(self, c: int, r: int, s: int) -> int:
+        """
+        Cost change of moving course c to (room r, slot s), without applying it.
+        """
+        r0, s0 = self.rooms[c], self.slots[c]
+        d = self._static_cost(c, r, s) - self._static_cost(c, r0, s0)
+        S = self.problem.n_slots
+
+        if s0 != s:
+            p = self.problem.course_prof[c]
+            if p >= 0:
+                if s0 >= 0 and self._prof_slot[p * S + s0] == 2:
+                    d -= 1
+                if s >= 0 and self._prof_slot[p * S + s] == 1:
+                    d += 1
+            dept = self.problem.course_dept[c]
+            if dept >= 0:
+                if s0 >= 0 and self._dept_slot[dept * S + s0] == 2:
+                    d -= 1
+                if s >= 0 and self._dept_slot[dept * S + s] == 1:
+                    d += 1
+            if self._clashes and self.problem.conflicts[c]:
+                d += self._clash(c, s) - self._clash(c, s0)
+
+        if s0 != s or r0 != r:
+            if r0 >= 0 and s0 >= 0 and self._room_slot[r0 * S + s0] == 2:
+                d -= 1
+            if r >= 0 and s >= 0 and self._room_slot[r * S + s] == 1:
+                d += 1
+        return d
+
+    def _involvement(self, c: int, r: int, s: int) -> int:
+        # Violations course c takes part in at (r, s), given the current counters
+        n = self._static_cost(c, r, s)
+        if s >= 0:
+            S = self.problem.n_slots
+            p, d = self.problem.course_prof[c], self.problem.course_dept[c]
+            n += p >= 0 and self._prof_slot[p * S + s] > 1
+            n += r >= 0 and self._room_slot[r * S + s] > 1
+            n += d >= 0 and self._dept_slot[d * S + s] > 1
+            if self._clashes:
+                n += self._clash(c, s)
+        return n
+
+    def _bump(self, c: int, k: int) -> None:
+        n = self._involved[c] + k
+        self._involved[c] = n
+        pos = self._conflict_pos[c]
+        if n > 0 and pos < 0:
+            self._conflict_pos[c] = len(self._conflicted)
+            self._conflicted.append(c)
+        elif n == 0 and pos >= 0:
+            last = self._conflicted.pop()
+            if last != c:
+                self._conflicted[pos] = last
+                self._conflict_pos[last] = pos
+            self._conflict_pos[c] = -1
+
+    def _leave(self, counter: List[int], sums: List[int], b: int, c: int) -> None:
+        counter[b] -= 1
+        sums[b] -= c
+        if counter[b] == 1:
+            # The course left behind is no longer double-booked here
+            self._bump(sums[b], -1)
+
+    def _join(self, counter: List[int], sums: List[int], b: int, c: int) -> None:
+        if counter[b] == 1:
+            # The course already here becomes double-booked
+            self._bump(sums[b], 1)
+        counter[b] += 1
+        sums[b] += c
+
+    @property
+    def n_conflicted(self) -> int:
+        return len(self._conflicted)
+
+    def conflicted(self, c: int) -> bool:
+        """
+        Whether course c takes part in at least one violation.
+        """
+        return self._involved[c] > 0
+
+    def room_occupant(self, r: int, s: int) -> int:
+        """
+        The course alone in room r at slot s, or -1 if the room is free or double-booked.
+        """
+        b = r * self.problem.n_slots + s
+        return self._room_sum[b] if self._room_slot[b] == 1 else -1
+
+    def sample_conflicted(self, rng: random.Random) -> int:
+        """
+        A uniformly random course among those in violation, or -1 if there is none.
+        """
+        if not self._conflicted:
+            return -1
+        return self._conflicted[rng.randrange(len(self._conflicted))]
+
+    def move(self, c: int, r: int, s: int) -> int:
+        """
+        Apply the move and return the cost change.
+        """
+        d = self._update(c, r, s)
+        self.rooms[c] = r
+        self.slots[c] = s
+        return d
+
+    def _update(self, c: int, r: int, s: int) -> int:
+        # Counters and cost only; the caller writes rooms/slots (see ScheduleState)
+        d = self.delta(c, r, s)
+        r0, s0 = self.rooms[c], self.slots[c]
+        S = self.problem.n_slots
+        p, dept = self.problem.course_prof[c], self.problem.course_dept[c]
+        if s0 >= 0:
+            if p >= 0:
+                self._leave(self._prof_slot, self._prof_sum, p * S + s0, c)
+            if r0 >= 0:
+                self._leave(self._room_slot, self._room_sum, r0 * S + s0, c)
+            if dept >= 0:
+                self._leave(self._dept_slot, self._dept_sum, dept * S + s0, c)
+        if s >= 0:
+            if p >= 0:
+                self._join(self._prof_slot, self._prof_sum, p * S + s, c)
+            if r >= 0:
+                self._join(self._room_slot, self._room_sum, r * S + s, c)
+            if dept >= 0:
+                self._join(self._dept_slot, self._dept_sum, dept * S + s, c)
+        if self._clashes and s0 != s:
+            self._move_clashes(c, s0, s)
+        self._bump(c, self._involvement(c, r, s) - self._involved[c])
+        self.cost += d
+        return d
+
+    def _move_clashes(self, c: int, s0: int, s: int) -> None:
+        # Course c leaves its clashes in s0 and joins those in s (its own count is
+        # refreshed by the caller)
+        conflicts, bit = self.problem.conflicts[c], 1 << c
+        for slot, k in ((s0, -1), (s, 1)):
+            if slot < 0:
+                continue
+            self._slot_bits[slot] ^= bit
+            hits = conflicts & self._slot_bits[slot]
+            while hits:
+                low = hits & -hits
+                self._bump(low.bit_length() - 1, k)
+                hits ^= low
+
+    def best_move(self, courses: Optional[Sequence[int]] = None) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Best-improvement scan over every (course, room, slot) move except staying put,
+        optionally only for the given courses.
+        Deltas are built as a (courses x rooms x slots) tensor in batches from the
+        static tables and the current occupancy counters, so the scan is a handful of
+        array operations. Returns (delta, course, room, slot) for the first minimal
+        move in course/room/slot order, or None when there is nothing to try.
+        """
+        pr = self.problem
+        C, R, S = pr.n_courses, pr.n_rooms, pr.n_slots
+        if not (C and R and S):
+            return None
+        order = np.arange(C) if courses is None else np.unique(np.asarray(courses, dtype=np.intp))
+        if not len(order):
+            return None
+
+        course_room_bad = np.frombuffer(pr.course_room_bad, dtype=np.uint8).reshape(C, R).astype(np.int32)
+        course_slot_bad = np.frombuffer(pr.course_slot_bad, dtype=np.uint8).reshape(C, S).astype(np.int32)
+        room_slot_bad = np.frombuffer(pr.room_slot_bad, dtype=np.uint8).reshape(R, S).astype(np.int32)
+        course_prof = np.frombuffer(pr.course_prof, dtype=np.intc)
+        course_dept = np.frombuffer(pr.course_dept, dtype=np.intc)
+        rooms = np.frombuffer(self.rooms, dtype=np.intc)
+        slots = np.frombuffer(self.slots, dtype=np.intc)
+
+        room_slot = np.array(self._room_slot, dtype=np.int32).reshape(R, S)
+        # Joining a bucket that holds exactly one course creates a violation
+        room_join = (room_slot == 1).astype(np.int32)
+        slot_counters = (
+            (course_prof, np.array(self._prof_slot, dtype=np.int32).reshape(pr.n_profs, S)),
+            (course_dept, np.array(self._dept_slot, dtype=np.int32).reshape(pr.n_depts, S)),
+        )
+
+        # Curriculum clashes per (course, slot), counted over the conflict edges
+        clash = None
+        if self._clashes:
+            src = np.frombuffer(pr.conflict_src, dtype=np.intc)
+            dst = np.frombuffer(pr.conflict_dst, dtype=np.intc)
+            at = slots[dst]
+            placed_dst = at >= 0
+            clash = np.bincount(
+                src[placed_dst] * S + at[placed_dst], minlength=C * S
+            ).astype(np.int32).reshape(C, S)
+
+        best = None
+        chunk = max(1, _BATCH_CELLS // (R * S))
+        for start in range(0, len(order), chunk):
+            idx = order[start:start + chunk]
+            K = len(idx)
+            r0, s0 = rooms[idx], slots[idx]
+            placed = (r0 >= 0) & (s0 >= 0)
+            has_room, has_slot = r0 >= 0, s0 >= 0
+
+            # Static cost of the current placement, as in _static_cost
+            old = (~placed).astype(np.int32)
+            old[has_room] += course_room_bad[idx[has_room], r0[has_room]]
+            old[has_slot] += course_slot_bad[idx[has_slot], s0[has_slot]]
+            old[placed] += room_slot_bad[r0[placed], s0[placed]]
+
+            deltas = (
+                course_room_bad[idx][:, :, None]
+                + course_slot_bad[idx][:, None, :]
+                + room_slot_bad[None, :, :]
+                - old[:, None, None]
+            )
+
+            # Professor and department buckets only change when the slot does
+            slot_term = np.zeros((K, S), dtype=np.int32)
+            for owner, counter in slot_counters:
+                own = owner[idx]
+                has = own >= 0
+                slot_term[has] += counter[own[has]] == 1
+                rows = np.nonzero(has & has_slot)[0]
+                slot_term[rows] -= (counter[own[rows], s0[rows]] == 2)[:, None]
+            rows = np.nonzero(has_slot)[0]
+            if clash is not None:
+                slot_term += clash[idx]
+                slot_term[rows] -= clash[idx[rows], s0[rows]][:, None]
+            slot_term[rows, s0[rows]] = 0
+            deltas += slot_term[:, None, :]
+
+            rows = np.nonzero(placed)[0]
+            room_leave = np.zeros(K, dtype=np.int32)
+            room_leave[rows] = room_slot[r0[rows], s0[rows]] == 2
+            deltas += room_join[None, :, :] - room_leave[:, None, None]
+            # Staying put is not a move
+            deltas[rows, r0[rows], s0[rows]] = _STAY
+
+            flat = int(np.argmin(deltas))
+            k, rest = divmod(flat, R * S)
+            d = int(deltas.flat[flat])
+            if d != _STAY and (best is None or d < best[0]):
+                best = (d, int(idx[k]), rest // S, rest % S)
+        return best
+
+
+class HappinessScorer:
+    """
+    Incremental version of calculate_happiness_score on a compiled problem.
+    Keeps per-professor day and building histograms and per-department slot
+    histograms, so the score change of moving one course only touches that
+    course, its professor and its department.
+    Every course is treated as present in the schedule (the solvers guarantee this
+    through _ensure_all_courses). Like ConstraintEngine, it works on rooms/slots in place.
+    """
+
+    def __init__(self, problem: CompiledProblem, rooms: array, slots: array):
+        self.problem = problem
+        self.rooms = rooms
+        self.slots = slots
+        P, S = problem.n_profs, problem.n_slots
+        self._n_days = len(problem.day_names)
+        self._n_buildings = len(problem.building_names)
+        # Only professors from the professor list take part in Soft 2/3/5
+        self._prof = array("i", [p if p >= 0 and problem.prof_known[p] else -1 for p in problem.course_prof])
+
+        self._prof_days = [0] * (P * self._n_days)
+        self._prof_n_days = [0] * P
+        self._prof_buildings = [0] * (P * self._n_buildings)
+        self._prof_n_buildings = [0] * P
+        # Sum of the distinct buildings in use: equals the building when only one is
+        self._prof_building_sum = [0] * P
+        # Unslotted courses share the extra column S (they are "in the same slot")
+        self._dept_slots = [0] * (problem.n_depts * (S + 1))
+
+        # Start with the same baseline as calculate_happiness_score
+        self.score = 1000
+        for c in range(problem.n_courses):
+            r, s = self.rooms[c], self.slots[c]
+            self.score += self._static_score(c, r, s)
+            p = self._prof[c]
+            if p >= 0:
+                day = problem.slot_day[s] if s >= 0 else -1
+                if day >= 0:
+                    i = p * self._n_days + day
+                    if self._prof_days[i] == 0:
+                        self._prof_n_days[p] += 1
+                    self._prof_days[i] += 1
+                if r >= 0:
+                    b = problem.room_building[r]
+                    i = p * self._n_buildings + b
+                    if self._prof_buildings[i] == 0:
+                        self._prof_n_buildings[p] += 1
+                        self._prof_building_sum[p] += b
+                    self._prof_buildings[i] += 1
+            dept = problem.course_dept[c]
+            if dept >= 0:
+                self._dept_slots[dept * (S + 1) + (s if s >= 0 else S)] += 1
+
+        for p in range(P):
+            if self._prof_n_days[p] >= 2:
+                self.score += 40
+            self.score += self._venue_bonus(p, self._prof_n_buildings[p], self._prof_building_sum[p])
+        for dept in range(problem.n_depts):
+            counts = self._dept_slots[dept * (S + 1):(dept + 1) * (S + 1)]
+            n = sum(counts)
+            same = sum(k * (k - 1) // 2 for k in counts)
+            self.score += 30 * (n * (n - 1) // 2 - same)
+
+    def _venue_bonus(self, p: int, n_buildings: int, building: int) -> int:
+        # Soft 5: every course of a multi-course professor sits in one named building
+        if n_buildings == 1 and len(self.problem.prof_courses[p]) > 1 and self.problem.building_named[building]:
+            return 30
+        return 0
+
+    def _static_score(self, c: int, r: int, s: int) -> int:
+        """
+        Soft 1 (wasted seats) and Soft 2 (professor preferences) for one course.
+        """
+        pr = self.problem
+        score = 0
+        if r >= 0:
+            score -= pr.course_room_waste[c * pr.n_rooms + r]
+        if s >= 0:
+            score += pr.course_slot_pref[c * pr.n_slots + s]
+        return score
+
+    def delta(self, c: int, r: int, s: int) -> int:
+        """
+        Score change of moving course c to (room r, slot s), without applying it.
+        """
+        pr = self.problem
+        r0, s0 = self.rooms[c], self.slots[c]
+        d = self._static_score(c, r, s) - self._static_score(c, r0, s0)
+
+        p = self._prof[c]
+        if p >= 0:
+            # Soft 3: professor balance
+            day0 = pr.slot_day[s0] if s0 >= 0 else -1
+            day1 = pr.slot_day[s] if s >= 0 else -1
+            if day0 != day1:
+                n = self._prof_n_days[p]
+                n_after = n
+                if day0 >= 0 and self._prof_days[p * self._n_days + day0] == 1:
+                    n_after -= 1
+                if day1 >= 0 and self._prof_days[p * self._n_days + day1] == 0:
+                    n_after += 1
+                d += 40 * ((n_after >= 2) - (n >= 2))
+
+            # Soft 5: venue efficiency
+            b0 = pr.room_building[r0] if r0 >= 0 else -1
+            b1 = pr.room_building[r] if r >= 0 else -1
+            if b0 != b1:
+                n = self._prof_n_buildings[p]
+                total = self._prof_building_sum[p]
+                n_after, total_after = n, total
+                if b0 >= 0 and self._prof_buildings[p * self._n_buildings + b0] == 1:
+                    n_after -= 1
+                    total_after -= b0
+                if b1 >= 0 and self._prof_buildings[p * self._n_buildings + b1] == 0:
+                    n_after += 1
+                    total_after += b1
+                d += self._venue_bonus(p, n_after, total_after) - self._venue_bonus(p, n, total)
+
+        dept = pr.course_dept[c]
+        if dept >= 0 and s0 != s:
+            # Soft 4: department spread, +30 per pair of dept courses in different slots
+            base = dept * (pr.n_slots + 1)
+            k0 = self._dept_slots[base + (s0 if s0 >= 0 else pr.n_slots)]
+            k1 = self._dept_slots[base + (s if s >= 0 else pr.n_slots)]
+            d += 30 * ((k0 - 1) - k1)
+
+        return d
+
+    def move(self, c: int, r: int, s: int) -> int:
+        """
+        Apply the move and return the score change.
+        """
+        d = self._update(c, r, s)
+        self.rooms[c] = r
+        self.slots[c] = s
+        return d
+
+    def _update(self, c: int, r: int, s: int) -> int:
+        d = self.delta(c, r, s)
+        pr = self.problem
+        r0, s0 = self.rooms[c], self.slots[c]
+        p = self._prof[c]
+        if p >= 0:
+            day0 = pr.slot_day[s0] if s0 >= 0 else -1
+            day1 = pr.slot_day[s] if s >= 0 else -1
+            if day0 >= 0:
+                i = p * self._n_days + day0
+                self._prof_days[i] -= 1
+                if self._prof_days[i] == 0:
+                    self._prof_n_days[p] -= 1
+            if day1 >= 0:
+                i = p * self._n_days + day1
+                if self._prof_days[i] == 0:
+                    self._prof_n_days[p] += 1
+                self._prof_days[i] += 1
+
+            b0 = pr.room_building[r0] if r0 >= 0 else -1
+            b1 = pr.room_building[r] if r >= 0 else -1
+            if b0 >= 0:
+                i = p * self._n_buildings + b0
+                self._prof_buildings[i] -= 1
+                if self._prof_buildings[i] == 0:
+                    self._prof_n_buildings[p] -= 1
+                    self._prof_building_sum[p] -= b0
+            if b1 >= 0:
+                i = p * self._n_buildings + b1
+                if self._prof_buildings[i] == 0:
+                    self._prof_n_buildings[p] += 1
+                    self._prof_building_sum[p] += b1
+                self._prof_buildings[i] += 1
+
+        dept = pr.course_dept[c]
+        if dept >= 0:
+            base = dept * (pr.n_slots + 1)
+            self._dept_slots[base + (s0 if s0 >= 0 else pr.n_slots)] -= 1
+            self._dept_slots[base + (s if s >= 0 else pr.n_slots)] += 1
+
+        self.score += d
+        return d
+
+
+class ScheduleState:
+    """
+    Mutable schedule in compiled form with a move/undo API.
+    One pair of rooms/slots arrays is shared by the hard-constraint engine and,
+    when requested, the happiness scorer. Single moves are priced with
+    cost_delta/score_delta before anything changes; compound moves can be applied
+    with apply(), evaluated through cost/score and undone with revert(mark).
+    Nothing is copied unless snapshot() is called.
+    """
+
+    def __init__(self, problem: CompiledProblem, assignment: Assignment, track_happiness: bool = False):
+        self.problem = problem
+        self.rooms = array("i", assignment[0])
+        self.slots = array("i", assignment[1])
+        self.hard = ConstraintEngine(problem, self.rooms, self.slots)
+        self.soft: Optional[HappinessScorer] = (
+            HappinessScorer(problem, self.rooms, self.slots) if track_happiness else None
+        )
+        # Flat (course, old room, old slot) triples, so journaling allocates no tuples
+        self._journal: List[int] = []
+
+    @property
+    def cost(self) -> int:
+        return self.hard.cost
+
+    @property
+    def score(self) -> int:
+        return self.soft.score if self.soft is not None else 0
+
+    def cost_delta(self, c: int, r: int, s: int) -> int:
+        return self.hard.delta(c, r, s)
+
+    def score_delta(self, c: int, r: int, s: int) -> int:
+        return self.soft.delta(c, r, s)
+
+    def apply(self, c: int, r: int, s: int) -> None:
+        """
+        Move course c to (room r, slot s) and record the old placement for revert().
+        """
+        self._journal.append(c)
+        self._journal.append(self.rooms[c])
+        self._journal.append(self.slots[c])
+        self._place(c, r, s)
+
+    def _place(self, c: int, r: int, s: int) -> None:
+        self.hard._update(c, r, s)
+        if self.soft is not None:
+            self.soft._update(c, r, s)
+        self.rooms[c] = r
+        self.slots[c] = s
+
+    def mark(self) -> int:
+        return len(self._journal)
+
+    def revert(self, mark: int = 0) -> None:
+        """
+        Undo every move applied since mark (default: since the last commit).
+        """
+        journal = self._journal
+        while len(journal) > mark:
+            s0 = journal.pop()
+            r0 = journal.pop()
+            c = journal.pop()
+            self._place(c, r0, s0)
+
+    def commit(self) -> None:
+        self._journal.clear()
+
+    def snapshot(self) -> Assignment:
+        return array("i", self.rooms), array("i", self.slots)
+
+    def restore(self, assignment: Assignment) -> None:
+        """
+        Move every course back to the given assignment and clear the journal.
+        """
+        rooms, slots = assignment
+        for c in range(self.problem.n_courses):
+            if self.rooms[c] != rooms[c] or self.slots[c] != slots[c]:
+                self._place(c, rooms[c], slots[c])
+        self._journal.clear()
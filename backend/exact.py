@@ -0,0 +1,243 @@
+import os
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import Schedule, SolveOptions
+from .constraints import get_hard_constraint_violations
+from .compiled import CompiledProblem, compile_problem
+from .engine import HappinessScorer
+from .monitor import SolveMonitor
+from .solver import AllData
+
+# OR-Tools is optional; without it the "cpsat" backend reports itself unavailable
+try:
+    from ortools.sat.python import cp_model
+except ImportError:
+    cp_model = None
+
+# Same bonuses as calculate_happiness_score
+_BASELINE = 1000
+_BALANCE_BONUS = 40
+_SPREAD_BONUS = 30
+_VENUE_BONUS = 30
+
+
+class ExactSolverUnavailable(Exception):
+    pass
+
+
+def _build_model(problem: CompiledProblem):
+    """
+    CP-SAT model of the compiled problem. Placement variables exist only for the
+    feasible (room, slot) domain of each course, so capacity and availability hold
+    by construction; multi-booking is a set of at-most-one constraints. The
+    objective is the happiness score, term by term.
+    Returns (model, placement vars per course as {(r, s): var}, objective expression).
+    """
+    C, S = problem.n_courses, problem.n_slots
+    domains = problem.domains
+    model = cp_model.CpModel()
+
+    x: List[Dict[Tuple[int, int], Any]] = []
+    for c in range(C):
+        x.append({divmod(k, S): model.NewBoolVar(f"x{c}_{k}") for k in domains.pairs[c]})
+        model.AddExactlyOne(x[c].values())
+
+    # Per (course, slot) and per (course, room) usage
+    at_slot: List[Dict[int, List[Any]]] = []
+    in_room: List[Dict[int, List[Any]]] = []
+    room_slot: Dict[Tuple[int, int], List[Any]] = {}
+    for c in range(C):
+        by_slot: Dict[int, List[Any]] = {}
+        by_room: Dict[int, List[Any]] = {}
+        for (r, s), v in x[c].items():
+            by_slot.setdefault(s, []).append(v)
+            by_room.setdefault(r, []).append(v)
+            room_slot.setdefault((r, s), []).append(v)
+        at_slot.append(by_slot)
+        in_room.append(by_room)
+
+    for vs in room_slot.values():
+        if len(vs) > 1:
+            model.AddAtMostOne(vs)
+    # Every curriculum is a clique of the conflict graph, so one constraint per slot covers it
+    for groups in (problem.prof_courses, problem.dept_courses, problem.curriculum_courses):
+        for members in groups:
+            if len(members) < 2:
+                continue
+            for s in range(S):
+                vs = [v for c in members for v in at_slot[c].get(s, ())]
+                if len(vs) > 1:
+                    model.AddAtMostOne(vs)
+
+    objective: List[Any] = []
+    constant = _BASELINE
+    # Soft 1 and 2: wasted seats and professor slot preferences
+    for c in range(C):
+        for (r, s), v in x[c].items():
+            weight = problem.course_slot_pref[c * S + s] - problem.course_room_waste[c * problem.n_rooms + r]
+            if weight:
+                objective.append(weight * v)
+
+    for p, members in enumerate(problem.prof_courses):
+        if not problem.prof_known[p] or len(members) < 2:
+            continue
+        # Soft 3: courses on at least two days
+        days: Dict[int, List[Any]] = {}
+        for c in members:
+            for s, vs in at_slot[c].items():
+                d = problem.slot_day[s]
+                if d >= 0:
+                    days.setdefault(d, []).extend(vs)
+        if len(days) >= 2:
+            used = []
+            for d, vs in days.items():
+                u = model.NewBoolVar(f"day{p}_{d}")
+                model.AddBoolOr(vs).OnlyEnforceIf(u)
+                used.append(u)
+            balanced = model.NewBoolVar(f"balanced{p}")
+            model.Add(sum(used) >= 2).OnlyEnforceIf(balanced)
+            objective.append(_BALANCE_BONUS * balanced)
+        # Soft 5: every course in the same named building
+        buildings: Dict[int, List[Any]] = {}
+        for c in members:
+            for r, vs in in_room[c].items():
+                buildings.setdefault(problem.room_building[r], []).extend(vs)
+        same = model.NewBoolVar(f"venue{p}")
+        named = [b for b in buildings if problem.building_named[b]]
+        for b, vs in buildings.items():
+            if not problem.building_named[b]:
+                for v in vs:
+                    model.AddImplication(same, v.Not())
+        if named:
+            chosen = [model.NewBoolVar(f"building{p}_{b}") for b in named]
+            model.AddExactlyOne(chosen).OnlyEnforceIf(same)
+            for b, pick in zip(named, chosen):
+                for v in buildings[b]:
+                    model.AddImplication(v, pick).OnlyEnforceIf(same)
+            objective.append(_VENUE_BONUS * same)
+        else:
+            model.Add(same == 0)
+
+    # Soft 4: a valid schedule never shares a slot within a department, so every pair scores
+    for members in problem.dept_courses:
+        n = len(members)
+        constant += _SPREAD_BONUS * n * (n - 1) // 2
+
+    return model, x, sum(objective) + constant
+
+
+if cp_model is not None:
+    class _Progress(cp_model.CpSolverSolutionCallback):
+        """
+        Forwards each improving solution to the monitor.
+        """
+
+        def __init__(self, problem: CompiledProblem, x, monitor: SolveMonitor):
+            super().__init__()
+            self._problem = problem
+            self._x = x
+            self._monitor = monitor
+            self._found = 0
+
+        def on_solution_callback(self) -> None:
+            self._found += 1
+            C = self._problem.n_courses
+            rooms, slots = array("i", [-1] * C), array("i", [-1] * C)
+            for c, choices in enumerate(self._x):
+                for (r, s), v in choices.items():
+                    if self.Value(v):
+                        rooms[c], slots[c] = r, s
+                        break
+            self._monitor.update(
+                "Exact (CP-SAT)", self._found, cost=0, happiness=int(self.ObjectiveValue()), best=(rooms, slots)
+            )
+
+
+def _stop_on_cancel(solver, monitor: SolveMonitor, done: threading.Event) -> None:
+    # CP-SAT may go a long time between solutions, so cancellation is polled here
+    while not done.wait(0.1):
+        if monitor.cancelled:
+            solver.StopSearch()
+            return
+
+
+def solve_exact(
+    all_data: AllData,
+    options: Optional[SolveOptions] = None,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None
+) -> Tuple[Optional[Tuple[Schedule, List[str], int, List[str]]], Dict[str, Any]]:
+    """
+    Solve with OR-Tools CP-SAT within options.time_budget (or else time_limit) seconds, stopping early
+    once the relative optimality gap is at most options.gap_limit. An initial
+    schedule is passed to CP-SAT as a hint.
+    Returns (result or None when no valid schedule was found, stats) where stats
+    holds status, objective, bound and gap.
+    """
+    if cp_model is None:
+        raise ExactSolverUnavailable("The cpsat backend needs OR-Tools (pip install ortools).")
+    options = options or SolveOptions()
+    problem = compile_problem(all_data)
+    if monitor is not None:
+        monitor.attach(problem)
+    domains = problem.domains
+    stats: Dict[str, Any] = {"status": "INFEASIBLE", "objective": None, "bound": None, "gap": None}
+    if not domains.feasible:
+        return None, stats
+
+    model, x, objective = _build_model(problem)
+    model.Maximize(objective)
+    if initial is not None:
+        rooms, slots = problem.encode(initial)
+        for c, choices in enumerate(x):
+            for (r, s), v in choices.items():
+                model.AddHint(v, r == rooms[c] and s == slots[c])
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = (
+        options.time_budget if options.time_budget is not None else options.time_limit
+    )
+    solver.parameters.relative_gap_limit = options.gap_limit
+    solver.parameters.num_workers = options.workers or os.cpu_count() or 1
+    if options.seed is not None:
+        solver.parameters.random_seed = options.seed % (2 ** 31)
+    callback = None
+    done = threading.Event()
+    if monitor is not None:
+        callback = _Progress(problem, x, monitor)
+        threading.Thread(target=_stop_on_cancel, args=(solver, monitor, done), daemon=True).start()
+    try:
+        status = solver.Solve(model, callback)
+    finally:
+        done.set()
+
+    stats["status"] = solver.StatusName(status)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, stats
+
+    C = problem.n_courses
+    rooms, slots = array("i", [-1] * C), array("i", [-1] * C)
+    for c, choices in enumerate(x):
+        for (r, s), v in choices.items():
+            if solver.Value(v):
+                rooms[c], slots[c] = r, s
+                break
+    schedule = problem.decode(rooms, slots)
+    violations = get_hard_constraint_violations(schedule, all_data)
+    happiness = HappinessScorer(problem, rooms, slots).score
+
+    objective_value = int(round(solver.ObjectiveValue()))
+    bound = int(round(solver.BestObjectiveBound()))
+    gap = (bound - objective_value) / max(1, abs(objective_value))
+    stats.update(objective=objective_value, bound=bound, gap=gap)
+    # CP-SAT also reports OPTIMAL when it stops inside the gap limit
+    proven = "optimal" if bound <= objective_value else "feasible"
+    explanations = [
+        f"Exact (CP-SAT): {proven} schedule with desirability {happiness} "
+        f"in {solver.WallTime():.1f}s (bound {bound}, gap {gap:.2%}).",
+    ]
+    if monitor is not None and monitor.cancelled:
+        explanations.append("Solve was cancelled; returning the best schedule found so far.")
+    return (schedule, violations, happiness, explanations), stats
@@ -0,0 +1,94 @@
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .monitor import SolveMonitor
+
+# Job lifecycle: queued -> running -> done | cancelled | failed
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = QUEUED
+        self.monitor = SolveMonitor()
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+
+class JobManager:
+    """
+    Runs solves on a bounded background thread pool so request handlers never block.
+    At most max_workers solves run at once and at most max_queued wait behind them;
+    further submissions raise JobQueueFull. The newest max_finished finished jobs are
+    kept for polling.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 16, max_finished: int = 128):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="solve")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, fn: Callable[[SolveMonitor], Any]) -> Job:
+        """
+        Queue fn(monitor) and return its Job right away.
+        """
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if active >= self.max_workers + self.max_queued:
+                raise JobQueueFull()
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+            job.future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[SolveMonitor], Any]) -> None:
+        if job.monitor.cancelled:
+            job.status = CANCELLED
+            self._evict()
+            return
+        job.status = RUNNING
+        try:
+            job.result = fn(job.monitor)
+            job.status = CANCELLED if job.monitor.cancelled else DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            finished = [j.id for j in self._jobs.values() if j.status in (DONE, CANCELLED, FAILED)]
+            # dicts keep insertion order, so the oldest finished jobs come first
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Ask a job to stop. A queued job never starts; a running one returns the best
+        schedule found so far.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.monitor.cancel()
+        if job.future is not None and job.future.cancel():
+            # _run never happens for this job, so it is evicted here
+            job.status = CANCELLED
+            self._evict()
+        return job
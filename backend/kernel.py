@@ -0,0 +1,377 @@
+import math
+import random
+import time
+from array import array
+from typing import Any, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .compiled import Assignment, CompiledProblem
+from .engine import ScheduleState
+from .monitor import SolveMonitor
+from .profiling import SolveProfile
+from .cooling import Cooling
+
+# Numba is optional; without it the same kernel runs as ordinary Python
+try:
+    import numba
+except ImportError:
+    numba = None
+
+KERNEL = "numba" if numba is not None else "python"
+
+# Iterations per kernel call; progress, cancel and the clock are checked between calls
+CHUNK = 1000
+
+# Stands in for "no target happiness" inside the kernel
+_NO_TARGET = 1 << 62
+
+
+def _jit(fn):
+    return numba.njit(cache=True, nogil=True)(fn) if numba is not None else fn
+
+
+def _vec(values: Sequence[int]):
+    # Typed arrays for the compiled kernel, plain lists (fastest to index) for the interpreted one
+    if numba is not None:
+        return np.asarray(values, dtype=np.int64)
+    return list(values)
+
+
+@_jit
+def _xorshift(x):
+    # 32-bit xorshift; every intermediate fits in 64 bits, so Python and Numba agree exactly
+    x ^= (x << 13) & 0xFFFFFFFF
+    x ^= x >> 17
+    x ^= (x << 5) & 0xFFFFFFFF
+    return x
+
+
+@_jit
+def _venue_bonus(n_buildings, building, n_courses, building_named):
+    # Soft 5, as in HappinessScorer._venue_bonus
+    if n_buildings == 1 and n_courses > 1 and building_named[building]:
+        return 30
+    return 0
+
+
+class _Buffers(NamedTuple):
+    """
+    The kernel's array arguments, in _anneal's parameter order: the problem
+    tables, then the schedule with the occupancy counters and histograms that
+    ConstraintEngine and HappinessScorer keep, and the best schedule so far.
+    """
+    C: int
+    R: int
+    S: int
+    n_days: int
+    n_buildings: int
+    course_room_bad: Any
+    course_slot_bad: Any
+    room_slot_bad: Any
+    course_room_waste: Any
+    course_slot_pref: Any
+    course_prof: Any
+    soft_prof: Any
+    course_dept: Any
+    prof_n_courses: Any
+    building_named: Any
+    room_building: Any
+    slot_day: Any
+    conflict_start: Any
+    conflict_dst: Any
+    pair_start: Any
+    pair_flat: Any
+    rooms: Any
+    slots: Any
+    prof_slot: Any
+    room_slot: Any
+    dept_slot: Any
+    clash: Any
+    prof_days: Any
+    prof_n_days: Any
+    prof_buildings: Any
+    prof_n_buildings: Any
+    prof_building_sum: Any
+    dept_slots: Any
+    best_rooms: Any
+    best_slots: Any
+
+
+@_jit
+def _anneal(
+    C, R, S, n_days, n_buildings,
+    course_room_bad, course_slot_bad, room_slot_bad, course_room_waste, course_slot_pref,
+    course_prof, soft_prof, course_dept, prof_n_courses, building_named, room_building, slot_day,
+    conflict_start, conflict_dst, pair_start, pair_flat,
+    rooms, slots, prof_slot, room_slot, dept_slot, clash,
+    prof_days, prof_n_days, prof_buildings, prof_n_buildings, prof_building_sum, dept_slots,
+    best_rooms, best_slots,
+    score, best_score, n, temp, rate, min_temp, target, stagnation, since_best, x
+):
+    """
+    Up to n iterations of single-move annealing on a valid schedule, updating the
+    arrays in place. Returns (iterations, accepted, moves priced, temp, score,
+    best score, iterations since the best, rng state).
+    """
+    done = 0
+    accepted = 0
+    priced = 0
+    while done < n and temp > min_temp and best_score < target and (stagnation <= 0 or since_best < stagnation):
+        done += 1
+        since_best += 1
+        x = _xorshift(x)
+        c = (x * C) >> 32
+        lo, hi = pair_start[c], pair_start[c + 1]
+        if hi > lo:
+            x = _xorshift(x)
+            flat = pair_flat[lo + ((x * (hi - lo)) >> 32)]
+            r, s = flat // S, flat % S
+        else:
+            x = _xorshift(x)
+            r = (x * R) >> 32
+            x = _xorshift(x)
+            s = (x * S) >> 32
+        r0, s0 = rooms[c], slots[c]
+        p, dept = course_prof[c], course_dept[c]
+
+        # Feasibility: in a valid schedule a move costs nothing exactly when its
+        # (room, slot) has no static violation and every bucket it joins is empty
+        feasible = (
+            course_room_bad[c * R + r] == 0 and course_slot_bad[c * S + s] == 0 and room_slot_bad[r * S + s] == 0
+        )
+        if feasible and s != s0:
+            if p >= 0 and prof_slot[p * S + s] > 0:
+                feasible = False
+            elif dept >= 0 and dept_slot[dept * S + s] > 0:
+                feasible = False
+            elif clash[c * S + s] > 0:
+                feasible = False
+        if feasible and (r != r0 or s != s0) and room_slot[r * S + s] > 0:
+            feasible = False
+        if not feasible:
+            temp *= rate
+            continue
+
+        # Score change, as in HappinessScorer.delta
+        priced += 1
+        d = course_room_waste[c * R + r0] - course_room_waste[c * R + r]
+        d += course_slot_pref[c * S + s] - course_slot_pref[c * S + s0]
+        q = soft_prof[c]
+        day0, day1 = slot_day[s0], slot_day[s]
+        b0, b1 = room_building[r0], room_building[r]
+        if q >= 0:
+            if day0 != day1:
+                k = prof_n_days[q]
+                k_after = k
+                if day0 >= 0 and prof_days[q * n_days + day0] == 1:
+                    k_after -= 1
+                if day1 >= 0 and prof_days[q * n_days + day1] == 0:
+                    k_after += 1
+                d += 40 * (int(k_after >= 2) - int(k >= 2))
+            if b0 != b1:
+                k = prof_n_buildings[q]
+                total = prof_building_sum[q]
+                k_after, total_after = k, total
+                if prof_buildings[q * n_buildings + b0] == 1:
+                    k_after -= 1
+                    total_after -= b0
+                if prof_buildings[q * n_buildings + b1] == 0:
+                    k_after += 1
+                    total_after += b1
+                d += (_venue_bonus(k_after, total_after, prof_n_courses[q], building_named)
+                      - _venue_bonus(k, total, prof_n_courses[q], building_named))
+        if dept >= 0 and s0 != s:
+            base = dept * (S + 1)
+            d += 30 * ((dept_slots[base + s0] - 1) - dept_slots[base + s])
+
+        if d <= 0:
+            x = _xorshift(x)
+            if x / 4294967296.0 >= math.exp(d / temp):
+                temp *= rate
+                continue
+
+        # Apply: hard buckets, curriculum clash counts, soft histograms
+        if p >= 0:
+            prof_slot[p * S + s0] -= 1
+            prof_slot[p * S + s] += 1
+        room_slot[r0 * S + s0] -= 1
+        room_slot[r * S + s] += 1
+        if dept >= 0:
+            dept_slot[dept * S + s0] -= 1
+            dept_slot[dept * S + s] += 1
+            dept_slots[dept * (S + 1) + s0] -= 1
+            dept_slots[dept * (S + 1) + s] += 1
+        if s != s0:
+            for e in range(conflict_start[c], conflict_start[c + 1]):
+                o = conflict_dst[e]
+                clash[o * S + s0] -= 1
+                clash[o * S + s] += 1
+        if q >= 0:
+            if day0 >= 0:
+                prof_days[q * n_days + day0] -= 1
+                if prof_days[q * n_days + day0] == 0:
+                    prof_n_days[q] -= 1
+            if day1 >= 0:
+                if prof_days[q * n_days + day1] == 0:
+                    prof_n_days[q] += 1
+                prof_days[q * n_days + day1] += 1
+            prof_buildings[q * n_buildings + b0] -= 1
+            if prof_buildings[q * n_buildings + b0] == 0:
+                prof_n_buildings[q] -= 1
+                prof_building_sum[q] -= b0
+            if prof_buildings[q * n_buildings + b1] == 0:
+                prof_n_buildings[q] += 1
+                prof_building_sum[q] += b1
+            prof_buildings[q * n_buildings + b1] += 1
+        rooms[c] = r
+        slots[c] = s
+        accepted += 1
+        score += d
+        if score > best_score:
+            best_score = score
+            since_best = 0
+            for i in range(C):
+                best_rooms[i] = rooms[i]
+                best_slots[i] = slots[i]
+        temp *= rate
+    return done, accepted, priced, temp, score, best_score, since_best, x
+
+
+def _encode(problem: CompiledProblem, state: ScheduleState) -> _Buffers:
+    """
+    The kernel's buffers for `state`, with its counters rebuilt as flat arrays.
+    """
+    C, R, S, P, D = problem.n_courses, problem.n_rooms, problem.n_slots, problem.n_profs, problem.n_depts
+    n_days, n_buildings = len(problem.day_names), len(problem.building_names)
+    soft_prof = [p if p >= 0 and problem.prof_known[p] else -1 for p in problem.course_prof]
+    conflict_start = [0] * (C + 1)
+    pair_start = [0] * (C + 1)
+    for c in range(C):
+        conflict_start[c + 1] = conflict_start[c] + len(problem.conflict_adj[c])
+        pair_start[c + 1] = pair_start[c] + len(problem.domains.pairs[c])
+
+    rooms, slots = state.rooms, state.slots
+    prof_slot, room_slot, dept_slot, clash = [0] * (P * S), [0] * (R * S), [0] * (D * S), [0] * (C * S)
+    prof_days, prof_n_days = [0] * (P * n_days), [0] * P
+    prof_buildings, prof_n_buildings, prof_building_sum = [0] * (P * n_buildings), [0] * P, [0] * P
+    dept_slots = [0] * (D * (S + 1))
+    for c in range(C):
+        r, s, p, d, q = rooms[c], slots[c], problem.course_prof[c], problem.course_dept[c], soft_prof[c]
+        room_slot[r * S + s] += 1
+        if p >= 0:
+            prof_slot[p * S + s] += 1
+        if d >= 0:
+            dept_slot[d * S + s] += 1
+            dept_slots[d * (S + 1) + s] += 1
+        for o in problem.conflict_adj[c]:
+            clash[o * S + s] += 1
+        if q >= 0:
+            day, b = problem.slot_day[s], problem.room_building[r]
+            if day >= 0:
+                if prof_days[q * n_days + day] == 0:
+                    prof_n_days[q] += 1
+                prof_days[q * n_days + day] += 1
+            if prof_buildings[q * n_buildings + b] == 0:
+                prof_n_buildings[q] += 1
+                prof_building_sum[q] += b
+            prof_buildings[q * n_buildings + b] += 1
+
+    return _Buffers(
+        C=C, R=R, S=S, n_days=n_days, n_buildings=n_buildings,
+        course_room_bad=_vec(problem.course_room_bad),
+        course_slot_bad=_vec(problem.course_slot_bad),
+        room_slot_bad=_vec(problem.room_slot_bad),
+        course_room_waste=_vec(problem.course_room_waste),
+        course_slot_pref=_vec(problem.course_slot_pref),
+        course_prof=_vec(problem.course_prof),
+        soft_prof=_vec(soft_prof),
+        course_dept=_vec(problem.course_dept),
+        prof_n_courses=_vec([len(courses) for courses in problem.prof_courses]),
+        building_named=_vec([int(x) for x in problem.building_named]),
+        room_building=_vec(problem.room_building),
+        slot_day=_vec(problem.slot_day),
+        conflict_start=_vec(conflict_start),
+        conflict_dst=_vec(problem.conflict_dst),
+        pair_start=_vec(pair_start),
+        pair_flat=_vec([f for pairs in problem.domains.pairs for f in pairs]),
+        rooms=_vec(rooms),
+        slots=_vec(slots),
+        prof_slot=_vec(prof_slot),
+        room_slot=_vec(room_slot),
+        dept_slot=_vec(dept_slot),
+        clash=_vec(clash),
+        prof_days=_vec(prof_days),
+        prof_n_days=_vec(prof_n_days),
+        prof_buildings=_vec(prof_buildings),
+        prof_n_buildings=_vec(prof_n_buildings),
+        prof_building_sum=_vec(prof_building_sum),
+        dept_slots=_vec(dept_slots),
+        best_rooms=_vec(rooms),
+        best_slots=_vec(slots),
+    )
+
+
+def anneal_moves(
+    problem: CompiledProblem,
+    state: ScheduleState,
+    rng: random.Random,
+    cooling: Cooling,
+    target: Optional[int] = None,
+    stage: str = "Stage 3 (SA)",
+    monitor: Optional[SolveMonitor] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Assignment, int, int, int]:
+    """
+    Single-move happiness annealing from the valid schedule in `state`, run by
+    the array kernel: compiled with Numba when it is installed (see KERNEL),
+    interpreted otherwise. Both run the same code on the same xorshift stream,
+    seeded from `rng`, so a fixed seed gives the same schedule either way.
+    The kernel runs CHUNK iterations at a time; in between, the monitor, the
+    profile trace and `cooling` (deadline, stagnation, timed temperature) are
+    consulted, as the Python loop does every iteration. A profile gets the
+    kernel's feasibility checks and score pricings as its evaluation counts.
+    Both happen in one loop, so the time spent in the kernel is split between
+    constraint and score seconds by those counts. The caller's profile.end()
+    records iterations and acceptances.
+    Returns (best assignment, best score, iterations, accepted moves).
+    """
+    buffers = _encode(problem, state)
+    x = rng.randrange(1, 1 << 32)
+    score = best_score = state.score
+    max_iter = cooling.max_iter
+    it = 0
+    accepted = 0
+    priced = 0
+    since_best = 0
+    seconds = 0.0
+
+    def snapshot(r: Sequence[int], s: Sequence[int]) -> Assignment:
+        return array("i", [int(v) for v in r]), array("i", [int(v) for v in s])
+
+    while (target is None or best_score < target) and cooling.running(it):
+        if monitor is not None:
+            best = snapshot(buffers.best_rooms, buffers.best_slots)
+            monitor.update(stage, it, cost=0, happiness=best_score, best=best)
+            if monitor.cancelled:
+                break
+        if profile is not None:
+            profile.trace(stage, it, 0, score)
+        n = CHUNK if max_iter is None else min(CHUNK, max_iter - it)
+        start = time.perf_counter()
+        done, moved, checked, cooling.temp, score, best_score, since_best, x = _anneal(
+            *buffers, score, best_score, n, cooling.temp, cooling.rate, cooling.min_temp,
+            target if target is not None else _NO_TARGET, cooling.stagnation or 0, since_best, x
+        )
+        seconds += time.perf_counter() - start
+        it += done
+        accepted += moved
+        priced += checked
+        cooling.improved(it - since_best)
+    if profile is not None:
+        share = priced / (it + priced) if it else 0.0
+        profile.count(
+            stage, constraint=it, score=priced,
+            constraint_seconds=seconds * (1.0 - share), score_seconds=seconds * share
+        )
+    return snapshot(buffers.best_rooms, buffers.best_slots), best_score, it, accepted
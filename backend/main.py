@@ -1,11 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import asyncio
+import json
+import os
+import time
 
-from .models import TimeSlot, Professor, Room, Course, Schedule
-from .solver import solve_and_optimize_schedule
+from .models import TimeSlot, Professor, Room, Course, Schedule, SolveOptions
+from .backends import run_backend
+from .monitor import SolveMonitor
+from .jobs import Job, JobManager, JobQueueFull, QUEUED, RUNNING
+from .cache import SolutionCache, problem_key
+from .repair import repair_schedule
+from .compiled import compile_problem
+from .profiling import SolveProfile, SolverMetrics
+from .wire import WireFormatError, decode_body, encode_body, page, problem_from_columns, schedule_to_columns
 
 app = FastAPI(
     title="University Schedule Planner",
@@ -13,6 +26,20 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Responses are gzipped for clients that accept it (event streams are left alone)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+jobs = JobManager()
+
+# Set USP_CACHE_PATH to an SQLite file to keep cached solutions across restarts
+cache = SolutionCache(max_entries=256, path=os.environ.get("USP_CACHE_PATH"))
+
+# Served by GET /metrics
+metrics = SolverMetrics()
+
+# Progress streams look at the job this often, which also caps their event rate
+EVENT_INTERVAL = 0.25
+
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
 @app.get("/", response_class=FileResponse)
@@ -24,6 +51,9 @@ class ProblemInput(BaseModel):
     rooms: List[Room]
     time_slots: List[TimeSlot]
     courses: List[Course]
+    options: SolveOptions = SolveOptions()
+    # Published timetable to warm-start from after editing the problem
+    previous: Optional[Schedule] = None
 
 class SolveResponse(BaseModel):
     schedule: Schedule
@@ -31,17 +61,110 @@ class SolveResponse(BaseModel):
     cost: int
     happiness: int
     explanation: List[str]
+    # Exact backends only: solver status, best bound on happiness and relative gap
+    status: Optional[str] = None
+    bound: Optional[int] = None
+    optimality_gap: Optional[float] = None
+    # With options.profile: per-stage timings, counts and traces
+    profile: Optional[Dict[str, Any]] = None
+    # Full lengths of violations and explanation when only a page (or none) is returned
+    violation_count: Optional[int] = None
+    explanation_count: Optional[int] = None
 
-@app.post("/solve", response_model=SolveResponse)
-def solve_schedule(problem: ProblemInput) -> SolveResponse:
-    all_data: Dict[str, Any] = {
+class FeasibilityReport(BaseModel):
+    feasible: bool
+    report: List[str]
+    # Number of feasible (room, slot) pairs per course
+    domain_sizes: Dict[str, int]
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    iteration: int = 0
+    cost: Optional[int] = None
+    happiness: Optional[int] = None
+    result: Optional[SolveResponse] = None
+    error: Optional[str] = None
+
+def _all_data(problem: ProblemInput) -> Dict[str, Any]:
+    return {
         "courses": problem.courses,
         "professors": problem.professors,
         "rooms": problem.rooms,
         "time_slots": problem.time_slots
     }
 
-    final_schedule, violations, happiness, explanations = solve_and_optimize_schedule(all_data, verbose=False)
+def _solve(
+    all_data: Dict[str, Any],
+    options: SolveOptions,
+    previous: Optional[Schedule] = None,
+    monitor: Optional[SolveMonitor] = None
+) -> SolveResponse:
+    profile = SolveProfile() if options.profile else None
+    started = time.perf_counter()
+    response, source = _run_solve(all_data, options, previous, monitor, profile)
+    if profile is not None:
+        profile.finish()
+        response.profile = profile.to_dict()
+    metrics.record_solve(
+        source, "valid" if response.cost == 0 else "invalid", time.perf_counter() - started, response.profile
+    )
+    return response
+
+def _run_solve(
+    all_data: Dict[str, Any],
+    options: SolveOptions,
+    previous: Optional[Schedule],
+    monitor: Optional[SolveMonitor],
+    profile: Optional[SolveProfile]
+) -> Tuple[SolveResponse, str]:
+    """
+    The solve itself; also returns what produced the result (repair, cache or the backend name).
+    """
+    key = problem_key(all_data, options) if options.cache else None
+    if previous is not None and options.repair:
+        result = repair_schedule(all_data, previous, options, monitor=monitor, profile=profile)
+        # A cancelled solve's partial schedule is never cached
+        if key is not None and not (monitor is not None and monitor.cancelled):
+            cache.put(key, result)
+        final_schedule, violations, happiness, explanations = result
+        return SolveResponse(
+            schedule=final_schedule,
+            violations=violations,
+            cost=len(violations),
+            happiness=happiness,
+            explanation=explanations
+        ), "repair"
+
+    # A previous schedule, when given, takes the place of a cached one as the start.
+    # Only a valid entry is returned as is; one with violations is solved onward
+    cached = cache.get(key) if key is not None and previous is None else None
+    initial = previous
+    if cached is not None:
+        if not options.refine and not cached[1]:
+            final_schedule, violations, happiness, explanations = cached
+            return SolveResponse(
+                schedule=final_schedule,
+                violations=violations,
+                cost=len(violations),
+                happiness=happiness,
+                explanation=["Cache: returned the best known schedule for this problem."] + explanations
+            ), "cache"
+        initial = cached[0]
+
+    result, stats = run_backend(all_data, options, monitor=monitor, initial=initial, profile=profile)
+    if key is not None and not (monitor is not None and monitor.cancelled):
+        cache.put(key, result)
+    final_schedule, violations, happiness, explanations = result
+    if cached is not None and cached[1]:
+        explanations = [
+            f"Cache: continued from the best known schedule ({len(cached[1])} violation(s))."
+        ] + explanations
+    elif cached is not None:
+        explanations = [f"Cache: continued from the best known schedule (desirability {cached[2]})."] + explanations
+    elif initial is not None:
+        explanations = ["Warm start: began from the previous schedule."] + explanations
     cost = len(violations)
 
     return SolveResponse(
@@ -49,9 +172,178 @@ def solve_schedule(problem: ProblemInput) -> SolveResponse:
         violations=violations,
         cost=cost,
         happiness=happiness,
-        explanation=explanations
+        explanation=explanations,
+        status=stats.get("status"),
+        bound=stats.get("bound"),
+        optimality_gap=stats.get("gap")
+    ), options.backend
+
+def _paged(response: SolveResponse, details: bool, offset: int, limit: Optional[int]) -> SolveResponse:
+    """
+    Keep only the requested page of violations and explanation (none without
+    details); the full lengths go in violation_count / explanation_count.
+    """
+    if details and offset <= 0 and limit is None:
+        return response
+    return response.model_copy(update={
+        "violations": page(response.violations, details, offset, limit),
+        "explanation": page(response.explanation, details, offset, limit),
+        "violation_count": len(response.violations),
+        "explanation_count": len(response.explanation),
+    })
+
+@app.post("/solve", response_model=SolveResponse)
+def solve_schedule(
+    problem: ProblemInput, details: bool = True, offset: int = 0, limit: Optional[int] = None
+) -> SolveResponse:
+    """
+    Solve a problem. details=false leaves out the violation and explanation
+    lists; offset/limit return one page of each.
+    """
+    return _paged(_solve(_all_data(problem), problem.options, problem.previous), details, offset, limit)
+
+@app.post("/solve/compact")
+async def solve_compact(
+    request: Request, details: bool = True, offset: int = 0, limit: Optional[int] = None
+) -> Response:
+    """
+    Fast path for large timetables. The body is a columnar problem (see
+    wire.problem_from_columns) as JSON or, with Content-Type application/msgpack,
+    MessagePack, optionally gzip-compressed (Content-Encoding: gzip). Entities are
+    not validated as pydantic models. The reply carries the schedule as columns
+    aligned with the course list (room index and slot id), and is MessagePack when
+    the Accept header asks for it.
+    """
+    try:
+        data = decode_body(
+            await request.body(), request.headers.get("content-type"), request.headers.get("content-encoding")
+        )
+        all_data, options, previous = problem_from_columns(data)
+    except WireFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    response = _paged(await run_in_threadpool(_solve, all_data, options, previous), details, offset, limit)
+    reply = response.model_dump(exclude={"schedule"}, exclude_none=True)
+    reply["schedule"] = schedule_to_columns(response.schedule, all_data)
+    body, media_type = encode_body(reply, request.headers.get("accept"))
+    return Response(content=body, media_type=media_type)
+
+@app.post("/check", response_model=FeasibilityReport)
+def check_problem(problem: ProblemInput) -> FeasibilityReport:
+    """
+    Static feasibility check without solving: per-course domains after
+    constraint propagation, and every reason no valid schedule can exist.
+    """
+    domains = compile_problem(_all_data(problem)).domains
+    return FeasibilityReport(feasible=domains.feasible, report=domains.report, domain_sizes=domains.sizes())
+
+def _job_status(job: Job) -> JobStatus:
+    progress = job.monitor.snapshot()
+    return JobStatus(
+        job_id=job.id,
+        status=job.status,
+        stage=progress["stage"],
+        iteration=progress["iteration"],
+        cost=progress["cost"],
+        happiness=progress["happiness"],
+        result=job.result,
+        error=job.error
     )
 
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(problem: ProblemInput) -> JobStatus:
+    try:
+        job = jobs.submit(lambda monitor: _solve(_all_data(problem), problem.options, problem.previous, monitor))
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many solves queued; try again later.")
+    return _job_status(job)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, details: bool = True, offset: int = 0, limit: Optional[int] = None) -> JobStatus:
+    """
+    Job progress, and its result once done; details/offset/limit page the
+    result's violations and explanation as for /solve.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    status = _job_status(job)
+    if status.result is not None:
+        status.result = _paged(status.result, details, offset, limit)
+    return status
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str) -> JobStatus:
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return _job_status(job)
+
+def _event(name: str, data: Any) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+async def _job_events(job: Job) -> AsyncIterator[str]:
+    stages_sent = 0
+    last_progress = None
+    best_version = 0
+    while True:
+        monitor = job.monitor
+        for stage in monitor.stages[stages_sent:]:
+            yield _event("stage", {"stage": stage})
+        stages_sent = len(monitor.stages)
+
+        progress = monitor.snapshot()
+        if progress != last_progress:
+            yield _event("progress", progress)
+            last_progress = progress
+
+        if monitor.best_version != best_version:
+            best_version = monitor.best_version
+            best = monitor.best_schedule()
+            if best is not None:
+                yield _event("best", {
+                    "cost": progress["best_cost"],
+                    "happiness": progress["best_happiness"],
+                    "schedule": best.model_dump(),
+                })
+
+        if job.status not in (QUEUED, RUNNING):
+            yield _event("done", _job_status(job).model_dump())
+            return
+        await asyncio.sleep(EVENT_INTERVAL)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    """
+    Server-Sent Events for a job: "stage" on entering a stage, "progress" when the
+    counters change, "best" with each new best schedule, and a final "done"
+    carrying the same body as GET /jobs/{job_id}.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return StreamingResponse(
+        _job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/cache")
+def cache_stats() -> Dict[str, Any]:
+    return cache.stats()
+
+@app.delete("/cache")
+def clear_cache() -> Dict[str, Any]:
+    cache.clear()
+    return cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def solver_metrics() -> PlainTextResponse:
+    """
+    Prometheus text exposition of solve counts and timings; per-stage series
+    come from solves run with options.profile.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/status")
 def status():
     return {"ok": True, "message": "USP running."}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Tuple, List, Optional
+from typing import Dict, Tuple, List, Literal, Optional
 
 
 # BASE MODELS
@@ -36,3 +36,64 @@ class Course(BaseModel):
 
 class Schedule(BaseModel):
     assignments: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+
+
+# SOLVE OPTIONS
+
+class SolveOptions(BaseModel):
+    # "heuristic" (the staged pipeline below) or "cpsat" (exact, needs OR-Tools;
+    # falls back to the heuristic when it finds nothing within time_limit)
+    backend: Literal["heuristic", "cpsat"] = "heuristic"
+    time_limit: float = 30.0
+    # Exact backends stop once (bound - objective) / objective is at most this
+    gap_limit: float = 0.0
+    seed: Optional[int] = None
+    # Wall-clock budget in seconds for the heuristic pipeline (the exact backend
+    # uses it in place of time_limit). The stages share it adaptively and cool
+    # on a temperature schedule calibrated from sampled move deltas; None keeps
+    # the fixed iteration schedules
+    time_budget: Optional[float] = None
+    # Annealing stages stop after this many iterations without a new best
+    stagnation: Optional[int] = None
+    # Multi-start: independent seeded runs spread over a process pool
+    starts: int = 1
+    workers: Optional[int] = None
+    # Stop as soon as a valid schedule reaches this desirability
+    target_happiness: Optional[int] = None
+    # Stage 1 start: "random" placements or a "greedy" constructive schedule
+    initializer: Literal["random", "greedy"] = "random"
+    # Share of Stage 2 moves aimed at courses currently in violation (0 = uniform)
+    conflict_focus: float = 0.8
+    # Stage 3 SA operator weights: single MOVE, two-course SWAP, room swap within a
+    # slot, and Kempe-chain slot exchange. A MOVE-only mix such as {"move": 1.0}
+    # runs in the array kernel (backend/kernel.py). Unset, it is MOVE-only when
+    # Numba is installed, so the compiled kernel runs by default, and
+    # {"move": 0.4, "swap": 0.25, "room_swap": 0.2, "kempe": 0.15} otherwise
+    move_mix: Optional[Dict[Literal["move", "swap", "room_swap", "kempe"], float]] = None
+    # Stage 2/3 engine: "sa" (single cooling chain), "tempering" (replica
+    # exchange) or "tabu" (tabu search over sampled neighbourhoods)
+    annealer: Literal["sa", "tempering", "tabu"] = "sa"
+    replicas: int = 4
+    # Processes for the tempering chains; 1 runs them in-process
+    tempering_workers: int = 1
+    # Solution cache: reuse the best known schedule for an identical problem and
+    # options (any seed), and with refine=True keep optimizing from it instead of
+    # returning it as is. Entries with violations are only ever a start. Off by
+    # default, since a cached result need not be the one options.seed gives
+    cache: bool = False
+    refine: bool = False
+    # Warm start from the request's previous schedule: with repair=True only
+    # courses affected by the edit move, and each course moved away from the
+    # previous schedule costs churn_weight desirability in the final pass
+    repair: bool = False
+    churn_weight: int = 50
+    # Two-phase mode: search over time slots only, then give each slot's courses
+    # rooms by optimal min-cost matching (capacity, availability, wasted seats)
+    two_phase: bool = False
+    # Split the problem into parts that share no professor, department,
+    # curriculum or room (else clusters that share only rooms), solve them in
+    # parallel on `workers` processes and repair the merged schedule's boundaries
+    decompose: bool = False
+    # Per-stage timings, move and evaluation counts and cost/score traces,
+    # returned as SolveResponse.profile (instrumentation is off otherwise)
+    profile: bool = False
@@ -0,0 +1,112 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .compiled import Assignment, CompiledProblem
+from .models import Schedule
+
+
+class SolveMonitor:
+    """
+    Shared between a running solve and whoever watches it.
+    The solver stages call update() every few iterations and stop early (returning
+    their best result so far) once cancel() has been called.
+    Stages may also hand over their best schedule so far, either as a compiled
+    assignment (decoded lazily against the attached problem) or as a Schedule; the
+    monitor keeps whichever is best overall (fewest violations, then happiness).
+    """
+
+    # Stages report once per this many iterations
+    every = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self.stage: Optional[str] = None
+        self.iteration = 0
+        self.cost: Optional[int] = None
+        self.happiness: Optional[int] = None
+        self.best_happiness: Optional[int] = None
+        self.best_cost: Optional[int] = None
+        # Every stage entered so far, in order
+        self.stages: List[str] = []
+        # Bumped whenever the best schedule changes, so watchers can tell
+        self.best_version = 0
+        self._best: Union[Assignment, Schedule, None] = None
+        self._best_rank: Optional[Tuple[int, float]] = None
+        self._problem: Optional[CompiledProblem] = None
+
+    def attach(self, problem: CompiledProblem) -> None:
+        """
+        Set the problem that compiled assignments passed to update() belong to.
+        """
+        self._problem = problem
+
+    def update(
+        self,
+        stage: str,
+        iteration: int,
+        cost: Optional[int] = None,
+        happiness: Optional[int] = None,
+        best: Union[Assignment, Schedule, None] = None
+    ) -> None:
+        with self._lock:
+            if stage != self.stage:
+                self.stages.append(stage)
+            self.stage = stage
+            self.iteration = iteration
+            if cost is not None:
+                self.cost = cost
+            if happiness is not None:
+                self.happiness = happiness
+                if self.best_happiness is None or happiness > self.best_happiness:
+                    self.best_happiness = happiness
+            if cost is not None and (self.best_cost is None or cost < self.best_cost):
+                self.best_cost = cost
+            if best is not None and cost is not None:
+                rank = (-cost, happiness if happiness is not None else float("-inf"))
+                if self._best_rank is None or rank > self._best_rank:
+                    self._best = best
+                    self._best_rank = rank
+                    self.best_version += 1
+
+    def best_schedule(self) -> Optional[Schedule]:
+        """
+        The best schedule handed over so far, or None.
+        """
+        with self._lock:
+            best, problem = self._best, self._problem
+        if best is None or isinstance(best, Schedule):
+            return best
+        if problem is None:
+            return None
+        return problem.decode(*best)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stage": self.stage,
+                "iteration": self.iteration,
+                "cost": self.cost,
+                "happiness": self.happiness,
+                "best_happiness": self.best_happiness,
+                "best_cost": self.best_cost,
+            }
+
+
+class WorkerMonitor(SolveMonitor):
+    """
+    Monitor of a solve in a worker process. Progress stays in the worker, but
+    cancel() and cancelled go through `stop`, a multiprocessing.Event shared
+    with the parent, so the parent can halt a running solve.
+    """
+
+    def __init__(self, stop: Any):
+        super().__init__()
+        self._cancelled = stop
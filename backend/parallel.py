@@ -0,0 +1,152 @@
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import Schedule, SolveOptions
+from .monitor import SolveMonitor, WorkerMonitor
+from .profiling import SolveProfile
+from .compiled import CompiledProblem, compile_problem
+from .solver import AllData, _solve_compiled
+
+SolveResult = Tuple[Schedule, List[str], int, List[str]]
+
+# How often the parent checks the monitor for a cancel while starts run, in seconds
+POLL_SECONDS = 0.1
+
+# Per-process problem, installed once by _init_worker so tasks only carry a seed,
+# and the parent's stop event
+_worker_data: Optional[Tuple[AllData, CompiledProblem, SolveOptions, Optional[Schedule], bool, Any]] = None
+
+
+def _init_worker(
+    all_data: AllData,
+    options: SolveOptions,
+    initial: Optional[Schedule] = None,
+    profiling: bool = False,
+    stop: Any = None
+) -> None:
+    global _worker_data
+    _worker_data = (all_data, compile_problem(all_data), options, initial, profiling, stop)
+
+
+def _run_start(seed: int) -> Tuple[int, SolveResult, Optional[Dict[str, Any]]]:
+    # With profiling on, each start profiles itself and ships the plain dict back
+    all_data, problem, options, initial, profiling, stop = _worker_data
+    profile = SolveProfile() if profiling else None
+    monitor = WorkerMonitor(stop) if stop is not None else None
+    result = _solve_compiled(
+        problem, all_data, random.Random(seed), options, monitor=monitor, initial=initial, profile=profile
+    )
+    return seed, result, profile.to_dict() if profile is not None else None
+
+
+def rank_result(result: SolveResult) -> Tuple[int, int]:
+    """
+    Sort key of a solve result, higher is better: fewest violations first, then
+    highest happiness.
+    """
+    _, violations, happiness, _ = result
+    return (-len(violations), happiness)
+
+
+def _reached(result: SolveResult, target_happiness: Optional[int]) -> bool:
+    _, violations, happiness, _ = result
+    return target_happiness is not None and not violations and happiness >= target_happiness
+
+
+def _report(monitor: Optional[SolveMonitor], finished: int, result: SolveResult) -> None:
+    if monitor is not None:
+        schedule, violations, happiness, _ = result
+        monitor.update("Multi-start", finished, cost=len(violations), happiness=happiness, best=schedule)
+
+
+def solve_multi_start(
+    all_data: AllData,
+    options: SolveOptions,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> SolveResult:
+    """
+    Run options.starts independently seeded three-stage pipelines on a process pool
+    and return the best result (valid first, then by happiness).
+    The problem is shipped to each worker process once. When options.target_happiness
+    is given, starts that have not begun yet are cancelled as soon as a valid
+    schedule reaches it, and running ones are told to stop (they return at their
+    next progress check; their results are discarded). A monitor sees one update per finished start; cancelling
+    it drops the remaining starts and makes the running ones return their best
+    schedule so far, which still count. With an initial schedule every start begins there.
+    A profile accumulates the stages of every start, including those run in workers.
+    A time budget is divided between the waves of starts the workers run one
+    after another, so the whole call stays within it.
+    """
+    starts = max(1, options.starts)
+    workers = max(1, min(options.workers or os.cpu_count() or 1, starts))
+    target_happiness = options.target_happiness
+    base = random.Random(options.seed)
+    # Pool workers cannot start their own tempering processes
+    if workers > 1:
+        options = options.model_copy(update={"tempering_workers": 1})
+    if options.time_budget is not None:
+        waves = math.ceil(starts / workers)
+        options = options.model_copy(update={"time_budget": options.time_budget / waves})
+    seeds = [base.randrange(2 ** 32) for _ in range(starts)]
+
+    best: Optional[Tuple[int, SolveResult]] = None
+    finished = 0
+
+    if workers == 1:
+        # No pool for a single worker; run the starts in this process
+        problem = compile_problem(all_data)
+        for s in seeds:
+            result = _solve_compiled(
+                problem, all_data, random.Random(s), options, monitor=monitor, initial=initial, profile=profile
+            )
+            finished += 1
+            if best is None or rank_result(result) > rank_result(best[1]):
+                best = (s, result)
+            _report(monitor, finished, best[1])
+            if _reached(result, target_happiness) or (monitor is not None and monitor.cancelled):
+                break
+    else:
+        stop = multiprocessing.Event()
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(all_data, options, initial, profile is not None, stop)
+        )
+        try:
+            pending = {pool.submit(_run_start, s) for s in seeds}
+            while pending:
+                done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut.cancelled():
+                        continue
+                    s, result, start_profile = fut.result()
+                    if profile is not None and start_profile is not None:
+                        profile.merge(start_profile)
+                    finished += 1
+                    if best is None or rank_result(result) > rank_result(best[1]):
+                        best = (s, result)
+                if best is not None:
+                    _report(monitor, finished, best[1])
+                    if _reached(best[1], target_happiness):
+                        break
+                if monitor is not None and monitor.cancelled and not stop.is_set():
+                    stop.set()
+                    for fut in pending:
+                        fut.cancel()
+        finally:
+            # Queued starts are dropped; running ones stop at their next progress check
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    best_seed, (schedule, violations, happiness, explanations) = best
+    summary = f"Multi-start: best of {finished}/{starts} starts on {workers} worker(s) (seed {best_seed})."
+    if monitor is not None and monitor.cancelled:
+        summary += " Cancelled before the remaining starts ran."
+    elif finished < starts:
+        summary += f" Stopped early at target desirability {target_happiness}."
+    return schedule, violations, happiness, [summary] + explanations
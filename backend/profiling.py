@@ -0,0 +1,284 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from .engine import ScheduleState
+
+# Longest cost/score trace kept per stage; later points are dropped
+_MAX_TRACE = 500
+
+
+def _stage_entry() -> Dict[str, Any]:
+    return {
+        "seconds": 0.0,
+        "runs": 0,
+        "iterations": 0,
+        "accepted": 0,
+        "rejected": 0,
+        "constraint_evaluations": 0,
+        "constraint_seconds": 0.0,
+        "score_evaluations": 0,
+        "score_seconds": 0.0,
+        "trace": [],
+    }
+
+
+class SolveProfile:
+    """
+    Optional per-stage instrumentation of one solve.
+    Search stages bracket their loop with begin() and end(), which record wall
+    time, iterations and accepted/rejected moves; other steps are timed with
+    stage(). Stages sample (iteration, cost, score) with trace() once
+    per `every` iterations. instrument() wraps a ScheduleState's engines so each
+    constraint check and scoring call is counted and timed.
+    Nothing here runs unless a profile is passed in: every hook in the solver is
+    behind `profile is not None`, and the engines are only wrapped on request.
+    """
+
+    # Trace sample period, in iterations
+    every = 100
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, stage: str) -> Dict[str, Any]:
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = _stage_entry()
+        return entry
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        entry = self._entry(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry["seconds"] += time.perf_counter() - start
+            entry["runs"] += 1
+
+    def begin(self, stage: str, state: Optional[ScheduleState] = None) -> float:
+        """
+        Start of a search stage: instruments its state, if given, and returns
+        the start time to hand back to end().
+        """
+        if state is not None:
+            self.instrument(state, stage)
+        return time.perf_counter()
+
+    def end(self, stage: str, started: float, iterations: int, accepted: int, rejected: int) -> None:
+        entry = self._entry(stage)
+        entry["seconds"] += time.perf_counter() - started
+        entry["runs"] += 1
+        entry["iterations"] += iterations
+        entry["accepted"] += accepted
+        entry["rejected"] += rejected
+
+    def count(
+        self, stage: str, constraint: int = 0, score: int = 0,
+        constraint_seconds: float = 0.0, score_seconds: float = 0.0
+    ) -> None:
+        """
+        Add evaluations made outside an instrumented state (e.g. by the array kernel).
+        """
+        entry = self._entry(stage)
+        entry["constraint_evaluations"] += constraint
+        entry["score_evaluations"] += score
+        entry["constraint_seconds"] += constraint_seconds
+        entry["score_seconds"] += score_seconds
+
+    def trace(self, stage: str, iteration: int, cost: Optional[int], score: Optional[int] = None) -> None:
+        points = self._entry(stage)["trace"]
+        if len(points) < _MAX_TRACE:
+            points.append((iteration, cost, score))
+
+    def instrument(self, state: ScheduleState, stage: str) -> None:
+        """
+        Count and time every constraint check (hard deltas and best-move scans)
+        and every scoring call (happiness deltas) on this state. Applying a move
+        prices it again internally; that is not counted a second time. The
+        wrappers live on the engine instances only.
+        """
+        entry = self._entry(stage)
+        hard, soft = state.hard, state.soft
+        cells = state.problem.n_rooms * state.problem.n_slots
+        # Depth of engine updates in progress; deltas they call are not counted
+        updating = [0]
+
+        def timed(fn: Callable, kind: str, weight: Callable[..., int]) -> Callable:
+            evaluations, seconds = f"{kind}_evaluations", f"{kind}_seconds"
+
+            def wrapper(*args):
+                if updating[0]:
+                    return fn(*args)
+                start = time.perf_counter()
+                try:
+                    return fn(*args)
+                finally:
+                    entry[seconds] += time.perf_counter() - start
+                    entry[evaluations] += weight(*args)
+            return wrapper
+
+        def uncounted(fn: Callable) -> Callable:
+            def wrapper(*args):
+                updating[0] += 1
+                try:
+                    return fn(*args)
+                finally:
+                    updating[0] -= 1
+            return wrapper
+
+        def one(*args) -> int:
+            return 1
+
+        def scan(courses=None) -> int:
+            # One best-move scan prices every (course, room, slot) move
+            return (len(courses) if courses is not None else state.problem.n_courses) * cells
+
+        hard.delta = timed(hard.delta, "constraint", one)
+        hard._update = uncounted(hard._update)
+        hard.best_move = timed(hard.best_move, "constraint", scan)
+        if soft is not None:
+            soft.delta = timed(soft.delta, "score", one)
+            soft._update = uncounted(soft._update)
+
+    def finish(self) -> None:
+        self.seconds = time.perf_counter() - self.started
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """
+        Add the stages of another profile's to_dict(), e.g. from a worker process.
+        """
+        for item in other.get("stages", []):
+            entry = self._entry(item["stage"])
+            for key, value in item.items():
+                if key == "trace":
+                    entry["trace"].extend(tuple(p) for p in value[:_MAX_TRACE - len(entry["trace"])])
+                elif key in entry:
+                    entry[key] += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages = []
+        for name, entry in self.stages.items():
+            moved = entry["accepted"] + entry["rejected"]
+            stages.append({
+                "stage": name,
+                **{k: v for k, v in entry.items() if k != "trace"},
+                "acceptance_ratio": entry["accepted"] / moved if moved else None,
+                "trace": [list(p) for p in entry["trace"]],
+            })
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        return {"seconds": seconds, "stages": stages}
+
+
+def profiled(profile: Optional[SolveProfile], stage: str) -> ContextManager[None]:
+    """
+    profile.stage(stage), or a no-op when profiling is off.
+    """
+    return profile.stage(stage) if profile is not None else nullcontext()
+
+
+# ---------------- Prometheus-style metrics ----------------
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (non-cumulative, last one is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labels)
+        counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._values.items()):
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {running}")
+        return lines
+
+
+_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class SolverMetrics:
+    """
+    Process-wide counters and histograms served by GET /metrics in the Prometheus
+    text format. Every solve is counted and timed; per-stage series are only fed
+    by solves that ran with a profile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.solves = Counter("usp_solves_total", "Solves finished, by backend and outcome.", ("backend", "outcome"))
+        self.solve_seconds = Histogram(
+            "usp_solve_seconds", "Wall time of a solve.", _SECONDS_BUCKETS, ("backend",)
+        )
+        self.stage_seconds = Histogram(
+            "usp_stage_seconds", "Wall time of a profiled solver stage.", _SECONDS_BUCKETS, ("stage",)
+        )
+        self.iterations = Counter("usp_stage_iterations_total", "Iterations of profiled stages.", ("stage",))
+        self.moves = Counter("usp_stage_moves_total", "Moves of profiled stages by outcome.", ("stage", "outcome"))
+        self.evaluations = Counter(
+            "usp_stage_evaluations_total", "Constraint and score evaluations of profiled stages.", ("stage", "kind")
+        )
+        self.evaluation_seconds = Counter(
+            "usp_stage_evaluation_seconds_total", "Time in constraint checks and scoring of profiled stages.",
+            ("stage", "kind")
+        )
+
+    def record_solve(self, backend: str, outcome: str, seconds: float, profile: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self.solves.inc(backend=backend, outcome=outcome)
+            self.solve_seconds.observe(seconds, backend=backend)
+            for item in (profile or {}).get("stages", []):
+                stage = item["stage"]
+                self.stage_seconds.observe(item["seconds"], stage=stage)
+                self.iterations.inc(item["iterations"], stage=stage)
+                self.moves.inc(item["accepted"], stage=stage, outcome="accepted")
+                self.moves.inc(item["rejected"], stage=stage, outcome="rejected")
+                for kind in ("constraint", "score"):
+                    self.evaluations.inc(item[f"{kind}_evaluations"], stage=stage, kind=kind)
+                    self.evaluation_seconds.inc(item[f"{kind}_seconds"], stage=stage, kind=kind)
+
+    def render(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for metric in (self.solves, self.solve_seconds, self.stage_seconds, self.iterations,
+                           self.moves, self.evaluations, self.evaluation_seconds):
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
@@ -0,0 +1,207 @@
+import math
+import random
+from typing import List, Optional, Set, Tuple
+
+from .models import Schedule, SolveOptions
+from .constraints import get_hard_constraint_violations
+from .compiled import Assignment, CompiledProblem, compile_problem
+from .engine import ScheduleState
+from .monitor import SolveMonitor
+from .profiling import SolveProfile
+from .cooling import Budget, Cooling
+from .solver import (
+    AllData,
+    _hill_climbing_for_validity,
+    _seeded_assignment,
+    _simulated_annealing_for_validity,
+)
+
+
+def _conflicted_courses(problem: CompiledProblem, state: ScheduleState, missing: Set[int]) -> Set[int]:
+    """
+    Courses the previous schedule did not place, plus every course that now takes
+    part in a violation (e.g. because its professor or room lost a slot).
+    """
+    return missing | {c for c in range(problem.n_courses) if state.hard.conflicted(c)}
+
+
+def _neighbours(problem: CompiledProblem, courses: Set[int]) -> Set[int]:
+    """
+    Courses that can collide with the given ones: same professor, same department
+    or a curriculum clash.
+    """
+    out = set(courses)
+    for c in courses:
+        p, d = problem.course_prof[c], problem.course_dept[c]
+        if p >= 0:
+            out.update(problem.prof_courses[p])
+        if d >= 0:
+            out.update(problem.dept_courses[d])
+        out.update(problem.conflict_adj[c])
+    return out
+
+
+def _moved(anchor: Assignment, c: int, r: int, s: int) -> int:
+    # Whether (r, s) differs from the published placement; unplaced parts never count
+    a_r, a_s = anchor[0][c], anchor[1][c]
+    return int((a_r >= 0 and r != a_r) or (a_s >= 0 and s != a_s))
+
+
+def _churn(anchor: Assignment, assignment: Assignment) -> int:
+    rooms, slots = assignment
+    return sum(_moved(anchor, c, rooms[c], slots[c]) for c in range(len(rooms)))
+
+
+def _restore_valid(
+    problem: CompiledProblem,
+    start: Assignment,
+    scope: List[int],
+    rng: random.Random,
+    verbose: bool,
+    monitor: Optional[SolveMonitor],
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int]:
+    """
+    Hill climbing, then SA if still invalid, moving only the courses in scope.
+    """
+    assignment, cost = _hill_climbing_for_validity(
+        problem, verbose=verbose, rng=rng, monitor=monitor, initial=start, courses=scope, stage="Repair (HC)",
+        profile=profile, budget=budget
+    )
+    if cost > 0 and not (monitor is not None and monitor.cancelled):
+        assignment, cost, _ = _simulated_annealing_for_validity(
+            problem, assignment, verbose=verbose, rng=rng, monitor=monitor, courses=scope, stage="Repair (SA')",
+            profile=profile, budget=budget
+        )
+    return assignment, cost
+
+
+# ---------------- Repair Stage 3: short SA with a churn penalty ----------------
+def _polish_with_churn(
+    problem: CompiledProblem,
+    valid: Assignment,
+    anchor: Assignment,
+    scope: List[int],
+    churn_weight: int,
+    rng: random.Random,
+    monitor: Optional[SolveMonitor] = None,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int]:
+    """
+    Short SA over the courses in scope that maximizes
+    happiness - churn_weight * (courses moved away from the anchor).
+    Never leaves the valid region. A budget's deadline and stagnation window end
+    it early. Returns (best assignment, its happiness).
+    """
+    state = ScheduleState(problem, valid, track_happiness=True)
+    current = state.score - churn_weight * _churn(anchor, (state.rooms, state.slots))
+    best = state.snapshot()
+    best_value, best_score = current, state.score
+
+    cooling = Cooling(200.0, 0.99, 0.5, budget=budget)
+    it = 0
+    accepted = 0
+    stage = "Repair (SA)"
+    started = profile.begin(stage, state) if profile is not None else 0.0
+    while cooling.running(it):
+        if monitor is not None and it % monitor.every == 0:
+            monitor.update(stage, it, cost=0, happiness=best_score, best=best)
+            if monitor.cancelled:
+                break
+        if profile is not None and it % profile.every == 0:
+            profile.trace(stage, it, state.cost, current)
+        it += 1
+        c = scope[rng.randrange(len(scope))]
+        r, s = problem.domains.sample(c, rng)
+        cooling.cool()
+        if state.cost_delta(c, r, s) > 0:
+            continue
+        delta = state.score_delta(c, r, s) - churn_weight * (
+            _moved(anchor, c, r, s) - _moved(anchor, c, state.rooms[c], state.slots[c])
+        )
+        if delta < 0:
+            try:
+                prob = math.exp(delta / cooling.temp)
+            except OverflowError:
+                prob = 0.0
+            if rng.random() >= prob:
+                continue
+        state.apply(c, r, s)
+        state.commit()
+        accepted += 1
+        current += delta
+        if current > best_value:
+            best = state.snapshot()
+            best_value, best_score = current, state.score
+            cooling.improved(it)
+    if profile is not None:
+        profile.end(stage, started, it, accepted, it - accepted)
+    return best, best_score
+
+
+def repair_schedule(
+    all_data: AllData,
+    previous: Schedule,
+    options: Optional[SolveOptions] = None,
+    verbose: bool = False,
+    monitor: Optional[SolveMonitor] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Schedule, List[str], int, List[str]]:
+    """
+    Incremental re-solve after a small edit to the problem.
+    Assignments of `previous` that are still valid stay fixed; only courses that
+    are new or now in conflict are moved. If that is not enough, the scope widens
+    to their conflict neighbours (same professor, department or curriculum), and finally to
+    every course. A short SA pass then improves happiness over the same scope,
+    penalizing every course moved away from `previous` by options.churn_weight.
+    Returns the same tuple as solve_and_optimize_schedule.
+    """
+    options = options or SolveOptions()
+    rng = random.Random(options.seed)
+    budget = Budget.from_options(options)
+    problem = compile_problem(all_data)
+    if monitor is not None:
+        monitor.attach(problem)
+    explanations: List[str] = []
+    C = problem.n_courses
+
+    anchor = problem.encode(previous)
+    missing = {c for c in range(C) if anchor[0][c] < 0 or anchor[1][c] < 0}
+    start = _seeded_assignment(problem, previous, rng)
+    state = ScheduleState(problem, start)
+    changed = _conflicted_courses(problem, state, missing)
+    explanations.append(
+        f"Repair: {len(changed)} of {C} course(s) are new or in conflict after the edit "
+        f"(previous cost {state.cost})."
+    )
+
+    assignment, cost = start, state.cost
+    scope: List[int] = sorted(changed)
+    if changed and problem.n_rooms and problem.n_slots:
+        widened = sorted(_neighbours(problem, changed))
+        for label, scope in (("changed courses", sorted(changed)), ("their neighbours", widened),
+                             ("all courses", list(range(C)))):
+            assignment, cost = _restore_valid(problem, assignment, scope, rng, verbose, monitor, profile, budget)
+            explanations.append(f"Repair: cost {cost} after moving {label} ({len(scope)} course(s)).")
+            if cost == 0 or (monitor is not None and monitor.cancelled):
+                break
+
+    if cost == 0 and scope and problem.n_rooms and problem.n_slots:
+        assignment, happiness = _polish_with_churn(
+            problem, assignment, anchor, scope, options.churn_weight, rng, monitor, profile, budget
+        )
+        explanations.append(f"Repair (SA): best desirability found = {happiness}")
+    elif cost > 0:
+        explanations.append("Repair: unable to restore a fully valid schedule. Returning best-effort result.")
+
+    schedule = problem.decode(*assignment)
+    violations = get_hard_constraint_violations(schedule, all_data)
+    happiness = ScheduleState(problem, assignment, track_happiness=True).score
+    explanations.append(
+        f"Repair: moved {_churn(anchor, assignment)} of {C - len(missing)} previously scheduled course(s)."
+    )
+    if monitor is not None and monitor.cancelled:
+        explanations.append("Solve was cancelled; returning the best schedule found so far.")
+    return schedule, violations, happiness, explanations
@@ -1,13 +1,33 @@
 import random
-import copy
 import math
-from typing import Dict, List, Tuple, Any
+from array import array
+from typing import Dict, List, Optional, Tuple, Any
 
-from .models import Schedule
+import numpy as np
+
+from .models import Schedule, SolveOptions
 from .constraints import get_hard_constraint_violations, calculate_happiness_score
+from .compiled import Assignment, CompiledProblem, compile_problem
+from .engine import HappinessScorer, ScheduleState
+from .monitor import SolveMonitor
+from .profiling import SolveProfile, profiled
+from .cooling import CALIBRATION_SAMPLES, VALIDITY_SHARE, Budget, Cooling
+from .tempering import _tempering_for_happiness, _tempering_for_validity
+from .tabu import _tabu_for_happiness, _tabu_for_validity
+from . import kernel
 
 AllData = Dict[str, List[Any]]
 
+# Share of conflict-directed Stage 2 moves that swap two conflicting courses
+_CONFLICT_SWAP_SHARE = 0.2
+
+# Stage 3 move operators, in the order their weights are drawn
+MOVE_KINDS = ("move", "swap", "room_swap", "kempe")
+
+# Stage 3 operator weights when move_mix is unset and Numba is missing; with
+# Numba the unset mix is MOVE-only, so it runs in the compiled kernel
+COMPOUND_MIX = {"move": 0.4, "swap": 0.25, "room_swap": 0.2, "kempe": 0.15}
+
 # Helpers
 
 def _get_name(obj: Any) -> str:
@@ -76,120 +96,259 @@ def generate_random_schedule(all_data: AllData) -> Schedule:
     return sched
 
 
-# ---------------- Stage 1: Hill Climb for validity ----------------
-def _hill_climbing_for_validity(all_data: AllData, verbose: bool = True) -> Tuple[Schedule, int]:
-    courses = all_data.get("courses", []) or []
-    rooms = all_data.get("rooms", []) or []
-    slots = all_data.get("time_slots", []) or []
+def _random_assignment(problem: CompiledProblem, rng: random.Random) -> Assignment:
+    """
+    Compiled counterpart of generate_random_schedule, drawing each course's
+    placement from its feasible domain.
+    """
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    rooms = array("i", [-1] * C)
+    slots = array("i", [-1] * C)
+    if R and S:
+        domains = problem.domains
+        for c in range(C):
+            rooms[c], slots[c] = domains.sample(c, rng)
+    return rooms, slots
 
-    current = generate_random_schedule(all_data)
-    _ensure_all_courses(current, courses)
 
-    current_cost = len(get_hard_constraint_violations(current, all_data))
+def _seeded_assignment(problem: CompiledProblem, seed: Schedule, rng: random.Random) -> Assignment:
+    """
+    Start from an earlier schedule instead of a random one. Courses it does not
+    place (or places in unknown rooms/slots) get the missing room or slot from
+    a random pair of their domain.
+    """
+    rooms, slots = problem.encode(seed)
+    if problem.n_rooms and problem.n_slots:
+        domains = problem.domains
+        for c in range(problem.n_courses):
+            if rooms[c] < 0 or slots[c] < 0:
+                r, s = domains.sample(c, rng)
+                if rooms[c] < 0:
+                    rooms[c] = r
+                if slots[c] < 0:
+                    slots[c] = s
+    return rooms, slots
+
+
+def _greedy_assignment(problem: CompiledProblem, rng: random.Random) -> Assignment:
+    """
+    Constructive start: courses with the fewest usable (room, slot) pairs are
+    placed first, each in the slot that adds the fewest conflicts (professor,
+    department or curriculum already busy, slot unavailable), preferring the professor's
+    favourite slots, and in the smallest free room that fits. Ties are broken
+    by rng, so different seeds give different starts.
+    """
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    rooms = array("i", [-1] * C)
+    slots = array("i", [-1] * C)
+    if not (C and R and S):
+        return rooms, slots
+
+    # Availability sets, precomputed once
+    by_capacity = sorted(range(R), key=lambda r: problem.capacity[r])
+    fitting = [[r for r in by_capacity if not problem.course_room_bad[c * R + r]] for c in range(C)]
+    open_slots = [{s for s in range(S) if not problem.room_slot_bad[r * S + s]} for r in range(R)]
+    ok_room = 1 - np.frombuffer(problem.course_room_bad, dtype=np.uint8).reshape(C, R).astype(np.int64)
+    ok_slot = 1 - np.frombuffer(problem.course_slot_bad, dtype=np.uint8).reshape(C, S).astype(np.int64)
+    ok_room_slot = 1 - np.frombuffer(problem.room_slot_bad, dtype=np.uint8).reshape(R, S).astype(np.int64)
+    usable = ((ok_room @ ok_room_slot) * ok_slot).sum(axis=1).tolist()
+
+    order = list(range(C))
+    rng.shuffle(order)
+    order.sort(key=lambda c: (usable[c], -problem.enrollment[c]))
+
+    prof_busy = [0] * (problem.n_profs * S)
+    dept_busy = [0] * (problem.n_depts * S)
+    slot_courses = [0] * S
+    room_busy = bytearray(R * S)
+    slot_order = list(range(S))
+    for c in order:
+        p, d = problem.course_prof[c], problem.course_dept[c]
+        rng.shuffle(slot_order)
+        best = None
+        for s in slot_order:
+            conflicts = problem.course_slot_bad[c * S + s]
+            if p >= 0:
+                conflicts += prof_busy[p * S + s] > 0
+            if d >= 0:
+                conflicts += dept_busy[d * S + s] > 0
+            conflicts += (problem.conflicts[c] & slot_courses[s]) != 0
+            room = next((r for r in fitting[c] if s in open_slots[r] and not room_busy[r * S + s]), -1)
+            if room < 0:
+                # Nothing free fits: take any free room, else double-book the smallest fitting one
+                conflicts += 1
+                room = next((r for r in by_capacity if not room_busy[r * S + s]), -1)
+                if room < 0:
+                    room = fitting[c][0] if fitting[c] else by_capacity[-1]
+            key = (conflicts, -problem.course_slot_pref[c * S + s])
+            if best is None or key < best[0]:
+                best = (key, room, s)
+                if key[0] == 0 and key[1] <= -20:
+                    break
+        _, r, s = best
+        rooms[c], slots[c] = r, s
+        room_busy[r * S + s] = 1
+        if p >= 0:
+            prof_busy[p * S + s] += 1
+        if d >= 0:
+            dept_busy[d * S + s] += 1
+        slot_courses[s] |= 1 << c
+    return rooms, slots
+
 
-    max_no_improve = 200
-    steps_no_improve = 0
+# ---------------- Stage 1: Hill Climb for validity ----------------
+def _hill_climbing_for_validity(
+    problem: CompiledProblem,
+    verbose: bool = True,
+    rng: Optional[random.Random] = None,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Assignment] = None,
+    courses: Optional[List[int]] = None,
+    stage: str = "Stage 1 (HC)",
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int]:
+    """
+    Best-improvement hill climbing on hard cost, from `initial` or a random
+    assignment. With `courses`, only those courses are moved. A budget's
+    deadline stops the climb between steps.
+    """
+    if rng is None:
+        rng = random.Random()
+    if initial is None:
+        initial = _random_assignment(problem, rng)
+    state = ScheduleState(problem, initial)
+    current_cost = state.cost
 
     if verbose:
         print(f"HillClimb: starting with cost {current_cost}")
 
-    if not courses:
-        return current, current_cost
+    if not problem.n_courses:
+        return (state.rooms, state.slots), current_cost
 
-    while steps_no_improve < max_no_improve:
+    started = profile.begin(stage, state) if profile is not None else 0.0
+    step = 0
+    moved = 0
+    while True:
         if current_cost == 0:
             if verbose:
                 print("HillClimb: found valid schedule")
-            return current, 0
-
-        best_neighbor = None
-        best_cost = current_cost
-
-        for c in courses:
-            cname = _get_name(c).strip()
-            if not cname:
-                continue
-            orig = current.assignments.get(cname, (None, None))
-
-            for r in rooms:
-                rname = _get_name(r).strip()
-                for s in slots:
-                    sid = _get_slot_id(s)
-                    candidate = (rname, sid)
-                    if candidate == orig:
-                        continue
-
-                    neighbor = copy.deepcopy(current)
-                    neighbor.assignments[cname] = candidate
-                    _ensure_all_courses(neighbor, courses)
-
-                    cost = len(get_hard_constraint_violations(neighbor, all_data))
-                    if cost < best_cost:
-                        best_cost = cost
-                        best_neighbor = neighbor
-
-        if best_neighbor and best_cost < current_cost:
-            current = best_neighbor
-            current_cost = best_cost
-            steps_no_improve = 0
-            if verbose:
-                print(f"HillClimb: improved -> cost {current_cost}")
-        else:
-            steps_no_improve += 1
+            break
+        if monitor is not None:
+            monitor.update(stage, step, cost=current_cost, best=state.snapshot())
+            if monitor.cancelled:
+                break
+        if profile is not None:
+            profile.trace(stage, step, current_cost)
+        if budget is not None and budget.expired():
+            break
+        step += 1
+
+        # Best-improvement step over all (course, room, slot) moves at once.
+        # The scan is deterministic, so a scan without improvement means we are stuck.
+        best_move = state.hard.best_move(courses)
+        if best_move is None or best_move[0] >= 0:
+            break
+
+        delta, c, r, s = best_move
+        state.apply(c, r, s)
+        state.commit()
+        moved += 1
+        current_cost += delta
+        if verbose:
+            print(f"HillClimb: improved -> cost {current_cost}")
 
-    if verbose:
+    if verbose and current_cost > 0:
         print(f"HillClimb: stuck at cost {current_cost}")
-    return current, current_cost
+    if profile is not None:
+        profile.end(stage, started, step, moved, step - moved)
+    return (state.rooms, state.slots), current_cost
 
 
 # ---------------- Stage 2: SA focused on validity recovery ----------------
 def _simulated_annealing_for_validity(
-    broken_schedule: Schedule,
-    all_data: AllData,
-    verbose: bool = True
-) -> Tuple[Schedule, int, List[str]]:
+    problem: CompiledProblem,
+    broken: Assignment,
+    verbose: bool = True,
+    rng: Optional[random.Random] = None,
+    monitor: Optional[SolveMonitor] = None,
+    courses: Optional[List[int]] = None,
+    stage: str = "Stage 2 (SA')",
+    focus: float = 0.0,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int, List[str]]:
     """
     Tries to reduce hard constraint violations to 0 using SA.
-    Returns (best_schedule_found, final_cost, explanations_for_stage)
+    With `courses`, only those courses are moved. Otherwise a `focus` share of
+    moves picks a course currently in violation, and some of those swap the
+    placements of two such courses.
+    With a time budget the temperature is calibrated from sampled cost deltas and
+    cools over VALIDITY_SHARE of the remaining time, reheating until valid or out
+    of time; otherwise the fixed schedule below applies.
+    Returns (best_assignment_found, final_cost, explanations_for_stage)
     """
     explanations: List[str] = []
+    if rng is None:
+        rng = random.Random()
 
-    courses = all_data.get("courses", []) or []
-    rooms = all_data.get("rooms", []) or []
-    slots = all_data.get("time_slots", []) or []
-
-    current = copy.deepcopy(broken_schedule)
-    _ensure_all_courses(current, courses)
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    domains = problem.domains
 
-    current_cost = len(get_hard_constraint_violations(current, all_data))
-    best = copy.deepcopy(current)
+    state = ScheduleState(problem, broken)
+    current_cost = state.cost
+    best = state.snapshot()
     best_cost = current_cost
 
     if verbose:
         print(f"SA': starting from cost {current_cost}")
 
-    if not courses or not rooms or not slots:
+    if not C or not R or not S:
         explanations.append("SA': insufficient data to recover.")
-        return current, current_cost, explanations
-
-    temp = 500.0
-    cooling = 0.995
-    min_temp = 0.5
+        return best, current_cost, explanations
+
+    remaining = budget.remaining() if budget is not None else None
+    if remaining is not None:
+        pool = courses if courses is not None else range(C)
+        moves = [(c, *domains.sample(c, rng)) for c in (rng.choice(pool) for _ in range(CALIBRATION_SAMPLES))]
+        cooling = Cooling.timed(budget, lambda: [state.cost_delta(*m) for m in moves], remaining,
+                                segment=remaining * VALIDITY_SHARE)
+    else:
+        cooling = Cooling(500.0, 0.995, 0.5, max_iter=20000, budget=budget)
     it = 0
-    max_iter = 20000
-
-    while temp > min_temp and it < max_iter and best_cost > 0:
+    accepted = 0
+    started = profile.begin(stage, state) if profile is not None else 0.0
+
+    while best_cost > 0 and cooling.running(it):
+        if monitor is not None and it % monitor.every == 0:
+            monitor.update(stage, it, cost=best_cost, best=best)
+            if monitor.cancelled:
+                break
+        if profile is not None and it % profile.every == 0:
+            profile.trace(stage, it, current_cost)
         it += 1
 
-        c = random.choice(courses)
-        cname = _get_name(c).strip()
-        neighbor = copy.deepcopy(current)
-        new_room = random.choice(rooms)
-        new_slot = random.choice(slots)
-        neighbor.assignments[cname] = (_get_name(new_room).strip(), _get_slot_id(new_slot))
-        _ensure_all_courses(neighbor, courses)
-
-        new_cost = len(get_hard_constraint_violations(neighbor, all_data))
+        other = -1
+        if courses is not None:
+            c = courses[rng.randrange(len(courses))]
+        elif focus and state.hard.n_conflicted and rng.random() < focus:
+            c = state.hard.sample_conflicted(rng)
+            if state.hard.n_conflicted > 1 and rng.random() < _CONFLICT_SWAP_SHARE:
+                other = state.hard.sample_conflicted(rng)
+        else:
+            c = rng.randrange(C)
+
+        if other >= 0 and other != c:
+            # Swap placements; priced by applying both moves, undone on rejection
+            r, s = state.rooms[c], state.slots[c]
+            mark = state.mark()
+            state.apply(c, state.rooms[other], state.slots[other])
+            state.apply(other, r, s)
+            new_cost = state.cost
+        else:
+            other = -1
+            r, s = domains.sample(c, rng)
+            new_cost = current_cost + state.cost_delta(c, r, s)
         delta_energy = (-new_cost) - (-current_cost)
 
         accept = False
@@ -197,112 +356,264 @@ def _simulated_annealing_for_validity(
             accept = True
         else:
             try:
-                prob = math.exp(delta_energy / temp)
+                prob = math.exp(delta_energy / cooling.temp)
             except OverflowError:
                 prob = 0.0
-            if random.random() < prob:
+            if rng.random() < prob:
                 accept = True
 
         if accept:
-            current = neighbor
+            if other < 0:
+                state.apply(c, r, s)
+            state.commit()
+            accepted += 1
             current_cost = new_cost
             if current_cost < best_cost:
-                best = copy.deepcopy(current)
+                best = state.snapshot()
                 best_cost = current_cost
+                cooling.improved(it)
+        elif other >= 0:
+            state.revert(mark)
 
-        temp *= cooling
+        cooling.cool()
 
+    if profile is not None:
+        profile.end(stage, started, it, accepted, it - accepted)
+    stopped = cooling.describe("SA'") if best_cost > 0 else None
+    if stopped:
+        explanations.append(stopped)
     explanations.append(f"SA': best cost after recovery attempt = {best_cost}")
     if best_cost == 0:
         explanations.append("SA': recovered a fully valid schedule.")
     else:
         explanations.append("SA': could not fully recover to 0 violations.")
 
-    _ensure_all_courses(best, courses)
     return best, best_cost, explanations
 
 
+# ---------------- Stage 3 move operators ----------------
+def _kempe_chain(problem: CompiledProblem, state: ScheduleState, seed: int, s1: int, s2: int) -> List[int]:
+    """
+    Courses in slots s1/s2 connected to `seed` through a shared professor,
+    department or room, or a curriculum clash, across the two slots. Exchanging the slots of the whole
+    chain cannot create a double-booking between two courses in those slots.
+    """
+    slots = np.frombuffer(state.slots, dtype=np.intc)
+    members = np.flatnonzero((slots == s1) | (slots == s2)).tolist()
+    by_resource: Dict[Tuple[int, int], List[int]] = {}
+    for c in members:
+        for key in ((0, problem.course_prof[c]), (1, problem.course_dept[c]), (2, state.rooms[c])):
+            if key[1] >= 0:
+                by_resource.setdefault(key, []).append(c)
+
+    chain = {seed}
+    stack = [seed]
+    while stack:
+        c = stack.pop()
+        for key in ((0, problem.course_prof[c]), (1, problem.course_dept[c]), (2, state.rooms[c])):
+            for o in by_resource.get(key, ()):
+                if o not in chain and state.slots[o] != state.slots[c]:
+                    chain.add(o)
+                    stack.append(o)
+        for o in problem.conflict_adj[c]:
+            if o not in chain and state.slots[o] in (s1, s2) and state.slots[o] != state.slots[c]:
+                chain.add(o)
+                stack.append(o)
+    return sorted(chain)
+
+
+def _apply_compound(kind: str, problem: CompiledProblem, state: ScheduleState, rng: random.Random) -> bool:
+    """
+    Apply one swap / room_swap / kempe move through state.apply, so it can be
+    undone with revert(). Returns False when the draw gives nothing to change.
+    """
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    a = rng.randrange(C)
+    ra, sa = state.rooms[a], state.slots[a]
+    if kind == "swap":
+        # Exchange two courses' (room, slot)
+        b = rng.randrange(C)
+        rb, sb = state.rooms[b], state.slots[b]
+        if (rb, sb) == (ra, sa):
+            return False
+        state.apply(a, rb, sb)
+        state.apply(b, ra, sa)
+    elif kind == "room_swap":
+        # Change rooms within the slot, trading with the current occupant if any
+        r = rng.randrange(R)
+        if r == ra:
+            return False
+        b = state.hard.room_occupant(r, sa)
+        state.apply(a, r, sa)
+        if b >= 0:
+            state.apply(b, ra, sa)
+    else:
+        # Kempe chain: exchange slots s1 <-> s2 for the chain around course a
+        s2 = rng.randrange(S)
+        if s2 == sa:
+            return False
+        for c in _kempe_chain(problem, state, a, sa, s2):
+            state.apply(c, state.rooms[c], s2 if state.slots[c] == sa else sa)
+    return True
+
+
 # ---------------- Stage 3: SA optimize for happiness ----------------
 def _simulated_annealing_for_happiness(
-    valid_schedule: Schedule,
-    all_data: AllData,
-    verbose: bool = True
-) -> Tuple[Schedule, int, List[str]]:
+    problem: CompiledProblem,
+    valid: Assignment,
+    verbose: bool = True,
+    rng: Optional[random.Random] = None,
+    monitor: Optional[SolveMonitor] = None,
+    move_mix: Optional[Dict[str, float]] = None,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int, List[str]]:
     """
-    Given a valid schedule (cost==0), try to maximize happiness using SA (MOVE neighbor).
-    Returns (best_schedule, best_score, explanations)
+    Given a valid assignment (cost==0), try to maximize happiness using SA.
+    Each iteration draws an operator from move_mix (weights per MOVE_KINDS entry):
+    a single MOVE is priced with deltas, compound moves are applied, checked for
+    feasibility and reverted if infeasible or rejected. A MOVE-only mix runs in
+    the array kernel instead (see kernel.anneal_moves). Without a move_mix this
+    is MOVE-only when the kernel is compiled with Numba, COMPOUND_MIX otherwise.
+    With a time budget the temperature is calibrated from sampled score deltas
+    and cools over all the remaining time. A budget's target happiness ends the
+    search as soon as it is reached.
+    Returns (best_assignment, best_score, explanations)
     """
     explanations: List[str] = []
+    if rng is None:
+        rng = random.Random()
 
-    courses = all_data.get("courses", []) or []
-    rooms = all_data.get("rooms", []) or []
-    slots = all_data.get("time_slots", []) or []
-
-    base = copy.deepcopy(valid_schedule)
-    _ensure_all_courses(base, courses)
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    domains = problem.domains
 
-    current = copy.deepcopy(base)
-    current_score = calculate_happiness_score(current, all_data)
-    best = copy.deepcopy(current)
+    state = ScheduleState(problem, valid, track_happiness=True)
+    current_score = state.score
+    best = state.snapshot()
     best_score = current_score
 
     if verbose:
         print(f"SA: starting with desirability {current_score}")
 
-    if len(courses) < 1 or not rooms or not slots:
+    if C < 1 or not R or not S:
         explanations.append("SA: insufficient data to optimize.")
-        return current, current_score, explanations
-
-    temp = 1000.0
-    cooling = 0.995
-    min_temp = 0.5
+        return best, current_score, explanations
+
+    if move_mix is None:
+        move_mix = {"move": 1.0} if kernel.KERNEL == "numba" else COMPOUND_MIX
+    kinds = [k for k in MOVE_KINDS if move_mix.get(k, 0.0) > 0]
+    weights = [move_mix[k] for k in kinds]
+    total = sum(weights)
+    accepted = 0
+
+    remaining = budget.remaining() if budget is not None else None
+    if remaining is not None:
+        moves = [(c, *domains.sample(c, rng)) for c in (rng.randrange(C) for _ in range(CALIBRATION_SAMPLES))]
+        cooling = Cooling.timed(
+            budget, lambda: [-state.score_delta(*m) for m in moves if state.cost_delta(*m) == 0], remaining
+        )
+    else:
+        cooling = Cooling(1000.0, 0.995, 0.5, max_iter=20000, budget=budget)
+    target = budget.target_happiness if budget is not None else None
     it = 0
-    max_iter = 20000
-
-    while temp > min_temp and it < max_iter:
-        it += 1
-        c = random.choice(courses)
-        cname = _get_name(c).strip()
-        neighbor = copy.deepcopy(current)
-        new_room = random.choice(rooms)
-        new_slot = random.choice(slots)
-        neighbor.assignments[cname] = (_get_name(new_room).strip(), _get_slot_id(new_slot))
-        _ensure_all_courses(neighbor, courses)
-
-        if get_hard_constraint_violations(neighbor, all_data):
-            temp *= cooling
-            continue
-
-        neighbor_score = calculate_happiness_score(neighbor, all_data)
-        delta = neighbor_score - current_score
-
-        if neighbor_score > best_score:
-            best = copy.deepcopy(neighbor)
-            best_score = neighbor_score
+    stage = "Stage 3 (SA)"
+    started = profile.begin(stage, state) if profile is not None else 0.0
 
-        if delta > 0:
-            current = neighbor
-            current_score = neighbor_score
-        else:
-            try:
-                prob = math.exp(delta / temp)
-            except OverflowError:
-                prob = 0.0
-            if random.random() < prob:
-                current = neighbor
+    if kinds == ["move"]:
+        best, best_score, it, accepted = kernel.anneal_moves(
+            problem, state, rng, cooling, target, stage=stage, monitor=monitor, profile=profile
+        )
+    else:
+        while (target is None or best_score < target) and cooling.running(it):
+            if monitor is not None and it % monitor.every == 0:
+                monitor.update(stage, it, cost=0, happiness=best_score, best=best)
+                if monitor.cancelled:
+                    break
+            if profile is not None and it % profile.every == 0:
+                profile.trace(stage, it, state.cost, current_score)
+            it += 1
+
+            kind = kinds[0]
+            if len(kinds) > 1:
+                x = rng.random() * total
+                for kind, w in zip(kinds, weights):
+                    if x < w:
+                        break
+                    x -= w
+
+            if kind == "move":
+                c = rng.randrange(C)
+                r, s = domains.sample(c, rng)
+                if state.cost + state.cost_delta(c, r, s) > 0:
+                    cooling.cool()
+                    continue
+                neighbor_score = current_score + state.score_delta(c, r, s)
+            else:
+                mark = state.mark()
+                if not _apply_compound(kind, problem, state, rng):
+                    cooling.cool()
+                    continue
+                if state.cost > 0:
+                    state.revert(mark)
+                    cooling.cool()
+                    continue
+                neighbor_score = state.score
+            delta = neighbor_score - current_score
+
+            if delta > 0:
+                accept = True
+            else:
+                try:
+                    prob = math.exp(delta / cooling.temp)
+                except OverflowError:
+                    prob = 0.0
+                accept = rng.random() < prob
+
+            if accept:
+                if kind == "move":
+                    state.apply(c, r, s)
+                state.commit()
+                accepted += 1
                 current_score = neighbor_score
-
-        temp *= cooling
-
+                # current never exceeds best, so any new best is an accepted move
+                if current_score > best_score:
+                    best = state.snapshot()
+                    best_score = current_score
+                    cooling.improved(it)
+            elif kind != "move":
+                state.revert(mark)
+
+            cooling.cool()
+
+    if profile is not None:
+        profile.end(stage, started, it, accepted, it - accepted)
+    if verbose:
+        print(f"SA: accepted {accepted} of {it} moves")
+    if target is not None and best_score >= target:
+        explanations.append(f"Stage 3 (SA): reached the target desirability {target}.")
+    else:
+        stopped = cooling.describe("Stage 3 (SA)")
+        if stopped:
+            explanations.append(stopped)
     explanations.append(f"Stage 3 (SA): best desirability found = {best_score}")
-    _ensure_all_courses(best, courses)
     return best, best_score, explanations
 
 
 # ---------------- Master controller ----------------
+def _budget_summary(budget: Budget, stage_seconds: List[float]) -> str:
+    spent = ", ".join(f"Stage {i + 1} {t:.2f}s" for i, t in enumerate(stage_seconds))
+    if budget.seconds is None:
+        return f"Budget: {spent}."
+    return f"Budget: used {budget.elapsed():.2f}s of {budget.seconds:g}s ({spent})."
+
+
 def solve_and_optimize_schedule(
     all_data: AllData,
-    verbose: bool = False
+    verbose: bool = False,
+    options: Optional[SolveOptions] = None,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
 ) -> Tuple[Schedule, List[str], int, List[str]]:
     """
     Returns:
@@ -310,58 +621,149 @@ def solve_and_optimize_schedule(
       final_violations (List[str]),
       happiness_score (int),
       explanations (List[str])
+    The same options.seed always reproduces the same result.
+    A monitor receives progress and can cancel the solve, which then returns the
+    best schedule found so far.
+    With an initial schedule, Stage 1 starts from it instead of a random one.
+    A profile, if given, records time, iterations, acceptance, evaluation counts
+    and cost/score traces per stage.
     """
+    options = options or SolveOptions()
+    # All stages run on the integer-indexed form; decode once at the end
+    with profiled(profile, "Compile"):
+        problem = compile_problem(all_data)
+    return _solve_compiled(
+        problem, all_data, random.Random(options.seed), options, verbose=verbose, monitor=monitor,
+        initial=initial, profile=profile
+    )
+
+
+def _solve_compiled(
+    problem: CompiledProblem,
+    all_data: AllData,
+    rng: random.Random,
+    options: SolveOptions,
+    verbose: bool = False,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Schedule, List[str], int, List[str]]:
     explanations: List[str] = []
+    tempering = options.annealer == "tempering"
+    tabu = options.annealer == "tabu"
+    if monitor is not None:
+        monitor.attach(problem)
+    if options.two_phase:
+        # Slots first, then rooms by per-slot matching (imported here: it builds on this module)
+        from .twophase import solve_two_phase
+        return solve_two_phase(problem, all_data, rng, options, monitor=monitor, initial=initial, profile=profile)
+    label = "PT" if tempering else "TS" if tabu else "SA"
+    # Time budget, target and stagnation window; None keeps the fixed schedules
+    budget = Budget.from_options(options)
+
+    # Feasible domains are built once here and shared by every stage
+    with profiled(profile, "Domains"):
+        domains = problem.domains
+    if not domains.feasible:
+        explanations.append("Feasibility: no fully valid schedule exists for this problem.")
+        explanations.extend(f"Feasibility: {line}" for line in domains.report)
 
     # Stage 1: hill-climb for validity
     if verbose:
         print("Stage 1 (HC)")
-    stage1_schedule, stage1_cost = _hill_climbing_for_validity(all_data, verbose=verbose)
+    with profiled(profile, "Initializer"):
+        if initial is not None:
+            start = _seeded_assignment(problem, initial, rng)
+        elif options.initializer == "greedy":
+            start = _greedy_assignment(problem, rng)
+        else:
+            start = _random_assignment(problem, rng)
+    stage1_assignment, stage1_cost = _hill_climbing_for_validity(
+        problem, verbose=verbose, rng=rng, monitor=monitor, initial=start, profile=profile, budget=budget
+    )
+    stage_seconds = [budget.elapsed()] if budget is not None else []
     explanations.append(f"Stage 1 (HC): Finished with cost {stage1_cost}.")
     if stage1_cost == 0:
-        hc_happiness = calculate_happiness_score(stage1_schedule, all_data)
+        hc_happiness = HappinessScorer(problem, *stage1_assignment).score
         explanations.append(f"Stage 1 (HC): Valid schedule found with desirability = {hc_happiness}.")
 
 
     used_stage2 = False
 
-    # If stage1 didn't find valid schedule, try Stage 2: SA for validity recovery
+    # If stage1 didn't find valid schedule, try Stage 2: SA (or PT, or TS) for validity recovery
     if stage1_cost > 0:
         if verbose:
-            print("Stage 2 (SA') starting")
+            print(f"Stage 2 ({label}') starting")
         used_stage2 = True
-        recovered_schedule, recovered_cost, stage2_expl = _simulated_annealing_for_validity(
-            stage1_schedule, all_data, verbose=verbose
-        )
+        if tempering:
+            recovered, recovered_cost, stage2_expl = _tempering_for_validity(
+                problem, stage1_assignment, rng, options.replicas, options.tempering_workers,
+                verbose=verbose, monitor=monitor, focus=options.conflict_focus, budget=budget, profile=profile
+            )
+        elif tabu:
+            recovered, recovered_cost, stage2_expl = _tabu_for_validity(
+                problem, stage1_assignment, rng, verbose=verbose, monitor=monitor, focus=options.conflict_focus,
+                profile=profile, budget=budget
+            )
+        else:
+            recovered, recovered_cost, stage2_expl = _simulated_annealing_for_validity(
+                problem, stage1_assignment, verbose=verbose, rng=rng, monitor=monitor, focus=options.conflict_focus,
+                profile=profile, budget=budget
+            )
+        if budget is not None:
+            stage_seconds.append(budget.elapsed() - sum(stage_seconds))
         explanations.extend(stage2_expl)
-        explanations.append(f"Stage 2 (SA'): cost {recovered_cost}.")
-        schedule_after_stage2 = recovered_schedule
+        explanations.append(f"Stage 2 ({label}'): cost {recovered_cost}.")
+        assignment_after_stage2 = recovered
         final_cost = recovered_cost
     else:
-        schedule_after_stage2 = stage1_schedule
+        assignment_after_stage2 = stage1_assignment
         final_cost = stage1_cost
 
     if final_cost > 0:
         # unable to find fully valid schedule — return best attempt so far
+        schedule_after_stage2 = problem.decode(*assignment_after_stage2)
         final_violations = get_hard_constraint_violations(schedule_after_stage2, all_data)
         explanations.append("Unable to produce fully valid schedule after Stage 2. Returning best-effort result.")
+        if budget is not None:
+            explanations.append(_budget_summary(budget, stage_seconds))
+        if monitor is not None and monitor.cancelled:
+            explanations.append("Solve was cancelled; returning the best schedule found so far.")
         # compute happiness for reporting
         happiness = calculate_happiness_score(schedule_after_stage2, all_data)
         return schedule_after_stage2, final_violations, int(happiness), explanations
 
     # Stage 3: we have a valid schedule — optimize happiness
     if verbose:
-        print("Stage 3 (SA) starting")
-    opt_schedule, opt_score, stage3_expl = _simulated_annealing_for_happiness(
-        schedule_after_stage2, all_data, verbose=verbose
-    )
+        print(f"Stage 3 ({label}) starting")
+    if tempering:
+        opt_assignment, opt_score, stage3_expl = _tempering_for_happiness(
+            problem, assignment_after_stage2, rng, options.replicas, options.tempering_workers,
+            verbose=verbose, monitor=monitor, budget=budget, profile=profile
+        )
+    elif tabu:
+        opt_assignment, opt_score, stage3_expl = _tabu_for_happiness(
+            problem, assignment_after_stage2, rng, verbose=verbose, monitor=monitor, profile=profile, budget=budget
+        )
+    else:
+        opt_assignment, opt_score, stage3_expl = _simulated_annealing_for_happiness(
+            problem, assignment_after_stage2, verbose=verbose, rng=rng, monitor=monitor,
+            move_mix=options.move_mix, profile=profile, budget=budget
+        )
     explanations.extend(stage3_expl)
+    if budget is not None:
+        stage_seconds.append(budget.elapsed() - sum(stage_seconds))
+        explanations.append(_budget_summary(budget, stage_seconds))
 
     # final validation and violations
-    final_violations = get_hard_constraint_violations(opt_schedule, all_data)
+    with profiled(profile, "Validate"):
+        opt_schedule = problem.decode(*opt_assignment)
+        final_violations = get_hard_constraint_violations(opt_schedule, all_data)
     final_happiness = int(opt_score)
 
-    explanations.append("Completed optimization with SA.")
+    explanations.append(f"Completed optimization with {label}.")
+    if monitor is not None and monitor.cancelled:
+        explanations.append("Solve was cancelled; returning the best schedule found so far.")
     if used_stage2:
         explanations.insert(1, "Note: Stage 2 (recovery) was used because Stage 1 failed to find a valid solution.")
 
@@ -0,0 +1,204 @@
+import random
+from array import array
+from typing import List, Optional, Tuple
+
+from .compiled import Assignment, CompiledProblem
+from .engine import ScheduleState
+from .monitor import SolveMonitor
+from .profiling import SolveProfile
+from .cooling import Budget, Cooling
+from .tempering import HAPPINESS, VALIDITY
+
+# Candidate moves sampled per iteration; the best admissible one is taken
+NEIGHBOURHOOD = 20
+
+# A course may not return to a slot it left for TENURE + randrange(TENURE_SPREAD) iterations
+TENURE = 10
+TENURE_SPREAD = 10
+
+# Without a new best for this many iterations, restart from the best with KICK_SHARE
+# of the courses (at least 2) moved at random
+DIVERSIFY_AFTER = 300
+KICK_SHARE = 0.02
+
+# Iterations per phase without a time budget
+ITERATIONS = 2000
+
+
+def _kick(state: ScheduleState, problem: CompiledProblem, mode: str, rng: random.Random) -> None:
+    # Random moves; in happiness mode only ones that keep the schedule valid
+    C = problem.n_courses
+    for _ in range(max(2, int(C * KICK_SHARE))):
+        c = rng.randrange(C)
+        r, s = problem.domains.sample(c, rng)
+        if mode == VALIDITY or state.cost_delta(c, r, s) == 0:
+            state.apply(c, r, s)
+    state.commit()
+
+
+def tabu_search(
+    problem: CompiledProblem,
+    start: Assignment,
+    mode: str,
+    rng: random.Random,
+    monitor: Optional[SolveMonitor] = None,
+    stage: str = "",
+    focus: float = 0.0,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int, int, Optional[str]]:
+    """
+    Tabu search on the energy of `mode` (hard cost, or -score among valid moves).
+    Each iteration samples NEIGHBOURHOOD moves from the domains (in validity mode a
+    `focus` share of them for courses in violation) and applies the best one that
+    is not tabu, even if it is worse. Moving a course out of a slot makes
+    returning it there tabu for a randomized tenure; a tabu move is still allowed
+    when it would beat the best energy (aspiration). After DIVERSIFY_AFTER
+    iterations without a new best the search restarts from the best with a kick.
+    Runs ITERATIONS iterations, or until a budget's deadline when it has one; a
+    budget's target and stagnation window end it early too.
+    Returns (best assignment, best energy, iterations, budget note or None).
+    """
+    C, S = problem.n_courses, problem.n_slots
+    domains = problem.domains
+    state = ScheduleState(problem, start, track_happiness=(mode == HAPPINESS))
+    energy = state.cost if mode == VALIDITY else -state.score
+    best = state.snapshot()
+    best_energy = energy
+
+    # Stopping rule only: the temperature is unused
+    deadline = budget is not None and budget.deadline is not None
+    stop = Cooling(1.0, 1.0, 0.0, max_iter=None if deadline else ITERATIONS, budget=budget)
+    target = budget.target_happiness if budget is not None and mode == HAPPINESS else None
+    tabu_until = array("i", [0] * (C * S))
+    it = 0
+    accepted = 0
+    last_best = 0
+    started = profile.begin(stage, state) if profile is not None else 0.0
+
+    while (mode == HAPPINESS or best_energy > 0) and (target is None or -best_energy < target) and stop.running(it):
+        if monitor is not None and it % monitor.every == 0:
+            if mode == VALIDITY:
+                monitor.update(stage, it, cost=best_energy, best=best)
+            else:
+                monitor.update(stage, it, cost=0, happiness=-best_energy, best=best)
+            if monitor.cancelled:
+                break
+        if profile is not None and it % profile.every == 0:
+            profile.trace(stage, it, state.cost, state.score if mode == HAPPINESS else None)
+        it += 1
+
+        chosen = None
+        for _ in range(NEIGHBOURHOOD):
+            if mode == VALIDITY and focus and state.hard.n_conflicted and rng.random() < focus:
+                c = state.hard.sample_conflicted(rng)
+            else:
+                c = rng.randrange(C)
+            r, s = domains.sample(c, rng)
+            if r == state.rooms[c] and s == state.slots[c]:
+                continue
+            if mode == VALIDITY:
+                d = state.cost_delta(c, r, s)
+            elif state.cost_delta(c, r, s) == 0:
+                d = -state.score_delta(c, r, s)
+            else:
+                continue
+            if tabu_until[c * S + s] > it and energy + d >= best_energy:
+                continue
+            if chosen is None or d < chosen[0]:
+                chosen = (d, c, r, s)
+
+        if chosen is not None:
+            d, c, r, s = chosen
+            s0 = state.slots[c]
+            if s0 >= 0 and s0 != s:
+                tabu_until[c * S + s0] = it + TENURE + rng.randrange(TENURE_SPREAD)
+            state.apply(c, r, s)
+            state.commit()
+            accepted += 1
+            energy += d
+            if energy < best_energy:
+                best = state.snapshot()
+                best_energy = energy
+                last_best = it
+                stop.improved(it)
+
+        if it - last_best >= DIVERSIFY_AFTER:
+            state.restore(best)
+            _kick(state, problem, mode, rng)
+            energy = state.cost if mode == VALIDITY else -state.score
+            last_best = it
+
+    if profile is not None:
+        profile.end(stage, started, it, accepted, it - accepted)
+    note = None
+    if mode == HAPPINESS or best_energy > 0:
+        note = stop.describe(stage)
+    return best, best_energy, it, note
+
+
+# ---------------- Stage 2 alternative: tabu search for validity recovery ----------------
+def _tabu_for_validity(
+    problem: CompiledProblem,
+    broken: Assignment,
+    rng: random.Random,
+    verbose: bool = True,
+    monitor: Optional[SolveMonitor] = None,
+    focus: float = 0.0,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int, List[str]]:
+    """
+    Tabu-search counterpart of _simulated_annealing_for_validity.
+    """
+    explanations: List[str] = []
+    if not problem.n_courses or not problem.n_rooms or not problem.n_slots:
+        explanations.append("TS': insufficient data to recover.")
+        return broken, ScheduleState(problem, broken).cost, explanations
+
+    best, best_cost, iterations, note = tabu_search(
+        problem, broken, VALIDITY, rng, monitor=monitor, stage="Stage 2 (TS')", focus=focus,
+        profile=profile, budget=budget
+    )
+    if verbose:
+        print(f"TS': best cost {best_cost} after {iterations} iterations")
+    if note:
+        explanations.append(note)
+    explanations.append(f"TS': best cost after recovery attempt = {best_cost} ({iterations} iterations)")
+    if best_cost == 0:
+        explanations.append("TS': recovered a fully valid schedule.")
+    else:
+        explanations.append("TS': could not fully recover to 0 violations.")
+    return best, best_cost, explanations
+
+
+# ---------------- Stage 3 alternative: tabu search for happiness ----------------
+def _tabu_for_happiness(
+    problem: CompiledProblem,
+    valid: Assignment,
+    rng: random.Random,
+    verbose: bool = True,
+    monitor: Optional[SolveMonitor] = None,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[Assignment, int, List[str]]:
+    """
+    Tabu-search counterpart of _simulated_annealing_for_happiness (single moves only).
+    """
+    explanations: List[str] = []
+    if not problem.n_courses or not problem.n_rooms or not problem.n_slots:
+        explanations.append("TS: insufficient data to optimize.")
+        return valid, ScheduleState(problem, valid, track_happiness=True).score, explanations
+
+    best, best_energy, iterations, note = tabu_search(
+        problem, valid, HAPPINESS, rng, monitor=monitor, stage="Stage 3 (TS)", profile=profile, budget=budget
+    )
+    if verbose:
+        print(f"TS: best desirability {-best_energy} after {iterations} iterations")
+    target = budget.target_happiness if budget is not None else None
+    if target is not None and -best_energy >= target:
+        explanations.append(f"Stage 3 (TS): reached the target desirability {target}.")
+    elif note:
+        explanations.append(note)
+    explanations.append(f"Stage 3 (TS): best desirability found = {-best_energy}")
+    return best, -best_energy, explanations
@@ -0,0 +1,281 @@
+import itertools
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compiled import Assignment, CompiledProblem
+from .engine import ScheduleState
+from .monitor import SolveMonitor
+from .profiling import SolveProfile
+from .cooling import Budget
+
+# "validity" minimizes hard cost; "happiness" maximizes the score among valid moves.
+# Both are expressed as an energy to minimize: cost, or -score.
+VALIDITY = "validity"
+HAPPINESS = "happiness"
+
+# Segment result: (final assignment, final energy, best assignment, best energy,
+# moves tried, moves accepted, evaluation profile or None)
+SegmentResult = Tuple[Assignment, int, Assignment, int, int, int, Optional[Dict[str, Any]]]
+
+# Per-process problem, installed once by _init_worker
+_worker_problem: Optional[CompiledProblem] = None
+
+
+def _init_worker(problem: CompiledProblem) -> None:
+    global _worker_problem
+    _worker_problem = problem
+
+
+def _worker_segment(
+    assignment: Assignment, mode: str, temp: float, steps: int, seed: int, focus: float = 0.0,
+    stage: Optional[str] = None
+) -> SegmentResult:
+    return _run_segment(_worker_problem, assignment, mode, temp, steps, seed, focus, stage)
+
+
+def _run_segment(
+    problem: CompiledProblem,
+    assignment: Assignment,
+    mode: str,
+    temp: float,
+    steps: int,
+    seed: int,
+    focus: float = 0.0,
+    stage: Optional[str] = None
+) -> SegmentResult:
+    """
+    Run `steps` Metropolis moves at a fixed temperature from `assignment`.
+    In validity mode a `focus` share of moves picks a course currently in violation.
+    With a `stage`, the segment's constraint checks and scoring calls are counted
+    and timed under it, and returned as a profile dict to merge.
+    """
+    rng = random.Random(seed)
+    state = ScheduleState(problem, assignment, track_happiness=(mode == HAPPINESS))
+    counter = SolveProfile() if stage is not None else None
+    if counter is not None:
+        counter.instrument(state, stage)
+    C = problem.n_courses
+    energy = state.cost if mode == VALIDITY else -state.score
+    best = state.snapshot()
+    best_energy = energy
+    moves = 0
+    accepted = 0
+
+    for _ in range(steps):
+        if mode == VALIDITY and energy == 0:
+            break
+        moves += 1
+        if mode == VALIDITY and focus and state.hard.n_conflicted and rng.random() < focus:
+            c = state.hard.sample_conflicted(rng)
+        else:
+            c = rng.randrange(C)
+        r, s = problem.domains.sample(c, rng)
+        if mode == VALIDITY:
+            d = state.cost_delta(c, r, s)
+        else:
+            # Stage 3 never leaves the valid region
+            if state.cost_delta(c, r, s) > 0:
+                continue
+            d = -state.score_delta(c, r, s)
+        if d > 0:
+            try:
+                prob = math.exp(-d / temp)
+            except OverflowError:
+                prob = 0.0
+            if rng.random() >= prob:
+                continue
+        state.apply(c, r, s)
+        state.commit()
+        accepted += 1
+        energy += d
+        if energy < best_energy:
+            best = state.snapshot()
+            best_energy = energy
+
+    evaluations = counter.to_dict() if counter is not None else None
+    return state.snapshot(), energy, best, best_energy, moves, accepted, evaluations
+
+
+def replica_exchange(
+    problem: CompiledProblem,
+    start: Assignment,
+    mode: str,
+    rng: random.Random,
+    t_min: float,
+    t_max: float,
+    replicas: int = 4,
+    rounds: int = 20,
+    steps: int = 200,
+    workers: int = 1,
+    monitor: Optional[SolveMonitor] = None,
+    stage: str = "",
+    focus: float = 0.0,
+    budget: Optional[Budget] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Assignment, int, int]:
+    """
+    Parallel tempering: `replicas` chains on a geometric temperature ladder
+    t_min..t_max, all started from `start`. After every round of `steps` moves per
+    chain, neighbouring chains swap states with the usual Metropolis criterion.
+    With workers > 1 the chains of a round run in separate processes.
+    The monitor, if any, is updated and checked for cancellation between rounds.
+    With a budget, rounds continue past `rounds` until its deadline, and stop
+    early at its target happiness or after its stagnation window (counted in
+    moves per chain).
+    A profile records every chain's moves (rounds x steps in all),
+    acceptances and constraint/score evaluations, and the best energy once per
+    round.
+    Returns (best assignment, best energy, rounds run).
+    """
+    replicas = max(1, replicas)
+    if replicas == 1:
+        temps = [t_min]
+    else:
+        ratio = (t_max / t_min) ** (1.0 / (replicas - 1))
+        temps = [t_min * ratio ** i for i in range(replicas)]
+
+    probe = ScheduleState(problem, start, track_happiness=(mode == HAPPINESS))
+    start_energy = probe.cost if mode == VALIDITY else -probe.score
+    chains: List[Tuple[Assignment, int]] = [(start, start_energy)] * replicas
+    best, best_energy = start, start_energy
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, replicas), initializer=_init_worker, initargs=(problem,))
+    done_rounds = 0
+    last_best = 0
+    deadline = budget.deadline if budget is not None else None
+    target = budget.target_happiness if budget is not None and mode == HAPPINESS else None
+    stagnation = budget.stagnation if budget is not None else None
+    started = profile.begin(stage) if profile is not None else 0.0
+    # Chains run on their own states, possibly in other processes: they profile
+    # their evaluations themselves and the results are merged in
+    counted = stage if profile is not None else None
+    moves = accepted = 0
+    try:
+        for rnd in (itertools.count() if deadline is not None else range(rounds)):
+            if mode == VALIDITY and best_energy == 0:
+                break
+            if budget is not None and (
+                budget.expired()
+                or (target is not None and -best_energy >= target)
+                or (stagnation is not None and (rnd - last_best) * steps >= stagnation)
+            ):
+                break
+            if monitor is not None:
+                if mode == VALIDITY:
+                    monitor.update(stage, rnd * steps, cost=best_energy, best=best)
+                else:
+                    monitor.update(stage, rnd * steps, cost=0, happiness=-best_energy, best=best)
+                if monitor.cancelled:
+                    break
+            if profile is not None:
+                if mode == VALIDITY:
+                    profile.trace(stage, rnd * steps, best_energy)
+                else:
+                    profile.trace(stage, rnd * steps, 0, -best_energy)
+            seeds = [rng.randrange(2 ** 32) for _ in range(replicas)]
+            if pool is None:
+                results = [
+                    _run_segment(problem, chains[i][0], mode, temps[i], steps, seeds[i], focus, counted)
+                    for i in range(replicas)
+                ]
+            else:
+                futures = [
+                    pool.submit(_worker_segment, chains[i][0], mode, temps[i], steps, seeds[i], focus, counted)
+                    for i in range(replicas)
+                ]
+                results = [f.result() for f in futures]
+            done_rounds += 1
+
+            for i, result in enumerate(results):
+                final, energy, seg_best, seg_best_energy, seg_moves, seg_accepted, seg_evaluations = result
+                chains[i] = (final, energy)
+                moves += seg_moves
+                accepted += seg_accepted
+                if seg_evaluations is not None:
+                    profile.merge(seg_evaluations)
+                if seg_best_energy < best_energy:
+                    best, best_energy = seg_best, seg_best_energy
+                    last_best = rnd + 1
+
+            # Alternate even/odd neighbour pairs between rounds
+            for i in range(rnd % 2, replicas - 1, 2):
+                e_cold, e_hot = chains[i][1], chains[i + 1][1]
+                x = (e_cold - e_hot) * (1.0 / temps[i] - 1.0 / temps[i + 1])
+                if x >= 0 or rng.random() < math.exp(x):
+                    chains[i], chains[i + 1] = chains[i + 1], chains[i]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if profile is not None:
+        profile.end(stage, started, moves, accepted, moves - accepted)
+    return best, best_energy, done_rounds
+
+
+# ---------------- Stage 2 alternative: PT focused on validity recovery ----------------
+def _tempering_for_validity(
+    problem: CompiledProblem,
+    broken: Assignment,
+    rng: random.Random,
+    replicas: int = 4,
+    workers: int = 1,
+    verbose: bool = True,
+    monitor: Optional[SolveMonitor] = None,
+    focus: float = 0.0,
+    budget: Optional[Budget] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Assignment, int, List[str]]:
+    """
+    Replica-exchange counterpart of _simulated_annealing_for_validity.
+    """
+    explanations: List[str] = []
+    if not problem.n_courses or not problem.n_rooms or not problem.n_slots:
+        explanations.append("PT': insufficient data to recover.")
+        return broken, ScheduleState(problem, broken).cost, explanations
+
+    best, best_cost, rounds = replica_exchange(
+        problem, broken, VALIDITY, rng, t_min=0.5, t_max=500.0, replicas=replicas, workers=workers,
+        monitor=monitor, stage="Stage 2 (PT')", focus=focus, budget=budget, profile=profile
+    )
+    if verbose:
+        print(f"PT': best cost {best_cost} after {rounds} rounds")
+    explanations.append(f"PT': best cost after recovery attempt = {best_cost} ({replicas} replicas, {rounds} rounds)")
+    if best_cost == 0:
+        explanations.append("PT': recovered a fully valid schedule.")
+    else:
+        explanations.append("PT': could not fully recover to 0 violations.")
+    return best, best_cost, explanations
+
+
+# ---------------- Stage 3 alternative: PT optimize for happiness ----------------
+def _tempering_for_happiness(
+    problem: CompiledProblem,
+    valid: Assignment,
+    rng: random.Random,
+    replicas: int = 4,
+    workers: int = 1,
+    verbose: bool = True,
+    monitor: Optional[SolveMonitor] = None,
+    budget: Optional[Budget] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Assignment, int, List[str]]:
+    """
+    Replica-exchange counterpart of _simulated_annealing_for_happiness.
+    """
+    explanations: List[str] = []
+    if not problem.n_courses or not problem.n_rooms or not problem.n_slots:
+        explanations.append("PT: insufficient data to optimize.")
+        return valid, ScheduleState(problem, valid, track_happiness=True).score, explanations
+
+    best, best_energy, rounds = replica_exchange(
+        problem, valid, HAPPINESS, rng, t_min=0.5, t_max=1000.0, replicas=replicas, workers=workers,
+        monitor=monitor, stage="Stage 3 (PT)", budget=budget, profile=profile
+    )
+    if verbose:
+        print(f"PT: best desirability {-best_energy} after {rounds} rounds")
+    explanations.append(f"Stage 3 (PT): best desirability found = {-best_energy} ({replicas} replicas)")
+    return best, -best_energy, explanations
@@ -0,0 +1,371 @@
+import bisect
+import math
+import random
+from array import array
+from typing import List, Optional, Tuple
+
+from .models import Schedule, SolveOptions
+from .constraints import get_hard_constraint_violations
+from .compiled import CompiledProblem
+from .engine import ConstraintEngine, HappinessScorer
+from .monitor import SolveMonitor
+from .profiling import SolveProfile, profiled
+from .cooling import CALIBRATION_SAMPLES, VALIDITY_SHARE, Budget, Cooling, calibrate
+from .solver import AllData, _budget_summary
+
+# Cost of a course that gets no fitting open room in the per-slot matching; above
+# any total of wasted seats, so the matching seats as many courses as it can first
+_UNSEATED = 1 << 40
+
+# Iterations of each slot annealing phase without a time budget
+_SLOT_ITERATIONS = 50000
+
+
+# ---------------- Min-cost assignment ----------------
+def min_cost_assignment(cost: List[List[int]]) -> List[int]:
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials) for an
+    n x m cost matrix with n <= m. Returns the column assigned to each row,
+    minimizing the total cost, in O(n^2 m).
+    """
+    n = len(cost)
+    if not n:
+        return []
+    m = len(cost[0])
+    inf = float("inf")
+    # 1-based rows/columns; column 0 is the virtual start of each augmenting path
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    row_of = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        row_of[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = row_of[j0]
+            row = cost[i0 - 1]
+            delta, j1 = inf, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[row_of[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if row_of[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            row_of[j0] = row_of[j1]
+            j0 = j1
+    out = [0] * n
+    for j in range(1, m + 1):
+        if row_of[j]:
+            out[row_of[j] - 1] = j - 1
+    return out
+
+
+def assign_rooms(problem: CompiledProblem, slots: array) -> Tuple[array, int]:
+    """
+    Phase 2: for each slot, match its courses to the rooms open in it, seating as
+    many as possible and then wasting the fewest seats (Soft 1). Courses left
+    without a fitting open room (more courses than seats) share the room that
+    fits them best. Returns (rooms, number of such courses).
+    """
+    C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+    rooms = array("i", [-1] * C)
+    if not R:
+        return rooms, C
+    by_slot: List[List[int]] = [[] for _ in range(S)]
+    for c in range(C):
+        if slots[c] >= 0:
+            by_slot[slots[c]].append(c)
+    unseated = 0
+    for s, courses in enumerate(by_slot):
+        if not courses:
+            continue
+        # With more courses than rooms, extra "no room" columns take the overflow
+        dummies = max(0, len(courses) - R)
+        cost = []
+        for c in courses:
+            row = []
+            for r in range(R):
+                if problem.course_room_bad[c * R + r] or problem.room_slot_bad[r * S + s]:
+                    row.append(_UNSEATED)
+                else:
+                    row.append(problem.course_room_waste[c * R + r])
+            cost.append(row + [_UNSEATED] * dummies)
+        for c, row, r in zip(courses, cost, min_cost_assignment(cost)):
+            if r >= R or row[r] == _UNSEATED:
+                unseated += 1
+            if r >= R:
+                r = min(range(R), key=lambda r: (row[r], r))
+            rooms[c] = r
+    return rooms, unseated
+
+
+# ---------------- Phase 1: slot-only search ----------------
+class SlotState:
+    """
+    Schedule state for the slot phase: courses only have slots, and the cost
+    counts rooms through the per-slot matching instead of the courses' rooms.
+    The hard engine and happiness scorer run with every room at -1, so they see
+    professor, department and curriculum clashes, availability, and Soft 2-4;
+    each slot adds the courses its open rooms cannot seat. Seating is nested (a
+    larger course fits a subset of the rooms a smaller one fits), so matching
+    the largest course to the largest remaining room is a maximum matching.
+    """
+
+    def __init__(self, problem: CompiledProblem, slots: array, track_happiness: bool = False):
+        self.problem = problem
+        C, R, S = problem.n_courses, problem.n_rooms, problem.n_slots
+        self.rooms = array("i", [-1] * C)
+        self.slots = array("i", slots)
+        self.hard = ConstraintEngine(problem, self.rooms, self.slots)
+        self.soft: Optional[HappinessScorer] = (
+            HappinessScorer(problem, self.rooms, self.slots) if track_happiness else None
+        )
+        # Open room capacities per slot, largest first
+        self._capacities = [
+            sorted((problem.capacity[r] for r in range(R) if not problem.room_slot_bad[r * S + s]), reverse=True)
+            for s in range(S)
+        ]
+        # Negated enrollments per slot, ascending (largest course first)
+        self._load: List[List[int]] = [[] for _ in range(S)]
+        for c in range(C):
+            if self.slots[c] >= 0:
+                bisect.insort(self._load[self.slots[c]], -problem.enrollment[c])
+        self._unseated = [self._count(s, self._load[s]) for s in range(S)]
+
+    def _count(self, s: int, load: List[int]) -> int:
+        capacities = self._capacities[s]
+        seated = 0
+        for e in load:
+            if seated < len(capacities) and capacities[seated] >= -e:
+                seated += 1
+        return len(load) - seated
+
+    def _seating_delta(self, c: int, s: int) -> int:
+        s0 = self.slots[c]
+        if s0 == s:
+            return 0
+        e = -self.problem.enrollment[c]
+        d = 0
+        if s0 >= 0:
+            load = self._load[s0][:]
+            del load[bisect.bisect_left(load, e)]
+            d += self._count(s0, load) - self._unseated[s0]
+        if s >= 0:
+            load = self._load[s][:]
+            bisect.insort(load, e)
+            d += self._count(s, load) - self._unseated[s]
+        return d
+
+    @property
+    def cost(self) -> int:
+        # Every course carries the engine's incomplete-assignment violation for its missing room
+        return self.hard.cost - self.problem.n_courses + sum(self._unseated)
+
+    @property
+    def score(self) -> int:
+        return self.soft.score if self.soft is not None else 0
+
+    def cost_delta(self, c: int, s: int) -> int:
+        return self.hard.delta(c, -1, s) + self._seating_delta(c, s)
+
+    def score_delta(self, c: int, s: int) -> int:
+        return self.soft.delta(c, -1, s)
+
+    def apply(self, c: int, s: int) -> None:
+        s0 = self.slots[c]
+        e = -self.problem.enrollment[c]
+        if s0 >= 0:
+            load = self._load[s0]
+            del load[bisect.bisect_left(load, e)]
+            self._unseated[s0] = self._count(s0, load)
+        if s >= 0:
+            bisect.insort(self._load[s], e)
+            self._unseated[s] = self._count(s, self._load[s])
+        self.hard._update(c, -1, s)
+        if self.soft is not None:
+            self.soft._update(c, -1, s)
+        self.slots[c] = s
+
+    def snapshot(self) -> array:
+        return array("i", self.slots)
+
+
+def _sample_slot(problem: CompiledProblem, c: int, rng: random.Random) -> int:
+    return problem.domains.sample(c, rng)[1]
+
+
+def _anneal_slots(
+    problem: CompiledProblem,
+    start: array,
+    rng: random.Random,
+    happiness: bool,
+    monitor: Optional[SolveMonitor] = None,
+    profile: Optional[SolveProfile] = None,
+    budget: Optional[Budget] = None
+) -> Tuple[array, int, int, Optional[str]]:
+    """
+    SA over slots only: towards cost 0 (happiness=False, like SA') or, from a
+    valid start, towards the highest slot-level happiness without leaving cost 0
+    (like Stage 3). Returns (best slots, their cost, their score, budget note).
+    """
+    C = problem.n_courses
+    state = SlotState(problem, start, track_happiness=happiness)
+    stage = "Two-phase (slots)" if happiness else "Two-phase (slots')"
+    best = state.snapshot()
+    current = state.score if happiness else -state.cost
+    best_value = current
+
+    # Slot moves are cheap, so even without a time budget the schedule is
+    # calibrated, cooling from start to end temperature over _SLOT_ITERATIONS
+    moves = [(c, _sample_slot(problem, c, rng)) for c in (rng.randrange(C) for _ in range(CALIBRATION_SAMPLES))]
+    if happiness:
+        sample = lambda: [-state.score_delta(*m) for m in moves if state.cost_delta(*m) == 0]
+    else:
+        sample = lambda: [state.cost_delta(*m) for m in moves]
+    remaining = budget.remaining() if budget is not None else None
+    if remaining is not None:
+        segment = None if happiness else remaining * VALIDITY_SHARE
+        cooling = Cooling.timed(budget, sample, remaining, segment=segment)
+    else:
+        start, end = calibrate(sample())
+        rate = (end / start) ** (1.0 / _SLOT_ITERATIONS)
+        cooling = Cooling(start, rate, end, max_iter=_SLOT_ITERATIONS, budget=budget)
+    target = budget.target_happiness if budget is not None and happiness else None
+
+    it = 0
+    accepted = 0
+    started = profile.begin(stage, state) if profile is not None else 0.0
+    while (happiness or best_value < 0) and (target is None or best_value < target) and cooling.running(it):
+        if monitor is not None and it % monitor.every == 0:
+            monitor.update(stage, it, cost=0 if happiness else -best_value, happiness=best_value if happiness else None)
+            if monitor.cancelled:
+                break
+        if profile is not None and it % profile.every == 0:
+            profile.trace(stage, it, state.cost, state.score if happiness else None)
+        it += 1
+        cooling.cool()
+
+        c = rng.randrange(C)
+        s = _sample_slot(problem, c, rng)
+        if s == state.slots[c]:
+            continue
+        if happiness:
+            if state.cost_delta(c, s) > 0:
+                continue
+            delta = state.score_delta(c, s)
+        else:
+            delta = -state.cost_delta(c, s)
+        if delta < 0:
+            try:
+                prob = math.exp(delta / cooling.temp)
+            except OverflowError:
+                prob = 0.0
+            if rng.random() >= prob:
+                continue
+        state.apply(c, s)
+        accepted += 1
+        current += delta
+        if current > best_value:
+            best = state.snapshot()
+            best_value = current
+            cooling.improved(it)
+
+    if profile is not None:
+        profile.end(stage, started, it, accepted, it - accepted)
+    note = cooling.describe(stage) if happiness or best_value < 0 else None
+    if happiness:
+        return best, 0, best_value, note
+    return best, -best_value, 0, note
+
+
+# ---------------- Controller ----------------
+def solve_two_phase(
+    problem: CompiledProblem,
+    all_data: AllData,
+    rng: random.Random,
+    options: SolveOptions,
+    monitor: Optional[SolveMonitor] = None,
+    initial: Optional[Schedule] = None,
+    profile: Optional[SolveProfile] = None
+) -> Tuple[Schedule, List[str], int, List[str]]:
+    """
+    Two-phase solve: annealing over time slots alone (first to a slot plan
+    whose every slot can seat its courses, then for slot-level happiness),
+    followed by an optimal room matching per slot. The slot search moves in a
+    C x S neighbourhood instead of C x R x S, and phase 2 never misses a
+    feasible room assignment for the chosen slots. Venue buildings (Soft 5)
+    span slots, so the matching does not look at them. The annealer and
+    move_mix options do not apply here.
+    """
+    explanations: List[str] = []
+    budget = Budget.from_options(options)
+    C = problem.n_courses
+    stage_seconds: List[float] = []
+
+    with profiled(profile, "Domains"):
+        domains = problem.domains
+    if not domains.feasible:
+        explanations.append("Feasibility: no fully valid schedule exists for this problem.")
+        explanations.extend(f"Feasibility: {line}" for line in domains.report)
+
+    if initial is not None:
+        slots = problem.encode(initial)[1]
+        for c in range(C):
+            if slots[c] < 0 and problem.n_slots:
+                slots[c] = _sample_slot(problem, c, rng)
+    else:
+        slots = array("i", [_sample_slot(problem, c, rng) if problem.n_slots else -1 for c in range(C)])
+
+    cost = 0
+    if C and problem.n_rooms and problem.n_slots:
+        slots, cost, _, note = _anneal_slots(problem, slots, rng, False, monitor, profile, budget)
+        if note:
+            explanations.append(note)
+        explanations.append(f"Two-phase (slots'): slot plan with cost {cost}.")
+        if budget is not None:
+            stage_seconds.append(budget.elapsed())
+        if cost == 0 and not (monitor is not None and monitor.cancelled):
+            slots, _, score, note = _anneal_slots(problem, slots, rng, True, monitor, profile, budget)
+            if note:
+                explanations.append(note)
+            explanations.append(f"Two-phase (slots): best slot-level desirability found = {score}")
+            if budget is not None:
+                stage_seconds.append(budget.elapsed() - sum(stage_seconds))
+
+    with profiled(profile, "Two-phase (rooms)"):
+        rooms, unseated = assign_rooms(problem, slots)
+    explanations.append(
+        f"Two-phase (rooms): matched rooms in {problem.n_slots} slot(s); "
+        f"{unseated} course(s) without a fitting free room."
+    )
+    happiness = HappinessScorer(problem, array("i", rooms), array("i", slots)).score
+    if monitor is not None:
+        state_cost = ConstraintEngine(problem, array("i", rooms), array("i", slots)).cost
+        monitor.update("Two-phase (rooms)", 0, cost=state_cost, happiness=happiness, best=(rooms, slots))
+
+    with profiled(profile, "Validate"):
+        schedule = problem.decode(rooms, slots)
+        violations = get_hard_constraint_violations(schedule, all_data)
+    if violations:
+        explanations.append("Unable to produce fully valid schedule in two-phase mode. Returning best-effort result.")
+    if budget is not None:
+        explanations.append(_budget_summary(budget, stage_seconds))
+    if monitor is not None and monitor.cancelled:
+        explanations.append("Solve was cancelled; returning the best schedule found so far.")
+    return schedule, violations, happiness, explanations
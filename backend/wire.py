@@ -0,0 +1,251 @@
+import gzip
+import json
+import math
+from itertools import chain
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .models import Schedule, SolveOptions
+from .solver import AllData
+
+# MessagePack is optional; without it only columnar JSON is accepted and returned
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+# ---------------- Encoding ----------------
+def decode_body(body: bytes, content_type: Optional[str], content_encoding: Optional[str]) -> Dict[str, Any]:
+    """
+    Parse a request body: gzip-compressed or not, JSON or MessagePack.
+    """
+    if (content_encoding or "").strip().lower() == "gzip":
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError) as e:
+            raise WireFormatError(f"Invalid gzip body: {e}")
+    media = (content_type or JSON).split(";")[0].strip().lower()
+    try:
+        if media in _MSGPACK_TYPES:
+            if msgpack is None:
+                raise WireFormatError("MessagePack bodies need the msgpack package (pip install msgpack).")
+            data = msgpack.unpackb(body, raw=False)
+        else:
+            data = json.loads(body)
+    except WireFormatError:
+        raise
+    except Exception as e:
+        raise WireFormatError(f"Cannot decode {media} body: {e}")
+    if not isinstance(data, dict):
+        raise WireFormatError("The body must be an object.")
+    return data
+
+
+def encode_body(data: Dict[str, Any], accept: Optional[str]) -> Tuple[bytes, str]:
+    """
+    MessagePack when the client accepts it and msgpack is installed, else compact
+    JSON. Returns (body, media type); gzip is left to the HTTP layer.
+    """
+    if msgpack is not None and any(t in (accept or "") for t in _MSGPACK_TYPES):
+        return msgpack.packb(data, use_bin_type=True), MSGPACK
+    return json.dumps(data, separators=(",", ":")).encode("utf-8"), JSON
+
+
+# ---------------- Columnar problem ----------------
+# Column converters check and convert a whole column at once; the common case
+# (values already of the right type) is a single C-level pass over it
+def _int(x: Any) -> int:
+    # NaN and infinities (valid msgpack, and accepted by Python's json) are not integers
+    if isinstance(x, bool) or not isinstance(x, (int, float)) or not math.isfinite(x) or x != int(x):
+        raise WireFormatError(f"Expected an integer, got {x!r}.")
+    return int(x)
+
+
+def _strs(column: List[Any]) -> List[str]:
+    if not set(map(type, column)) <= {str}:
+        raise WireFormatError("Expected a column of strings.")
+    return column
+
+
+def _ints(column: List[Any]) -> List[int]:
+    if set(map(type, column)) <= {int}:
+        return column
+    return [_int(v) for v in column]
+
+
+def _int_lists(column: List[Any]) -> List[List[int]]:
+    if not set(map(type, column)) <= {list}:
+        raise WireFormatError("Expected a column of integer lists.")
+    if set(map(type, chain.from_iterable(column))) <= {int}:
+        return column
+    return [_ints(v) for v in column]
+
+
+def _names(names: List[str], label: str) -> Callable[[List[Any]], List[str]]:
+    # Integer ids index into `names`; strings pass through unchanged
+    def convert(column: List[Any]) -> List[str]:
+        out = []
+        for x in column:
+            if type(x) is str:
+                out.append(x)
+                continue
+            i = _int(x)
+            if not 0 <= i < len(names):
+                raise WireFormatError(f"Unknown {label} id {i}.")
+            out.append(names[i])
+        return out
+    return convert
+
+
+def _rows(
+    data: Dict[str, Any],
+    table: str,
+    fields: Dict[str, Tuple[Callable[[List[Any]], List[Any]], Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Turn one columnar table {field: [values...]} into row dicts with every model
+    field present. fields maps each field to (column converter, default); a
+    default of None marks a required column.
+    """
+    columns = data.get(table) or {}
+    if not isinstance(columns, dict):
+        raise WireFormatError(f"{table} must be an object of columns.")
+    lengths = {len(v) for v in columns.values() if isinstance(v, list)}
+    if len(lengths) > 1:
+        raise WireFormatError(f"{table}: columns differ in length.")
+    n = lengths.pop() if lengths else 0
+    converted: List[List[Any]] = []
+    for field, (convert, default) in fields.items():
+        column = columns.get(field)
+        if column is None:
+            if default is None and n:
+                raise WireFormatError(f"{table}: missing column {field}.")
+            column = [list(default) if isinstance(default, list) else default for _ in range(n)]
+        elif not isinstance(column, list):
+            raise WireFormatError(f"{table}.{field} must be a list.")
+        else:
+            column = convert(column)
+        converted.append(column)
+    keys = list(fields)
+    return [dict(zip(keys, values)) for values in zip(*converted)] if n else []
+
+
+def problem_from_columns(data: Dict[str, Any]) -> Tuple[AllData, SolveOptions, Optional[Schedule]]:
+    """
+    Decode a columnar problem without building pydantic models per entity:
+
+        {"professors": {"name": [...], "unavailable_slots": [[...]], ...},
+         "rooms": {"name": [...], "capacity": [...], "unavailable_slots": [[...]]},
+         "time_slots": {"slot_id": [...], "day": [...], "start_time": [...], "end_time": [...]},
+         "departments": [...],
+         "courses": {"name": [...], "enrollment": [...], "professor": [...],
+                     "department": [...], "is_elective_for": [[...]]},
+         "options": {...},
+         "previous": {"room": [...], "slot": [...]}}
+
+    A course's professor may be an index into professors.name and its
+    departments indexes into "departments"; names are accepted too. previous,
+    like the response schedule, is aligned with the course list: a room index
+    and a slot id per course, -1 when unassigned.
+    Rows come out as plain dicts with the same fields as the models, so the solver,
+    cache keys and results match the /solve endpoint exactly.
+    """
+    professors = _rows(data, "professors", {
+        "name": (_strs, None),
+        "unavailable_slots": (_int_lists, []),
+        "preferred_slots": (_int_lists, []),
+        "hates_slots": (_int_lists, []),
+    })
+    rooms = _rows(data, "rooms", {
+        "name": (_strs, None),
+        "capacity": (_ints, None),
+        "unavailable_slots": (_int_lists, []),
+    })
+    time_slots = _rows(data, "time_slots", {
+        "day": (_strs, None),
+        "start_time": (_strs, None),
+        "end_time": (_strs, None),
+        "slot_id": (_ints, None),
+    })
+    departments = data.get("departments") or []
+    if not isinstance(departments, list):
+        raise WireFormatError("departments must be a list.")
+    departments = _strs(departments)
+    dept = _names(departments, "department")
+
+    def electives(column: List[Any]) -> List[List[str]]:
+        if not set(map(type, column)) <= {list}:
+            raise WireFormatError("Expected a column of department lists.")
+        return [dept(v) for v in column]
+
+    courses = _rows(data, "courses", {
+        "name": (_strs, None),
+        "enrollment": (_ints, None),
+        "professor": (_names([p["name"] for p in professors], "professor"), None),
+        "department": (dept, None),
+        "is_elective_for": (electives, []),
+    })
+    all_data: AllData = {"courses": courses, "professors": professors, "rooms": rooms, "time_slots": time_slots}
+
+    try:
+        options = SolveOptions.model_validate(data.get("options") or {})
+    except ValueError as e:
+        raise WireFormatError(f"Invalid options: {e}")
+
+    previous = None
+    if data.get("previous") is not None:
+        previous = schedule_from_columns(data["previous"], all_data)
+    return all_data, options, previous
+
+
+def schedule_to_columns(schedule: Schedule, all_data: AllData) -> Dict[str, List[int]]:
+    """
+    Columnar schedule aligned with all_data["courses"]: room index and slot id
+    per course, -1 when unassigned.
+    """
+    room_index = {r["name"] if isinstance(r, dict) else r.name: i for i, r in enumerate(all_data["rooms"])}
+    rooms: List[int] = []
+    slots: List[int] = []
+    assignments = schedule.assignments
+    for c in all_data["courses"]:
+        room, slot = assignments.get(c["name"] if isinstance(c, dict) else c.name, (None, None))
+        rooms.append(room_index.get(room, -1) if room is not None else -1)
+        slots.append(slot if slot is not None else -1)
+    return {"room": rooms, "slot": slots}
+
+
+def schedule_from_columns(columns: Dict[str, Any], all_data: AllData) -> Schedule:
+    if not isinstance(columns, dict):
+        raise WireFormatError("previous must be an object of columns.")
+    courses, rooms = all_data["courses"], all_data["rooms"]
+    room_col, slot_col = columns.get("room") or [], columns.get("slot") or []
+    if not isinstance(room_col, list) or not isinstance(slot_col, list):
+        raise WireFormatError("previous: room and slot must be lists.")
+    room_col, slot_col = _ints(room_col), _ints(slot_col)
+    if len(room_col) != len(courses) or len(slot_col) != len(courses):
+        raise WireFormatError("previous: room and slot need one entry per course.")
+    assignments: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+    for c, r, s in zip(courses, room_col, slot_col):
+        if r >= len(rooms) or r < -1:
+            raise WireFormatError(f"Unknown room id {r}.")
+        assignments[c["name"]] = (rooms[r]["name"] if r >= 0 else None, s if s >= 0 else None)
+    return Schedule(assignments=assignments)
+
+
+# ---------------- Response detail ----------------
+def page(items: List[str], details: bool, offset: int, limit: Optional[int]) -> List[str]:
+    """
+    The slice of a violation or explanation list a response should carry.
+    """
+    if not details:
+        return []
+    offset = max(0, offset)
+    return items[offset:] if limit is None else items[offset:offset + max(0, limit)]
@@ -355,7 +355,15 @@
     // =====================================================
     //  SOLVE BUTTON
     // =====================================================
+    let currentJob = null;
+    let currentEvents = null;
+
     async function solve() {
+        // A new solve replaces any running one
+        if (currentJob) {
+            stopSolve();
+            finishJob();
+        }
         statusDiv.innerText = "Solving...";
 
         const problem = {
@@ -366,7 +374,7 @@
         };
 
         try {
-            const res = await fetch("/solve", {
+            const res = await fetch("/jobs", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify(problem),
@@ -378,16 +386,10 @@
                 return;
             }
 
-            const result = await res.json();
-
-            statusDiv.innerHTML = `
-                <strong>Violations:</strong> ${result.cost} &nbsp;&nbsp;
-                <strong>Desirability:</strong> ${result.happiness}
-            `;
-
-            renderViolations(result.violations || []);
-            renderExplanations(result.explanation || []);
-            renderGrid(result.schedule.assignments || {});
+            const job = await res.json();
+            currentJob = job.job_id;
+            $("stop-btn").classList.remove("hidden");
+            watchJob(job.job_id);
 
         } catch (e) {
             console.error(e);
@@ -395,6 +397,78 @@
         }
     }
 
+    // Follow a running job over Server-Sent Events until it finishes
+    function watchJob(jobId) {
+        const events = new EventSource(`/jobs/${jobId}/events`);
+        currentEvents = events;
+        let stage = "";
+
+        events.addEventListener("stage", (e) => {
+            stage = JSON.parse(e.data).stage;
+        });
+
+        events.addEventListener("progress", (e) => {
+            const p = JSON.parse(e.data);
+            statusDiv.innerHTML = `
+                <strong>${stage || "Queued"}</strong> &nbsp;&nbsp;
+                <strong>Iteration:</strong> ${p.iteration} &nbsp;&nbsp;
+                <strong>Best violations:</strong> ${p.best_cost ?? "-"} &nbsp;&nbsp;
+                <strong>Best desirability:</strong> ${p.best_happiness ?? "-"}
+            `;
+        });
+
+        events.addEventListener("best", (e) => {
+            const best = JSON.parse(e.data);
+            renderGrid(best.schedule.assignments || {});
+        });
+
+        events.addEventListener("done", (e) => {
+            finishJob();
+            const job = JSON.parse(e.data);
+            if (!job.result) {
+                statusDiv.innerText = job.status === "failed"
+                    ? "Solve failed: " + job.error
+                    : "Solve " + job.status + ".";
+                return;
+            }
+            showResult(job.result, job.status === "cancelled");
+        });
+
+        events.onerror = () => {
+            // The server closes the stream after "done"; anything else is a lost connection
+            if (currentEvents === events) {
+                finishJob();
+                statusDiv.innerText = "Lost connection to the solver.";
+            }
+        };
+    }
+
+    function finishJob() {
+        if (currentEvents) currentEvents.close();
+        currentEvents = null;
+        currentJob = null;
+        $("stop-btn").classList.add("hidden");
+    }
+
+    async function stopSolve() {
+        const jobId = currentJob;
+        if (!jobId) return;
+        // Keep listening: the job still sends its best schedule so far in "done"
+        await fetch(`/jobs/${jobId}`, { method: "DELETE" });
+    }
+
+    function showResult(result, cancelled) {
+        statusDiv.innerHTML = `
+            <strong>Violations:</strong> ${result.cost} &nbsp;&nbsp;
+            <strong>Desirability:</strong> ${result.happiness}
+            ${cancelled ? "&nbsp;&nbsp;(stopped early)" : ""}
+        `;
+
+        renderViolations(result.violations || []);
+        renderExplanations(result.explanation || []);
+        renderGrid(result.schedule.assignments || {});
+    }
+
     // =====================================================
     //  RENDER: Violations + Explanations + Timetable Grid
     // =====================================================
@@ -506,5 +580,6 @@ window.addEventListener("DOMContentLoaded", () => {
     $("add-room-btn").addEventListener("click", e => { e.preventDefault(); addRoom(); });
     $("add-course-btn").addEventListener("click", e => { e.preventDefault(); addCourse(); });
     $("solve-btn").addEventListener("click", e => { e.preventDefault(); solve(); });
+    $("stop-btn").addEventListener("click", e => { e.preventDefault(); stopSolve(); });
     renderLists();
 });
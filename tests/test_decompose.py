@@ -0,0 +1,38 @@
+from backend.benchmark import generate_instance
+from backend.compiled import compile_problem
+from backend.decompose import _components, solve_decomposed
+from backend.models import SolveOptions
+
+
+def _campuses(count, courses, slots):
+    """
+    `count` unrelated instances in one problem: no professor, department,
+    curriculum or room in common, and every room open to every course it seats.
+    """
+    all_data = {"courses": [], "professors": [], "rooms": [], "time_slots": []}
+    for i in range(count):
+        data = generate_instance(courses, slots, 0.7, seed=i)
+        for c in data["courses"]:
+            c.name, c.professor, c.department = f"{i}:{c.name}", f"{i}:{c.professor}", f"{i}:{c.department}"
+            c.is_elective_for = [f"{i}:{e}" for e in c.is_elective_for]
+        for p in data["professors"]:
+            p.name = f"{i}:{p.name}"
+        for r in data["rooms"]:
+            r.name = f"{i}:{r.name}"
+        for key in ("courses", "professors", "rooms"):
+            all_data[key] += data[key]
+        all_data["time_slots"] = data["time_slots"]
+    return all_data
+
+
+def test_disjoint_campuses_split_independently():
+    all_data = _campuses(3, 40, 10)
+    problem = compile_problem(all_data)
+    components = _components(problem, rooms=True)
+    assert len(components) >= 3
+    for component in components:
+        assert len({problem.course_names[c].split(":")[0] for c in component}) == 1
+
+    schedule, _, _, explanations = solve_decomposed(all_data, SolveOptions(seed=1, decompose=True, workers=1))
+    assert "independent part(s)" in explanations[0]
+    assert set(schedule.assignments) == set(problem.course_names)
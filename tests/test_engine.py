@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from backend.benchmark import generate_instance
+from backend.compiled import compile_problem
+from backend.constraints import calculate_happiness_score, get_hard_constraint_violations
+from backend.engine import ScheduleState
+
+
+def _draw(problem, rng):
+    # A random move, now and then leaving the course without a room or a slot
+    c = rng.randrange(problem.n_courses)
+    r = rng.randrange(problem.n_rooms) if rng.random() > 0.1 else -1
+    s = rng.randrange(problem.n_slots) if rng.random() > 0.1 else -1
+    return c, r, s
+
+
+def _check(state, all_data):
+    schedule = state.problem.decode(state.rooms, state.slots)
+    assert state.cost == len(get_hard_constraint_violations(schedule, all_data))
+    assert state.score == calculate_happiness_score(schedule, all_data)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_engines_match_reference_scorers(seed):
+    # Tight instances from random starts, so most moves touch some violation
+    all_data = generate_instance(30, 8, 0.9, seed=seed)
+    problem = compile_problem(all_data)
+    rng = random.Random(seed)
+    start = ([rng.randrange(problem.n_rooms) for _ in range(problem.n_courses)],
+             [rng.randrange(problem.n_slots) for _ in range(problem.n_courses)])
+    state = ScheduleState(problem, start, track_happiness=True)
+    _check(state, all_data)
+
+    for _ in range(300):
+        if rng.random() < 0.5:
+            # One move, priced first: the deltas are the change apply() makes
+            c, r, s = _draw(problem, rng)
+            cost, score = state.cost, state.score
+            cost_delta, score_delta = state.cost_delta(c, r, s), state.score_delta(c, r, s)
+            state.apply(c, r, s)
+            assert (state.cost - cost, state.score - score) == (cost_delta, score_delta)
+        else:
+            # A compound move, kept or undone as a whole
+            mark = state.mark()
+            before = state.snapshot(), state.cost, state.score
+            for _ in range(rng.randint(2, 4)):
+                state.apply(*_draw(problem, rng))
+                _check(state, all_data)
+            if rng.random() < 0.5:
+                state.revert(mark)
+                assert (state.snapshot(), state.cost, state.score) == before
+        state.commit()
+        _check(state, all_data)
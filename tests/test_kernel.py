@@ -0,0 +1,154 @@
+import importlib
+import math
+import random
+import sys
+
+import pytest
+
+from backend import kernel
+from backend.benchmark import generate_instance
+from backend.compiled import compile_problem
+from backend.constraints import calculate_happiness_score, get_hard_constraint_violations
+from backend.cooling import Cooling
+from backend.engine import ScheduleState
+from backend.models import SolveOptions
+from backend.solver import _simulated_annealing_for_happiness, solve_and_optimize_schedule
+
+
+@pytest.fixture(scope="module")
+def instance():
+    """
+    A small problem and a valid, unpolished schedule for it (Stage 3 stops at once).
+    """
+    all_data = generate_instance(60, 15, 0.7, seed=1)
+    schedule, violations, _, _ = solve_and_optimize_schedule(
+        all_data, options=SolveOptions(seed=3, initializer="greedy", annealer="tabu", target_happiness=0)
+    )
+    assert not violations
+    problem = compile_problem(all_data)
+    return all_data, problem, problem.encode(schedule)
+
+
+def _load(numba_available: bool):
+    # Re-import the kernel with or without numba. The solver's reference to
+    # anneal_moves follows, since reload() reuses the module's namespace
+    saved = sys.modules.get("numba")
+    if not numba_available:
+        sys.modules["numba"] = None
+    try:
+        return importlib.reload(kernel)
+    finally:
+        if saved is not None:
+            sys.modules["numba"] = saved
+        else:
+            sys.modules.pop("numba", None)
+
+
+@pytest.fixture
+def interpreted():
+    yield _load(numba_available=False)
+    _load(numba_available=True)
+
+
+def _anneal(module, problem, valid, seed):
+    state = ScheduleState(problem, valid, track_happiness=True)
+    cooling = Cooling(300.0, 0.9995, 0.5, max_iter=20000)
+    best, score, iterations, accepted = module.anneal_moves(problem, state, random.Random(seed), cooling)
+    return (list(best[0]), list(best[1])), score, iterations, accepted
+
+
+def test_interpreted_kernel_is_valid(instance, interpreted):
+    all_data, problem, valid = instance
+    assert interpreted.KERNEL == "python"
+    (rooms, slots), score, iterations, accepted = _anneal(interpreted, problem, valid, seed=7)
+    schedule = problem.decode(rooms, slots)
+    assert not get_hard_constraint_violations(schedule, all_data)
+    assert score == calculate_happiness_score(schedule, all_data)
+    assert score >= ScheduleState(problem, valid, track_happiness=True).score
+    assert 0 < accepted < iterations <= 20000
+
+
+def test_interpreted_kernel_is_deterministic(instance, interpreted):
+    _, problem, valid = instance
+    assert _anneal(interpreted, problem, valid, seed=7) == _anneal(interpreted, problem, valid, seed=7)
+    assert _anneal(interpreted, problem, valid, seed=7) != _anneal(interpreted, problem, valid, seed=8)
+
+
+def test_compiled_kernel_matches_interpreted(instance):
+    pytest.importorskip("numba")
+    _, problem, valid = instance
+    expected = [_anneal(_load(numba_available=False), problem, valid, seed) for seed in (1, 2, 3)]
+    compiled = _load(numba_available=True)
+    assert compiled.KERNEL == "numba"
+    assert [_anneal(compiled, problem, valid, seed) for seed in (1, 2, 3)] == expected
+
+
+def test_stage3_result_does_not_depend_on_numba(instance):
+    pytest.importorskip("numba")
+    all_data, problem, valid = instance
+
+    def stage3():
+        best, score, _ = _simulated_annealing_for_happiness(
+            problem, valid, verbose=False, rng=random.Random(5), move_mix={"move": 1.0}
+        )
+        return list(best[0]), list(best[1]), score
+
+    _load(numba_available=False)
+    try:
+        expected = stage3()
+    finally:
+        _load(numba_available=True)
+    rooms, slots, score = stage3()
+    assert (rooms, slots, score) == expected
+    schedule = problem.decode(rooms, slots)
+    assert not get_hard_constraint_violations(schedule, all_data)
+    assert score == calculate_happiness_score(schedule, all_data)
+
+
+def test_interpreted_kernel_matches_engine_moves(instance, interpreted):
+    # One kernel iteration at a time against the Stage 3 MOVE step on ScheduleState,
+    # drawing from the same xorshift stream: same course and (room, slot), same
+    # feasibility verdict and delta, same acceptance, same schedule afterwards
+    _, problem, valid = instance
+    S = problem.n_slots
+    state = ScheduleState(problem, valid, track_happiness=True)
+    buffers = interpreted._encode(problem, state)
+    x = random.Random(11).randrange(1, 1 << 32)
+    temp, rate = 300.0, 0.999
+    score = best_score = state.score
+    since_best = 0
+    moved = 0
+    for _ in range(3000):
+        done, accepted, _, temp_after, score, best_score, since_best, x_after = interpreted._anneal(
+            *buffers, score, best_score, 1, temp, rate, 0.5, interpreted._NO_TARGET, 0, since_best, x
+        )
+        assert done == 1
+
+        x = interpreted._xorshift(x)
+        c = (x * problem.n_courses) >> 32
+        pairs = problem.domains.pairs[c]
+        if pairs:
+            x = interpreted._xorshift(x)
+            r, s = divmod(pairs[(x * len(pairs)) >> 32], S)
+        else:
+            x = interpreted._xorshift(x)
+            r = (x * problem.n_rooms) >> 32
+            x = interpreted._xorshift(x)
+            s = (x * S) >> 32
+        accept = state.cost_delta(c, r, s) == 0
+        if accept:
+            delta = state.score_delta(c, r, s)
+            if delta <= 0:
+                x = interpreted._xorshift(x)
+                accept = x / 4294967296.0 < math.exp(delta / temp)
+        if accept:
+            state.apply(c, r, s)
+            state.commit()
+            moved += 1
+
+        assert accepted == int(accept)
+        assert (x_after, temp_after) == (x, temp * rate)
+        assert score == state.score and state.cost == 0
+        assert list(buffers.rooms) == list(state.rooms) and list(buffers.slots) == list(state.slots)
+        temp = temp_after
+    assert 0 < moved < 3000